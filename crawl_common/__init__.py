@@ -0,0 +1,6 @@
+"""
+課程應用程式共用的爬蟲基礎模組
+
+lesson7_1、lesson8、lesson8_1 等應用程式透過此套件共用瀏覽器管理等基礎設施，
+各應用程式以 sys.path 加入專案根目錄後匯入。
+"""
@@ -0,0 +1,193 @@
+"""
+資源攔截設定
+
+報價頁面只需要 HTML、JavaScript 與資料請求（XHR / fetch / WebSocket），
+圖片、字型、影音與廣告、分析等第三方網域都可以在瀏覽器端直接中止，
+節省頻寬並加快頁面就緒時間。
+"""
+
+import weakref
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+# 預設中止的資源類型（Playwright request.resource_type）
+DEFAULT_BLOCKED_TYPES = ("image", "media", "font", "stylesheet")
+
+# 常見的廣告與分析網域（含子網域）
+DEFAULT_BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "facebook.net",
+    "facebook.com",
+    "hotjar.com",
+    "clarity.ms",
+    "scorecardresearch.com",
+    "criteo.com",
+    "criteo.net",
+    "taboola.com",
+    "outbrain.com",
+)
+
+# 被中止資源的平均大小估計（位元組），用於計算節省的流量
+ESTIMATED_BYTES = {
+    "image": 30_000,
+    "media": 200_000,
+    "font": 40_000,
+    "stylesheet": 25_000,
+    "script": 60_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+
+class ResourceBlockProfile:
+    """
+    資源攔截設定與統計
+
+    以 crawl4ai 的 on_page_context_created hook 在每個新頁面註冊 route，
+    只對 url_hosts 指定的網站生效；累計中止與放行的請求數，
+    並估計節省的流量。多個批次可能同時共用一個設定，
+    因此統計只累加不重設：批次開始時取 stats()，結束時以 stats_since() 取得差值。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        url_hosts: Iterable[str],
+        blocked_types: Iterable[str] = DEFAULT_BLOCKED_TYPES,
+        blocked_hosts: Iterable[str] = DEFAULT_BLOCKED_HOSTS
+    ):
+        """
+        建立攔截設定
+
+        Args:
+            name: 設定名稱（顯示於統計）
+            url_hosts: 要套用此設定的頁面網域，例如 ("wantgoo.com",)
+            blocked_types: 要中止的資源類型
+            blocked_hosts: 要中止的第三方網域（含子網域）
+        """
+        self.name = name
+        self.url_hosts = tuple(url_hosts)
+        self.blocked_types = frozenset(blocked_types)
+        self.blocked_hosts = tuple(blocked_hosts)
+        self._routed_pages = weakref.WeakSet()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """重設累計統計（僅在沒有進行中的批次時呼叫）"""
+        self.requests_allowed = 0
+        self.requests_blocked = 0
+        self.blocked_by_type: Dict[str, int] = {}
+        self.bytes_saved_estimate = 0
+        self.bytes_received = 0
+
+    @staticmethod
+    def _host_matches(host: str, domains: Iterable[str]) -> bool:
+        """網域或其子網域是否在清單中"""
+        return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+    def applies_to(self, url: Optional[str]) -> bool:
+        """
+        此設定是否適用於指定頁面
+
+        Args:
+            url: 頁面網址
+
+        Returns:
+            頁面網域符合 url_hosts 時為 True
+        """
+        if not url:
+            return False
+        return self._host_matches(urlsplit(url).hostname or "", self.url_hosts)
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        """
+        判斷請求是否應中止
+
+        Args:
+            url: 請求網址
+            resource_type: Playwright 的資源類型
+
+        Returns:
+            需要中止時為 True
+        """
+        if resource_type in self.blocked_types:
+            return True
+        host = urlsplit(url).hostname or ""
+        return self._host_matches(host, self.blocked_hosts)
+
+    async def install(self, page):
+        """
+        在頁面上註冊請求攔截（同一頁面只註冊一次）
+
+        Args:
+            page: Playwright Page
+        """
+        if page in self._routed_pages:
+            return
+        self._routed_pages.add(page)
+        await page.route("**/*", self._handle_route)
+        page.on("response", self._on_response)
+
+    async def _handle_route(self, route):
+        """中止不需要的請求，其餘放行"""
+        request = route.request
+        if self.should_block(request.url, request.resource_type):
+            self.requests_blocked += 1
+            resource_type = request.resource_type
+            self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+            self.bytes_saved_estimate += ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+            await route.abort()
+        else:
+            self.requests_allowed += 1
+            await route.continue_()
+
+    def _on_response(self, response):
+        """累計放行回應的大小（依 Content-Length，無此標頭者不計）"""
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            self.bytes_received += int(length)
+
+    def stats(self) -> Dict:
+        """
+        取得累計統計
+
+        Returns:
+            包含放行／中止請求數、各類型中止數與流量估計的字典
+        """
+        return {
+            "profile": self.name,
+            "requests_allowed": self.requests_allowed,
+            "requests_blocked": self.requests_blocked,
+            "blocked_by_type": dict(self.blocked_by_type),
+            "bytes_saved_estimate": self.bytes_saved_estimate,
+            "bytes_received": self.bytes_received,
+        }
+
+    def stats_since(self, baseline: Dict) -> Dict:
+        """
+        取得自 baseline 以來的統計差值
+
+        Args:
+            baseline: 先前 stats() 的結果
+
+        Returns:
+            格式與 stats() 相同的字典，數值為兩次之間的增加量
+        """
+        current = self.stats()
+        blocked_by_type = {
+            resource_type: count - baseline["blocked_by_type"].get(resource_type, 0)
+            for resource_type, count in current["blocked_by_type"].items()
+        }
+        delta = {
+            key: current[key] - baseline[key]
+            for key in ("requests_allowed", "requests_blocked", "bytes_saved_estimate", "bytes_received")
+        }
+        return {
+            "profile": self.name,
+            **delta,
+            "blocked_by_type": {key: count for key, count in blocked_by_type.items() if count},
+        }
@@ -0,0 +1,172 @@
+"""
+長駐瀏覽器管理模組
+
+在應用程式生命週期內維持同一個 AsyncWebCrawler（Chromium），
+避免每次更新都重新啟動與關閉瀏覽器；瀏覽器異常中斷時自動重新啟動。
+"""
+
+import asyncio
+from typing import TYPE_CHECKING, List, Optional
+
+from crawl_common.blocking import ResourceBlockProfile
+
+# crawl4ai（含 Playwright）匯入需時較久，延後到第一次啟動瀏覽器時才匯入
+if TYPE_CHECKING:
+    from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig
+
+
+class CrawlerManager:
+    """
+    長駐 AsyncWebCrawler 管理器
+
+    第一次使用時才啟動瀏覽器，之後重複使用同一個瀏覽器與其 context。
+    Playwright 物件綁定在建立它的事件迴圈上，因此所有方法都必須在
+    同一個（長駐的）事件迴圈中呼叫。
+    """
+
+    def __init__(self, browser_config: Optional["BrowserConfig"] = None):
+        """
+        初始化管理器（不會立即啟動瀏覽器，也不會匯入 crawl4ai）
+
+        Args:
+            browser_config: 瀏覽器設定，預設為無頭模式
+        """
+        self.browser_config = browser_config
+        self._crawler: Optional["AsyncWebCrawler"] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self.restart_count = 0
+        self.blocking_profiles: List[ResourceBlockProfile] = []
+
+    def add_blocking_profile(self, profile: ResourceBlockProfile):
+        """
+        註冊資源攔截設定（依頁面網域套用，重新啟動瀏覽器後仍然有效）
+
+        Args:
+            profile: 資源攔截設定
+        """
+        if profile not in self.blocking_profiles:
+            self.blocking_profiles.append(profile)
+
+    async def _on_page_context_created(self, page, context=None, config=None, **kwargs):
+        """crawl4ai hook：為符合網域的新頁面註冊資源攔截"""
+        url = getattr(config, "url", None)
+        for profile in self.blocking_profiles:
+            if profile.applies_to(url):
+                await profile.install(page)
+
+    def is_alive(self) -> bool:
+        """檢查瀏覽器是否仍在運作"""
+        if self._crawler is None or not self._crawler.ready:
+            return False
+        browser = self._crawler.crawler_strategy.browser_manager.browser
+        return browser is not None and browser.is_connected()
+
+    async def get_crawler(self) -> "AsyncWebCrawler":
+        """
+        取得可用的 crawler，必要時啟動或重新啟動瀏覽器
+
+        Returns:
+            已啟動的 AsyncWebCrawler 實例
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if not self.is_alive():
+                if self._crawler is not None:
+                    print("⚠ 瀏覽器連線中斷，重新啟動中...")
+                    await self._close_crawler()
+                    self.restart_count += 1
+                from crawl4ai import AsyncWebCrawler, BrowserConfig
+
+                if self.browser_config is None:
+                    self.browser_config = BrowserConfig(headless=True)
+                crawler = AsyncWebCrawler(config=self.browser_config)
+                crawler.crawler_strategy.set_hook(
+                    "on_page_context_created", self._on_page_context_created
+                )
+                await crawler.start()
+                self._crawler = crawler
+            return self._crawler
+
+    async def arun(self, url: str, config: "CrawlerRunConfig"):
+        """
+        使用長駐瀏覽器爬取網頁，瀏覽器中途當掉時重新啟動並重試一次
+
+        Args:
+            url: 目標網址
+            config: 爬蟲執行設定
+
+        Returns:
+            crawl4ai 的 CrawlResult
+        """
+        crawler = await self.get_crawler()
+        result = await crawler.arun(url=url, config=config)
+
+        if not result.success and not self.is_alive():
+            crawler = await self.get_crawler()
+            result = await crawler.arun(url=url, config=config)
+
+        return result
+
+    async def new_page(self, url: str):
+        """
+        在長駐瀏覽器中開啟一個由呼叫端自行管理的分頁（不會導航）
+
+        分頁使用 crawl4ai 的共用 context 與反偵測設定，並套用符合網域的
+        資源攔截設定；用完後由呼叫端關閉。
+
+        Args:
+            url: 之後要開啟的網址（用於選擇資源攔截設定）
+
+        Returns:
+            Playwright Page
+        """
+        from crawl4ai import CrawlerRunConfig
+
+        crawler = await self.get_crawler()
+        page, _ = await crawler.crawler_strategy.browser_manager.get_page(
+            CrawlerRunConfig(url=url)
+        )
+        for profile in self.blocking_profiles:
+            if profile.applies_to(url):
+                await profile.install(page)
+        return page
+
+    async def close(self):
+        """關閉瀏覽器並釋放資源（應用程式結束時呼叫）"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            await self._close_crawler()
+
+    async def _close_crawler(self):
+        """關閉目前的 crawler，忽略已中斷瀏覽器的關閉錯誤"""
+        if self._crawler is None:
+            return
+        try:
+            await self._crawler.close()
+        except Exception as e:
+            print(f"關閉瀏覽器時發生錯誤: {e}")
+        finally:
+            self._crawler = None
+
+
+_shared_manager: Optional[CrawlerManager] = None
+
+
+def get_shared_crawler_manager() -> CrawlerManager:
+    """
+    取得程序共用的瀏覽器管理器
+
+    搭配 crawl_common.runtime 的共用事件迴圈使用，
+    讓匯率與股票等不同工作共用同一個 Chromium。
+
+    Returns:
+        全域唯一的 CrawlerManager
+    """
+    global _shared_manager
+    if _shared_manager is None:
+        _shared_manager = CrawlerManager()
+    return _shared_manager
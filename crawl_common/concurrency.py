@@ -0,0 +1,180 @@
+"""
+自適應並行數控制模組
+
+以 AIMD（加性增加、乘性減少）依據頁面延遲、錯誤／逾時比例與記憶體用量
+動態調整同時爬取的數量，取代寫死的 asyncio.Semaphore。
+"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+try:
+    import psutil  # crawl4ai 的相依套件
+except ImportError:
+    psutil = None
+
+
+class AdaptiveLimiter:
+    """
+    AIMD 並行數控制器
+
+    - 成功且延遲低於目標：每完成一輪（約 limit 個請求）並行數加 1
+    - 延遲超過目標：並行數乘以 0.75
+    - 失敗或逾時：並行數減半
+    - 系統記憶體或 Chromium RSS 超過上限：減半且暫停增加
+
+    同一輪內只會減少一次，避免一次突發的錯誤把並行數降到最低。
+    控制器可跨多次更新重複使用，上一輪學到的並行數會沿用到下一輪。
+    """
+
+    def __init__(
+        self,
+        initial: int = 3,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        target_latency: float = 10.0,
+        memory_ceiling: float = 85.0,
+        rss_ceiling_mb: Optional[float] = None
+    ):
+        """
+        初始化控制器
+
+        Args:
+            initial: 初始並行數
+            min_limit: 最小並行數
+            max_limit: 最大並行數
+            target_latency: 目標單頁延遲（秒）
+            memory_ceiling: 系統記憶體使用率上限（百分比）
+            rss_ceiling_mb: 本程序與子程序（Chromium）的 RSS 上限（MB），None 表示不限制
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.memory_ceiling = memory_ceiling
+        self.rss_ceiling_mb = rss_ceiling_mb
+
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._last_decrease = 0.0
+        self._last_memory_check = 0.0
+        self._memory_pressure = False
+        self._memory_percent = 0.0
+        self._rss_mb = 0.0
+        self.begin_batch()
+
+    @property
+    def limit(self) -> int:
+        """目前的並行數上限"""
+        return max(self.min_limit, min(self.max_limit, math.floor(self._limit)))
+
+    def begin_batch(self):
+        """開始新的一輪更新，重設本輪統計"""
+        self._batch_started = time.monotonic()
+        self._completed = 0
+        self._errors = 0
+        self._timeouts = 0
+        self._latency_total = 0.0
+        self._peak_in_flight = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """取得一個並行名額，離開時釋放"""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def record(self, latency: float, success: bool, timeout: bool = False):
+        """
+        回報一次請求的結果，並據此調整並行數
+
+        應在 slot() 區塊內呼叫；離開區塊釋放名額時會喚醒等待中的請求。
+
+        Args:
+            latency: 請求耗時（秒）
+            success: 是否成功
+            timeout: 是否因逾時失敗
+        """
+        self._completed += 1
+        self._latency_total += latency
+        if timeout:
+            self._timeouts += 1
+        elif not success:
+            self._errors += 1
+
+        self._check_memory()
+
+        if self._memory_pressure:
+            self._decrease(0.5)
+        elif timeout or not success:
+            self._decrease(0.5)
+        elif latency > self.target_latency:
+            self._decrease(0.75)
+        else:
+            self._limit = min(self.max_limit, self._limit + 1 / max(self._limit, 1.0))
+
+    def _decrease(self, factor: float):
+        """乘性減少，同一輪（約一個目標延遲時間）內只減少一次"""
+        now = time.monotonic()
+        if now - self._last_decrease < self.target_latency:
+            return
+        self._last_decrease = now
+        self._limit = max(float(self.min_limit), self._limit * factor)
+
+    def _check_memory(self):
+        """每秒最多量測一次系統記憶體與 Chromium RSS"""
+        if psutil is None:
+            return
+        now = time.monotonic()
+        if now - self._last_memory_check < 1.0:
+            return
+        self._last_memory_check = now
+
+        self._memory_percent = psutil.virtual_memory().percent
+        pressure = self._memory_percent >= self.memory_ceiling
+
+        if self.rss_ceiling_mb is not None:
+            process = psutil.Process()
+            rss = process.memory_info().rss
+            for child in process.children(recursive=True):
+                try:
+                    rss += child.memory_info().rss
+                except psutil.Error:
+                    pass
+            self._rss_mb = rss / (1024 * 1024)
+            pressure = pressure or self._rss_mb >= self.rss_ceiling_mb
+
+        self._memory_pressure = pressure
+
+    def stats(self) -> Dict:
+        """
+        取得本輪統計
+
+        Returns:
+            包含並行數、峰值、平均延遲、錯誤數與記憶體資訊的字典
+        """
+        return {
+            "limit": self.limit,
+            "peak_in_flight": self._peak_in_flight,
+            "completed": self._completed,
+            "errors": self._errors,
+            "timeouts": self._timeouts,
+            "avg_latency": self._latency_total / self._completed if self._completed else 0.0,
+            "elapsed": time.monotonic() - self._batch_started,
+            "memory_percent": self._memory_percent,
+            "rss_mb": self._rss_mb,
+            "memory_pressure": self._memory_pressure,
+        }
@@ -0,0 +1,269 @@
+"""
+頁面內欄位提取
+
+將 JsonCssExtractionStrategy 使用的 schema 編譯成一段 JavaScript，
+透過 crawl4ai 的 js_code 在頁面內等待就緒條件後直接提取欄位，
+只把欄位 JSON 傳回 Python，不需要傳回整份 HTML 再由 BeautifulSoup 解析。
+也可編譯成監看腳本，以 MutationObserver 在欄位變動時只推送變動的欄位。
+"""
+
+import json
+from typing import Dict, List, Optional
+
+# 支援的欄位類型（computed 需要在 Python 端 eval，無法在頁面內執行）
+SUPPORTED_FIELD_TYPES = ("text", "attribute", "html", "regex", "nested", "list", "nested_list")
+
+# 輪詢就緒條件，逾時則直接返回
+_WAIT_JS = """
+const ready = __READY__;
+const deadline = Date.now() + __TIMEOUT_MS__;
+const isReady = () => {
+    try { return !!ready(); } catch (e) { return false; }
+};
+while (!isReady()) {
+    if (Date.now() >= deadline) {
+        return { timed_out: true, items: null };
+    }
+    await new Promise(resolve => setTimeout(resolve, __POLL_MS__));
+}
+"""
+
+# 頁面內的 schema 直譯器，與 JsonCssExtractionStrategy 的語意一致：
+# 文字為各文字節點去除前後空白後直接串接（同 BeautifulSoup get_text(strip=True)），
+# 找不到元素或值為 null 時使用 default，沒有值的欄位不放入結果。
+_INTERPRETER_JS = """
+const schema = __SCHEMA__;
+const SKIP_TEXT = new Set(['SCRIPT', 'STYLE', 'TEMPLATE']);
+const getText = (el) => {
+    const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+    const parts = [];
+    for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+        if (node.parentElement && SKIP_TEXT.has(node.parentElement.tagName)) continue;
+        const text = node.nodeValue.trim();
+        if (text) parts.push(text);
+    }
+    return parts.join('');
+};
+const pick = (value, field) => (value === null || value === undefined)
+    ? (field.default === undefined ? null : field.default)
+    : value;
+const transform = (value, name) => {
+    if (value === null || value === undefined) return value;
+    if (name === 'lowercase') return value.toLowerCase();
+    if (name === 'uppercase') return value.toUpperCase();
+    if (name === 'strip') return value.trim();
+    return value;
+};
+
+const single = (el, field) => {
+    let target = el;
+    if (field.selector) {
+        target = el.querySelector(field.selector);
+        if (!target) return pick(null, field);
+    }
+    let value = null;
+    if (field.type === 'text') {
+        value = getText(target);
+    } else if (field.type === 'attribute') {
+        value = target.getAttribute(field.attribute);
+    } else if (field.type === 'html') {
+        value = target.outerHTML;
+    } else if (field.type === 'regex') {
+        const match = new RegExp(field.pattern).exec(getText(target));
+        value = match ? match[1] : null;
+    }
+    if (field.transform) value = transform(value, field.transform);
+    return pick(value, field);
+};
+const listItem = (el, fields) => {
+    const item = {};
+    for (const field of fields) {
+        const value = single(el, field);
+        if (value !== null && value !== undefined) item[field.name] = value;
+    }
+    return item;
+};
+const extractField = (el, field) => {
+    try {
+        if (field.type === 'nested') {
+            const nested = el.querySelector(field.selector);
+            return nested ? extractItem(nested, field.fields) : {};
+        }
+        if (field.type === 'list') {
+            return Array.from(el.querySelectorAll(field.selector), child => listItem(child, field.fields));
+        }
+        if (field.type === 'nested_list') {
+            return Array.from(el.querySelectorAll(field.selector), child => extractItem(child, field.fields));
+        }
+        return single(el, field);
+    } catch (e) {
+        return field.default === undefined ? null : field.default;
+    }
+};
+const extractItem = (el, fields) => {
+    const item = {};
+    for (const field of fields) {
+        const value = extractField(el, field);
+        if (value !== null && value !== undefined) item[field.name] = value;
+    }
+    return item;
+};
+
+const extractAll = () => {
+    const items = [];
+    for (const base of document.querySelectorAll(schema.baseSelector)) {
+        const item = listItem(base, schema.baseFields || []);
+        Object.assign(item, extractItem(base, schema.fields));
+        if (Object.keys(item).length > 0) items.push(item);
+    }
+    return items;
+};
+"""
+
+# 監看第一筆結果：欄位變動時（合併短時間內的多次變動）只推送變動的欄位
+_WATCH_JS = """
+const firstItem = () => extractAll()[0] || {};
+let last = firstItem();
+let timer = null;
+const flush = () => {
+    timer = null;
+    const current = firstItem();
+    const changed = {};
+    for (const [key, value] of Object.entries(current)) {
+        if (JSON.stringify(value) !== JSON.stringify(last[key])) changed[key] = value;
+    }
+    last = current;
+    if (Object.keys(changed).length > 0) window[__BINDING__](JSON.stringify(changed));
+};
+if (window.__crawlLiveObserver) window.__crawlLiveObserver.disconnect();
+const observer = new MutationObserver(() => {
+    if (timer === null) timer = setTimeout(flush, __DEBOUNCE_MS__);
+});
+for (const el of document.querySelectorAll(__WATCH_SELECTOR__)) {
+    observer.observe(el, { childList: true, characterData: true, subtree: true });
+}
+window.__crawlLiveObserver = observer;
+return { timed_out: false, items: [last] };
+"""
+
+
+def _check_fields(fields: List[Dict]):
+    """檢查 schema 欄位類型是否可在頁面內執行"""
+    for field in fields:
+        field_type = field.get("type")
+        if field_type not in SUPPORTED_FIELD_TYPES:
+            raise ValueError(f"頁面內提取不支援欄位類型 {field_type!r}（欄位 {field.get('name')}）")
+        if "fields" in field:
+            _check_fields(field["fields"])
+
+
+def compile_schema_js(
+    schema: Dict,
+    ready_js: str = "() => true",
+    timeout_ms: int = 15000,
+    poll_ms: int = 100
+) -> str:
+    """
+    將提取 schema 編譯成可放入 CrawlerRunConfig.js_code 的 JavaScript
+
+    腳本會輪詢 ready_js 直到成立（取代 wait_for），接著在頁面內提取欄位，
+    返回 {"timed_out": bool, "items": [...]}。
+
+    Args:
+        schema: JsonCssExtractionStrategy 格式的 schema
+        ready_js: 就緒條件，為返回布林值的 JavaScript 函式運算式
+        timeout_ms: 等待就緒的逾時時間（毫秒）
+        poll_ms: 輪詢間隔（毫秒）
+
+    Returns:
+        JavaScript 程式碼（以 return 返回結果）
+
+    Raises:
+        ValueError: schema 含有無法在頁面內執行的欄位類型
+    """
+    return (
+        _compile_interpreter(schema)
+        + _compile_wait(ready_js, timeout_ms, poll_ms)
+        + "return { timed_out: false, items: extractAll() };\n"
+    )
+
+
+def compile_schema_watch_js(
+    schema: Dict,
+    binding: str,
+    watch_selector: str,
+    ready_js: str = "() => true",
+    timeout_ms: int = 15000,
+    poll_ms: int = 100,
+    debounce_ms: int = 50
+) -> str:
+    """
+    將提取 schema 編譯成監看腳本
+
+    腳本等待 ready_js 成立後提取第一筆結果，並在 watch_selector 對應的元素上
+    註冊 MutationObserver；之後欄位有變動時呼叫 window[binding]，
+    參數為只含變動欄位的 JSON 字串。重複執行會先解除舊的監看。
+
+    Args:
+        schema: JsonCssExtractionStrategy 格式的 schema
+        binding: 以 Playwright expose_function 註冊的函式名稱
+        watch_selector: 要監看的元素 CSS 選擇器
+        ready_js: 就緒條件，為返回布林值的 JavaScript 函式運算式
+        timeout_ms: 等待就緒的逾時時間（毫秒）
+        poll_ms: 輪詢間隔（毫秒）
+        debounce_ms: 合併變動的等待時間（毫秒）
+
+    Returns:
+        JavaScript 程式碼，返回 {"timed_out": bool, "items": [第一筆結果]}
+
+    Raises:
+        ValueError: schema 含有無法在頁面內執行的欄位類型
+    """
+    return (
+        _compile_interpreter(schema)
+        + _compile_wait(ready_js, timeout_ms, poll_ms)
+        + _WATCH_JS
+        .replace("__BINDING__", json.dumps(binding))
+        .replace("__WATCH_SELECTOR__", json.dumps(watch_selector))
+        .replace("__DEBOUNCE_MS__", str(int(debounce_ms)))
+    )
+
+
+def _compile_interpreter(schema: Dict) -> str:
+    """產生內嵌 schema 的直譯器程式碼"""
+    _check_fields(schema.get("baseFields", []))
+    _check_fields(schema["fields"])
+    return _INTERPRETER_JS.replace("__SCHEMA__", json.dumps(schema, ensure_ascii=False))
+
+
+def _compile_wait(ready_js: str, timeout_ms: int, poll_ms: int) -> str:
+    """產生等待就緒條件的程式碼"""
+    return (
+        _WAIT_JS
+        .replace("__READY__", ready_js)
+        .replace("__TIMEOUT_MS__", str(int(timeout_ms)))
+        .replace("__POLL_MS__", str(int(poll_ms)))
+    )
+
+
+def read_js_extraction(result) -> Dict:
+    """
+    從 crawl4ai 結果取出頁面內提取的資料
+
+    Args:
+        result: CrawlResult（js_code 只包含 compile_schema_js 產生的腳本）
+
+    Returns:
+        {"items": 提取結果列表或 None, "timed_out": 是否等待逾時, "error": 錯誤訊息或 None}
+    """
+    execution = getattr(result, "js_execution_result", None) or {}
+    scripts = execution.get("results") or []
+    payload: Optional[Dict] = scripts[0] if scripts and isinstance(scripts[0], dict) else None
+
+    if payload is None:
+        return {"items": None, "timed_out": False, "error": "頁面內提取沒有傳回結果"}
+    if payload.get("success") is False:
+        return {"items": None, "timed_out": False, "error": payload.get("error") or "腳本執行失敗"}
+    if payload.get("timed_out"):
+        return {"items": None, "timed_out": True, "error": "等待頁面就緒逾時"}
+    return {"items": payload.get("items") or [], "timed_out": False, "error": None}
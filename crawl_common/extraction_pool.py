@@ -0,0 +1,183 @@
+"""
+程序池結構化提取
+
+crawl4ai 的 JsonCssExtractionStrategy 在事件迴圈所在的程序中解析 HTML
+（再 json.dumps 成字串交給呼叫端 json.loads），大型頁面（台灣銀行牌告表格、
+完整的 wantgoo DOM）解析期間持有 GIL，其他進行中的爬取都會停頓。
+
+ExtractionExecutor 改為將 HTML 送到程序池，在工作程序中以預先編譯的 lxml schema
+（crawl_common.lxml_extraction，輸出與 JsonCssExtractionStrategy 相同）提取，
+直接傳回解析好的資料列表：
+
+- 小於 min_size 的內容直接在事件迴圈中處理（程序間傳輸的成本高於解析）
+- 統計事件迴圈內與程序池中花費的時間，以及等待程序池的額外時間（傳輸與排隊）
+- 程序池損壞時（工作程序意外結束）改在事件迴圈中處理，下一次重新建立程序池
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from crawl_common.lxml_extraction import compile_schema
+
+
+def _extract_in_worker(schema: Dict, html: Union[str, bytes]) -> Tuple[List[Dict], float]:
+    """工作程序：以編譯後的 schema 提取（每個工作程序各自快取編譯結果）"""
+    started = time.perf_counter()
+    data = compile_schema(schema).extract(html)
+    return data, time.perf_counter() - started
+
+
+def _loads_in_worker(text: Union[str, bytes]) -> Tuple[Any, float]:
+    """工作程序：解析 JSON"""
+    started = time.perf_counter()
+    data = json.loads(text)
+    return data, time.perf_counter() - started
+
+
+class ExtractionExecutor:
+    """將 HTML 提取與 JSON 解析送到程序池執行"""
+
+    def __init__(self, workers: Optional[int] = None, min_size: int = 50_000):
+        """
+        初始化執行器（第一次需要時才建立程序池）
+
+        Args:
+            workers: 工作程序數，預設為 CPU 核心數減一（至少 1，最多 4）
+            min_size: 送到程序池的最小內容長度（字元數），較小的內容直接在事件迴圈中處理
+        """
+        self.workers = workers or min(4, max(1, (os.cpu_count() or 2) - 1))
+        self.min_size = min_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "loop_tasks": 0,
+            "loop_seconds": 0.0,
+            "pool_tasks": 0,
+            "pool_seconds": 0.0,
+            "pool_wait_seconds": 0.0,
+            "pool_bytes": 0,
+            "pool_failures": 0,
+        }
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        """移除損壞的程序池（下一次使用時重新建立）"""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def _record(self, key: str, seconds: float, **extra):
+        with self._lock:
+            self._stats[f"{key}_tasks"] += 1
+            self._stats[f"{key}_seconds"] += seconds
+            for name, value in extra.items():
+                self._stats[name] += value
+
+    async def _run(self, func, *args, size: int):
+        """依內容大小選擇在事件迴圈或程序池中執行 func，返回 func 的結果"""
+        if size < self.min_size:
+            data, elapsed = func(*args)
+            self._record("loop", elapsed)
+            return data
+
+        pool = self._get_pool()
+        started = time.perf_counter()
+        try:
+            data, elapsed = await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+        except BrokenProcessPool:
+            print("⚠ 提取程序池已損壞，改在事件迴圈中處理並重新建立程序池")
+            self._discard_pool(pool)
+            with self._lock:
+                self._stats["pool_failures"] += 1
+            data, elapsed = func(*args)
+            self._record("loop", elapsed)
+            return data
+
+        self._record(
+            "pool", elapsed,
+            pool_wait_seconds=max(0.0, time.perf_counter() - started - elapsed),
+            pool_bytes=size
+        )
+        return data
+
+    async def extract(self, schema: Dict, html: Union[str, bytes]) -> List[Dict]:
+        """
+        以 schema 從 HTML 提取資料
+
+        Args:
+            schema: JsonCssExtractionStrategy 格式的 schema
+            html: 完整的 HTML 文件
+
+        Returns:
+            提取結果列表（格式與 JsonCssExtractionStrategy 相同）
+        """
+        return await self._run(_extract_in_worker, schema, html, size=len(html))
+
+    async def loads(self, text: Union[str, bytes]) -> Any:
+        """
+        解析 JSON
+
+        Args:
+            text: JSON 字串
+
+        Returns:
+            解析結果
+
+        Raises:
+            json.JSONDecodeError: 格式錯誤
+        """
+        return await self._run(_loads_in_worker, text, size=len(text))
+
+    def stats(self) -> Dict[str, float]:
+        """
+        執行統計
+
+        Returns:
+            包含 loop_tasks、loop_seconds（事件迴圈內的處理次數與秒數）、
+            pool_tasks、pool_seconds（程序池中的處理次數與秒數）、
+            pool_wait_seconds（等待程序池的額外秒數：傳輸與排隊）、
+            pool_bytes（送到程序池的內容長度）、pool_failures 的字典
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def shutdown(self):
+        """關閉程序池"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+_shared_executor: Optional[ExtractionExecutor] = None
+_shared_lock = threading.Lock()
+
+
+def get_extraction_executor() -> ExtractionExecutor:
+    """
+    取得程序共用的提取執行器
+
+    Returns:
+        全域唯一的 ExtractionExecutor
+    """
+    global _shared_executor
+    with _shared_lock:
+        if _shared_executor is None:
+            _shared_executor = ExtractionExecutor()
+        return _shared_executor
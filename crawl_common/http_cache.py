@@ -0,0 +1,290 @@
+"""
+磁碟 HTTP 快取
+
+- 每個網址記錄 ETag / Last-Modified 與內容雜湊，TTL 內直接使用磁碟上的內容，
+  過期後以 If-None-Match / If-Modified-Since 重新驗證，未變更時只需一個 304
+- 內容依 SHA-256 存放（content-addressed），提取結果依 (內容雜湊, schema 雜湊) 存放，
+  內容沒有變動時直接讀取上次的提取結果，不必重新解析 HTML
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from crawl_common.lxml_extraction import schema_hash
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "http"
+
+# 各網址前綴的 TTL（秒）；TTL 內不發出請求，之後每次都重新驗證
+DEFAULT_TTLS = {
+    "https://rate.bot.com.tw/": 60.0,
+}
+
+
+class CachedResponse:
+    """快取層回傳的回應"""
+
+    def __init__(self, url: str, body: bytes, encoding: str, body_hash: str, status: str):
+        """
+        Args:
+            url: 網址
+            body: 回應內容
+            encoding: 文字編碼
+            body_hash: 內容的 SHA-256
+            status: fresh（TTL 內未發出請求）、not_modified（304）、
+                unchanged（200 但內容相同）、changed（內容有變動）
+        """
+        self.url = url
+        self.body = body
+        self.encoding = encoding
+        self.body_hash = body_hash
+        self.status = status
+
+    @property
+    def text(self) -> str:
+        """解碼後的文字內容"""
+        return self.body.decode(self.encoding, errors="replace")
+
+    @property
+    def changed(self) -> bool:
+        """內容是否與上次不同"""
+        return self.status == "changed"
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomic(path: Path, data: bytes):
+    """先寫入暫存檔再置換，避免中斷時留下不完整的檔案"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+class HttpCache:
+    """
+    磁碟 HTTP 快取
+
+    目錄結構：
+        meta/<網址雜湊>.json            驗證標頭、內容雜湊與檢查時間
+        bodies/<內容雜湊>               回應內容
+        extracted/<內容雜湊>-<schema 雜湊>.json  提取結果
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = DEFAULT_CACHE_DIR,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 0.0
+    ):
+        """
+        Args:
+            cache_dir: 快取目錄
+            ttls: 網址前綴 -> TTL（秒），取最長相符的前綴
+            default_ttl: 沒有相符前綴時的 TTL（0 表示每次都重新驗證）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+
+    def ttl_for(self, url: str) -> float:
+        """
+        取得網址的 TTL
+
+        Args:
+            url: 網址
+
+        Returns:
+            TTL（秒）
+        """
+        matches = [prefix for prefix in self.ttls if url.startswith(prefix)]
+        if not matches:
+            return self.default_ttl
+        return self.ttls[max(matches, key=len)]
+
+    def _meta_path(self, url: str) -> Path:
+        return self.cache_dir / "meta" / f"{_sha256(url.encode('utf-8'))}.json"
+
+    def _body_path(self, body_hash: str) -> Path:
+        return self.cache_dir / "bodies" / body_hash
+
+    def _extracted_path(self, body_hash: str, schema_key: str) -> Path:
+        return self.cache_dir / "extracted" / f"{body_hash}-{schema_key}.json"
+
+    def _load_meta(self, url: str) -> Optional[Dict]:
+        """讀取網址的快取記錄，內容檔遺失時視為沒有快取"""
+        try:
+            meta = json.loads(self._meta_path(url).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or not self._body_path(meta.get("body_hash", "")).is_file():
+            return None
+        return meta
+
+    def _save_meta(self, meta: Dict):
+        _write_atomic(
+            self._meta_path(meta["url"]),
+            json.dumps(meta, ensure_ascii=False).encode("utf-8")
+        )
+
+    def _is_referenced(self, body_hash: str) -> bool:
+        """是否仍有網址的快取記錄指向此內容（相同內容的網址共用同一個內容檔）"""
+        for meta_path in self.cache_dir.glob("meta/*.json"):
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if meta.get("body_hash") == body_hash:
+                return True
+        return False
+
+    def _remove_content(self, body_hash: str):
+        """內容被取代後，刪除不再被任何網址使用的舊內容與其提取結果"""
+        if self._is_referenced(body_hash):
+            return
+        for path in [self._body_path(body_hash), *self.cache_dir.glob(f"extracted/{body_hash}-*.json")]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _cached_response(self, meta: Dict, status: str) -> CachedResponse:
+        body = self._body_path(meta["body_hash"]).read_bytes()
+        return CachedResponse(meta["url"], body, meta["encoding"], meta["body_hash"], status)
+
+    async def fetch(
+        self,
+        url: str,
+        client: httpx.AsyncClient,
+        ttl: Optional[float] = None
+    ) -> CachedResponse:
+        """
+        取得網址內容：TTL 內直接讀取磁碟，過期後發出條件式請求
+
+        Args:
+            url: 網址
+            client: HTTP 用戶端
+            ttl: 覆寫此網址的 TTL（秒），0 表示強制重新驗證
+
+        Returns:
+            CachedResponse
+
+        Raises:
+            httpx.HTTPError: 連線失敗或 HTTP 狀態碼錯誤
+        """
+        ttl = self.ttl_for(url) if ttl is None else ttl
+        meta = self._load_meta(url)
+        now = time.time()
+
+        if meta is not None and now - meta["checked_at"] < ttl:
+            return self._cached_response(meta, "fresh")
+
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = await client.get(url, headers=headers)
+
+        if response.status_code == 304 and meta is not None:
+            meta["checked_at"] = now
+            try:
+                self._save_meta(meta)
+            except OSError as e:
+                print(f"寫入 HTTP 快取失敗: {e}")
+            return self._cached_response(meta, "not_modified")
+
+        response.raise_for_status()
+        body = response.content
+        body_hash = _sha256(body)
+        old_hash = meta["body_hash"] if meta is not None else None
+
+        try:
+            if not self._body_path(body_hash).is_file():
+                _write_atomic(self._body_path(body_hash), body)
+            self._save_meta({
+                "url": url,
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "encoding": response.encoding or "utf-8",
+                "body_hash": body_hash,
+                "checked_at": now,
+            })
+            # 先更新此網址的記錄，再檢查舊內容是否仍被其他網址使用
+            if old_hash is not None and old_hash != body_hash:
+                self._remove_content(old_hash)
+        except OSError as e:
+            print(f"寫入 HTTP 快取失敗: {e}")
+        status = "unchanged" if body_hash == old_hash else "changed"
+        return CachedResponse(url, body, response.encoding or "utf-8", body_hash, status)
+
+    @staticmethod
+    def schema_key(schema: Dict) -> str:
+        """
+        計算 schema 的雜湊（提取結果的快取鍵）
+
+        Args:
+            schema: 提取 schema
+
+        Returns:
+            十六進位雜湊字串
+        """
+        return schema_hash(schema)
+
+    def load_extracted(self, body_hash: str, schema_key: str) -> Optional[List[Dict]]:
+        """
+        讀取相同內容與 schema 的提取結果
+
+        Args:
+            body_hash: 內容雜湊
+            schema_key: schema 雜湊
+
+        Returns:
+            提取結果，沒有快取時返回 None
+        """
+        try:
+            return json.loads(self._extracted_path(body_hash, schema_key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def save_extracted(self, body_hash: str, schema_key: str, data: List[Dict]):
+        """
+        儲存提取結果
+
+        Args:
+            body_hash: 內容雜湊
+            schema_key: schema 雜湊
+            data: 提取結果
+        """
+        try:
+            _write_atomic(
+                self._extracted_path(body_hash, schema_key),
+                json.dumps(data, ensure_ascii=False).encode("utf-8")
+            )
+        except OSError as e:
+            print(f"寫入提取結果快取失敗: {e}")
+
+
+_shared_cache: Optional[HttpCache] = None
+
+
+def get_http_cache() -> HttpCache:
+    """
+    取得程序共用的 HTTP 快取
+
+    Returns:
+        全域唯一的 HttpCache
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = HttpCache()
+    return _shared_cache
@@ -0,0 +1,194 @@
+"""
+共用 HTTP 用戶端與靜態頁面快速路徑
+
+伺服器端產生的頁面（例如台灣銀行牌告匯率）不需要瀏覽器：
+以連線池化的 httpx.AsyncClient 下載 HTML，再用預先編譯的 lxml schema 提取欄位，
+下載失敗、提取失敗或提取結果為空時才退回瀏覽器爬取。下載經過磁碟 HTTP 快取，
+內容未變動時不重新解析。下載失敗時退避重試；主機連續失敗時由斷路器
+暫停 HTTP 與瀏覽器請求。
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from crawl_common.http_cache import CachedResponse, get_http_cache
+from crawl_common.extraction_pool import get_extraction_executor
+from crawl_common.resilience import CircuitOpenError, RetryPolicy, call_with_retry, get_circuit_breaker
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/131.0 Safari/537.36"
+    ),
+    "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.8",
+}
+
+# httpx.AsyncClient 綁定在建立它的事件迴圈上，因此每個事件迴圈各有一個
+_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    取得目前事件迴圈共用的 HTTP 用戶端（保持連線以重複使用）
+
+    Returns:
+        httpx.AsyncClient
+    """
+    loop = asyncio.get_running_loop()
+    # 清掉已關閉事件迴圈的用戶端（例如 asyncio.run 結束後）
+    for stale in [other for other in _clients if other.is_closed()]:
+        del _clients[stale]
+
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+    return client
+
+
+async def close_http_client():
+    """關閉目前事件迴圈的 HTTP 用戶端（應用程式結束時呼叫）"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+# HTTP 快速路徑的重試策略（逾時、連線錯誤與 5xx）
+STATIC_RETRY_POLICY = RetryPolicy(max_retries=2, base_delay=0.5, max_delay=4.0)
+
+# 快取狀態的顯示文字
+CACHE_STATUS_LABELS = {
+    "fresh": "快取未過期",
+    "not_modified": "304 未變更",
+    "unchanged": "內容未變更",
+    "changed": "內容已更新",
+}
+
+
+async def fetch_static(url: str, schema: Dict, ttl: Optional[float] = None) -> Tuple[List[Dict], str]:
+    """
+    以 HTTP 下載頁面並以 lxml 提取欄位
+
+    經過磁碟 HTTP 快取：TTL 內不發出請求，過期後以條件式請求重新驗證；
+    內容雜湊與上次相同時直接使用上次的提取結果。
+
+    Args:
+        url: 網址
+        schema: JsonCssExtractionStrategy 格式的 schema
+        ttl: 覆寫此網址的快取 TTL（秒），0 表示強制重新驗證
+
+    Returns:
+        (提取結果列表（格式與 crawl4ai 相同）, 快取狀態)
+
+    Raises:
+        httpx.HTTPError: 連線失敗或 HTTP 狀態碼錯誤
+    """
+    response = await get_http_cache().fetch(url, get_http_client(), ttl)
+    return await extract_cached(response, schema), response.status
+
+
+async def extract_cached(response: CachedResponse, schema: Dict) -> List[Dict]:
+    """
+    以 schema 提取已下載的頁面（內容未變動時直接使用上次的提取結果）
+
+    Args:
+        response: HTTP 快取返回的回應
+        schema: JsonCssExtractionStrategy 格式的 schema
+
+    Returns:
+        提取結果列表（格式與 crawl4ai 相同）
+    """
+    cache = get_http_cache()
+    schema_key = cache.schema_key(schema)
+    data = cache.load_extracted(response.body_hash, schema_key)
+    if data is None:
+        # 大型頁面在程序池中解析，不阻塞其他進行中的爬取
+        data = await get_extraction_executor().extract(schema, response.text)
+        if data:
+            cache.save_extracted(response.body_hash, schema_key, data)
+    return data
+
+
+def print_extraction_stats():
+    """顯示提取在事件迴圈內與程序池中累計花費的時間"""
+    stats = get_extraction_executor().stats()
+    print(
+        f"提取：事件迴圈 {stats['loop_tasks']} 次 {stats['loop_seconds'] * 1000:.0f} ms，"
+        f"程序池 {stats['pool_tasks']} 次 {stats['pool_seconds'] * 1000:.0f} ms"
+        f"（傳輸與排隊 {stats['pool_wait_seconds'] * 1000:.0f} ms）"
+    )
+
+
+async def fetch_with_browser_fallback(
+    url: str,
+    schema: Dict,
+    browser_fetch: Callable[[], Awaitable[List[Dict]]],
+    ttl: Optional[float] = None
+) -> List[Dict]:
+    """
+    先走 HTTP 快速路徑，下載失敗、提取失敗或提取不到資料時再以瀏覽器爬取
+
+    Args:
+        url: 網址
+        schema: JsonCssExtractionStrategy 格式的 schema
+        browser_fetch: 瀏覽器備援，返回與 crawl4ai 相同格式的提取結果
+        ttl: 覆寫此網址的快取 TTL（秒），0 表示強制重新驗證
+
+    Returns:
+        提取結果列表
+
+    Raises:
+        CircuitOpenError: 主機連續失敗，斷路器開啟中（不送出任何請求）
+    """
+    started = time.perf_counter()
+    breaker = get_circuit_breaker(url)
+    data: Optional[List[Dict]] = None
+    response: Optional[CachedResponse] = None
+    # 只有下載經過重試與斷路器；解析失敗是頁面內容的問題，不是主機故障
+    try:
+        response = await call_with_retry(
+            lambda: get_http_cache().fetch(url, get_http_client(), ttl),
+            STATIC_RETRY_POLICY, breaker, label="HTTP 快速路徑"
+        )
+    except CircuitOpenError:
+        raise
+    except httpx.HTTPError as e:
+        # 重試後斷路器已開啟時，瀏覽器也不再送出請求
+        breaker.check()
+        print(f"⚠ HTTP 快速路徑失敗，改用瀏覽器: {e}")
+
+    if response is not None:
+        try:
+            data = await extract_cached(response, schema)
+        except Exception as e:
+            # 解析錯誤、頁面結構改變或程序池損壞：與下載失敗相同，改用瀏覽器
+            print(f"⚠ HTTP 快速路徑提取失敗，改用瀏覽器: {e}")
+
+    if data:
+        print(
+            f"✓ HTTP 快速路徑完成（{(time.perf_counter() - started) * 1000:.0f} ms，"
+            f"{CACHE_STATUS_LABELS[response.status]}）"
+        )
+        print_extraction_stats()
+        return data
+
+    if data is not None:
+        print("⚠ HTTP 快速路徑沒有提取到資料，改用瀏覽器")
+    try:
+        data = await browser_fetch()
+    except asyncio.CancelledError:
+        breaker.record_cancelled()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    print_extraction_stats()
+    return data
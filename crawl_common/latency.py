@@ -0,0 +1,147 @@
+"""
+延遲統計與對沖請求（hedged request）判斷
+
+每個鍵（例如股票代碼）保留最近的延遲樣本，計算滾動 p50/p95。
+單次請求超過該鍵的 p95 仍未完成時，可再送出一個對沖請求，取先完成者；
+對沖請求數以比例上限控制，避免系統整體變慢時請求量倍增。
+"""
+
+import math
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """
+    計算百分位數（最近秩法）
+
+    Args:
+        samples: 樣本（不需排序，不可為空）
+        q: 百分位（0–100）
+
+    Returns:
+        百分位數
+    """
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class LatencyTracker:
+    """各鍵的滾動延遲統計"""
+
+    def __init__(
+        self,
+        window: int = 20,
+        min_samples: int = 5,
+        min_hedge_delay: float = 1.0,
+        hedge_ratio: float = 0.1
+    ):
+        """
+        Args:
+            window: 每個鍵保留的樣本數
+            min_samples: 計算百分位數所需的最少樣本數，不足時改用所有鍵的樣本
+            min_hedge_delay: 對沖前最少等待秒數
+            hedge_ratio: 對沖請求數占請求數的上限比例
+        """
+        self.window = window
+        self.min_samples = min_samples
+        self.min_hedge_delay = min_hedge_delay
+        self.hedge_ratio = hedge_ratio
+
+        self._samples: Dict[str, Deque[float]] = {}
+        self._overall: Deque[float] = deque(maxlen=window * 10)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def record(self, key: str, latency: float):
+        """
+        記錄一次成功請求的延遲
+
+        Args:
+            key: 鍵
+            latency: 秒數
+        """
+        self._samples.setdefault(key, deque(maxlen=self.window)).append(latency)
+        self._overall.append(latency)
+
+    def _samples_for(self, key: str) -> List[float]:
+        samples = self._samples.get(key)
+        if samples is not None and len(samples) >= self.min_samples:
+            return list(samples)
+        if len(self._overall) >= self.min_samples:
+            return list(self._overall)
+        return []
+
+    def p50(self, key: str) -> Optional[float]:
+        """
+        鍵的延遲中位數（樣本不足時為所有鍵的中位數）
+
+        Args:
+            key: 鍵
+
+        Returns:
+            秒數，沒有足夠樣本時返回 None
+        """
+        samples = self._samples_for(key)
+        return percentile(samples, 50) if samples else None
+
+    def p95(self, key: str) -> Optional[float]:
+        """
+        鍵的延遲 p95（樣本不足時為所有鍵的 p95）
+
+        Args:
+            key: 鍵
+
+        Returns:
+            秒數，沒有足夠樣本時返回 None
+        """
+        samples = self._samples_for(key)
+        return percentile(samples, 95) if samples else None
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        """
+        送出對沖請求前要等待的秒數
+
+        每次請求開始時呼叫一次（同時計入請求數）。
+
+        Args:
+            key: 鍵
+
+        Returns:
+            秒數，沒有足夠樣本時返回 None（不對沖）
+        """
+        self.requests += 1
+        p95 = self.p95(key)
+        if p95 is None:
+            return None
+        return max(self.min_hedge_delay, p95)
+
+    def try_hedge(self) -> bool:
+        """
+        是否允許再送出一個對沖請求（允許時計入對沖數）
+
+        Returns:
+            對沖請求數未超過比例上限時為 True
+        """
+        if self.hedges + 1 > max(1.0, self.requests * self.hedge_ratio):
+            return False
+        self.hedges += 1
+        return True
+
+    def stats(self) -> Dict[str, float]:
+        """
+        整體統計
+
+        Returns:
+            包含 p50、p95（所有鍵，沒有樣本時為 0）、requests、hedges、hedge_wins 的字典
+        """
+        overall = list(self._overall)
+        return {
+            "p50": percentile(overall, 50) if overall else 0.0,
+            "p95": percentile(overall, 95) if overall else 0.0,
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
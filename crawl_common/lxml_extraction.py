@@ -0,0 +1,380 @@
+"""
+lxml 結構化提取
+
+將 JsonCssExtractionStrategy 格式的 schema 預先驗證並編譯：每個 CSS 選擇器只在編譯時
+轉換成一次 lxml XPath，直接從 HTTP 取得的 HTML 提取欄位，不需要啟動瀏覽器，
+輸出的資料結構與 crawl4ai 的 JsonCssExtractionStrategy 相同。
+
+- 編譯結果依 schema 內容的雜湊快取，相同內容的 schema 在程序中只編譯一次
+- 子孫選取直接編譯成 descendant:: 軸，單值欄位只取第一個符合的元素（[1]），
+  不需要在 Python 中過濾元素本身或建立完整的比對列表
+- 一份 HTML 只解析一次，多個 schema 可共用同一棵解析樹（parse_html + extract_tree）
+"""
+
+import hashlib
+import json
+import re
+from typing import Dict, List, Optional, Union
+
+from cssselect import SelectorError
+from cssselect import parse as parse_css
+from cssselect.parser import CombinedSelector
+from lxml import etree
+from lxml import html as lxml_html
+from lxml.cssselect import LxmlTranslator
+
+# 支援的欄位類型
+FIELD_TYPES = ("text", "attribute", "html", "regex", "nested", "list", "nested_list")
+
+# 需要子欄位與選擇器的欄位類型
+COMPOSITE_TYPES = ("nested", "list", "nested_list")
+
+# BeautifulSoup 將這些元素內（以最內層的為準）的字串視為特殊型別，
+# get_text 只取與元素本身相同型別的字串：一般元素不含其中的文字，這些元素本身則只含自己的文字
+STRING_CONTAINER_TAGS = frozenset(("rt", "rp", "style", "script", "template"))
+# 其中可以包含子元素的（script、style 的內容為純文字）
+NESTING_CONTAINER_TAGS = ("rt", "rp", "template")
+
+# BeautifulSoup 以列表返回的多值屬性
+MULTI_VALUED_ATTRIBUTES = {
+    "*": ("class", "accesskey", "dropzone"),
+    "a": ("rel", "rev"),
+    "link": ("rel", "rev"),
+    "td": ("headers",),
+    "th": ("headers",),
+    "form": ("accept-charset",),
+    "object": ("archive",),
+    "area": ("rel",),
+    "icon": ("sizes",),
+    "iframe": ("sandbox",),
+    "output": ("for",),
+}
+
+_translator = LxmlTranslator()
+
+
+def element_text(element, scan_ancestors: bool = True) -> str:
+    """
+    取得元素文字：各文字片段去除前後空白後直接串接（同 get_text(strip=True)）
+
+    Args:
+        element: lxml 元素
+        scan_ancestors: 是否檢查元素是否位於 rt、rp、template 內；
+            文件中沒有這些元素時可略過（script、style 不會有子元素）
+
+    Returns:
+        元素文字
+    """
+    tags = STRING_CONTAINER_TAGS
+    target = element.tag if element.tag in tags else None
+    container = target
+    if container is None and scan_ancestors:
+        ancestor = next(element.iterancestors(*NESTING_CONTAINER_TAGS), None)
+        container = ancestor.tag if ancestor is not None else None
+
+    parts: List[str] = []
+
+    def walk(node, container):
+        if node.text and container == target:
+            parts.append(node.text)
+        for child in node:
+            if isinstance(child.tag, str):
+                walk(child, child.tag if child.tag in tags else container)
+            if child.tail and container == target:
+                parts.append(child.tail)
+
+    walk(element, container)
+    return "".join(text.strip() for text in parts if text.strip())
+
+
+def element_attribute(element, attribute: str):
+    """
+    取得元素屬性（多值屬性與 BeautifulSoup 相同，返回字串列表）
+
+    Args:
+        element: lxml 元素
+        attribute: 屬性名稱
+
+    Returns:
+        屬性值，不存在時返回 None
+    """
+    value = element.get(attribute)
+    if value is None:
+        return None
+    if attribute in MULTI_VALUED_ATTRIBUTES["*"] or attribute in MULTI_VALUED_ATTRIBUTES.get(element.tag, ()):
+        return value.split()
+    return value
+
+
+def parse_html(html: Union[str, bytes]):
+    """
+    解析 HTML 文件
+
+    使用一般的 etree 元素（與 lxml.html 相同的 libxml2 解析樹），
+    省去 lxml.html 每次建立元素物件時在 Python 中查詢元素類別的成本。
+
+    Args:
+        html: 完整的 HTML 文件
+
+    Returns:
+        根元素，無法解析時返回 None
+    """
+    try:
+        try:
+            return etree.fromstring(html, etree.HTMLParser())
+        except ValueError:
+            # 含有 XML 編碼宣告的字串需以位元組解析
+            if not isinstance(html, str):
+                raise
+            return etree.fromstring(html.encode("utf-8"), etree.HTMLParser())
+    except (etree.XMLSyntaxError, ValueError):
+        return None
+
+
+def _compile_xpath(selector: str, prefix: str, first: bool = False) -> etree.XPath:
+    """將 CSS 選擇器轉換並編譯成 XPath（first 時只取文件順序的第一個）"""
+    expression = _translator.css_to_xpath(selector, prefix=prefix)
+    if first:
+        parsed = parse_css(selector)
+        if len(parsed) == 1 and not isinstance(parsed[0].parsed_tree, CombinedSelector):
+            # 單一步驟（沒有組合子）：位置條件直接加在步驟上，找到第一個就停止
+            expression = f"{expression}[1]"
+        else:
+            expression = f"({expression})[1]"
+    return etree.XPath(expression)
+
+
+def validate_schema(schema: Dict):
+    """
+    檢查 schema 結構（編譯前呼叫一次）
+
+    Args:
+        schema: JsonCssExtractionStrategy 格式的 schema
+
+    Raises:
+        ValueError: 缺少必要欄位或欄位類型不支援
+    """
+    if not isinstance(schema.get("baseSelector"), str) or not schema["baseSelector"].strip():
+        raise ValueError("schema 缺少 baseSelector")
+    if not isinstance(schema.get("fields"), list):
+        raise ValueError("schema 缺少 fields 列表")
+
+    def check_fields(fields: List[Dict], path: str):
+        for field in fields:
+            name = field.get("name")
+            where = f"{path}{name}" if name else f"{path}(未命名)"
+            if not name:
+                raise ValueError(f"欄位 {where} 缺少 name")
+            if field.get("type") not in FIELD_TYPES:
+                raise ValueError(f"不支援的欄位類型 {field.get('type')!r}（欄位 {where}）")
+            if field["type"] == "attribute" and not field.get("attribute"):
+                raise ValueError(f"attribute 欄位 {where} 缺少 attribute")
+            if field["type"] == "regex" and not field.get("pattern"):
+                raise ValueError(f"regex 欄位 {where} 缺少 pattern")
+            if field["type"] in COMPOSITE_TYPES:
+                if not field.get("selector"):
+                    raise ValueError(f"{field['type']} 欄位 {where} 缺少 selector")
+                if not isinstance(field.get("fields"), list):
+                    raise ValueError(f"{field['type']} 欄位 {where} 缺少 fields 列表")
+                check_fields(field["fields"], f"{where}.")
+
+    check_fields(schema.get("baseFields", []), "")
+    check_fields(schema["fields"], "")
+
+
+class CompiledField:
+    """編譯後的單一欄位（含巢狀欄位）"""
+
+    __slots__ = (
+        "name", "type", "default", "attribute", "pattern", "transform",
+        "first", "all", "fields",
+    )
+
+    def __init__(self, field: Dict):
+        """
+        編譯欄位的選擇器與 regex
+
+        Args:
+            field: schema 中的欄位定義（已通過 validate_schema）
+
+        Raises:
+            ValueError: 選擇器語法錯誤或不支援
+        """
+        self.name = field["name"]
+        self.type = field["type"]
+        self.default = field.get("default")
+        self.attribute = field.get("attribute")
+        self.transform = field.get("transform")
+        self.pattern = re.compile(field["pattern"]) if field.get("pattern") else None
+
+        # 與 BeautifulSoup select 相同：只選取子孫，不含元素本身
+        selector = field.get("selector")
+        try:
+            self.first = _compile_xpath(selector, "descendant::", first=True) if selector else None
+            self.all = _compile_xpath(selector, "descendant::") if selector else None
+        except (SelectorError, etree.XPathSyntaxError) as e:
+            raise ValueError(f"欄位 {self.name} 的選擇器 {selector!r} 無法編譯: {e}") from e
+        self.fields = [CompiledField(child) for child in field.get("fields", [])]
+
+    def extract(self, element, scan_ancestors: bool = True):
+        """提取欄位，發生例外時使用 default"""
+        try:
+            if self.type == "nested":
+                matches = self.first(element)
+                return _extract_item(matches[0], self.fields, scan_ancestors) if matches else {}
+            if self.type == "list":
+                return [_extract_list_item(match, self.fields, scan_ancestors) for match in self.all(element)]
+            if self.type == "nested_list":
+                return [_extract_item(match, self.fields, scan_ancestors) for match in self.all(element)]
+            return self.extract_single(element, scan_ancestors)
+        except Exception:
+            return self.default
+
+    def extract_single(self, element, scan_ancestors: bool = True):
+        """提取單值欄位（scan_ancestors 見 element_text）"""
+        if self.first is not None:
+            matches = self.first(element)
+            if not matches:
+                return self.default
+            element = matches[0]
+
+        value = None
+        if self.type == "text":
+            value = element_text(element, scan_ancestors)
+        elif self.type == "attribute":
+            value = element_attribute(element, self.attribute)
+        elif self.type == "html":
+            value = lxml_html.tostring(element, encoding="unicode", with_tail=False)
+        elif self.type == "regex":
+            match = self.pattern.search(element_text(element, scan_ancestors))
+            value = match.group(1) if match else None
+
+        if self.transform == "lowercase":
+            value = value.lower()
+        elif self.transform == "uppercase":
+            value = value.upper()
+        elif self.transform == "strip":
+            value = value.strip()
+
+        return value if value is not None else self.default
+
+
+def _extract_list_item(element, fields: List[CompiledField], scan_ancestors: bool) -> Dict:
+    """list 欄位的項目：只提取單值欄位"""
+    item = {}
+    for field in fields:
+        value = field.extract_single(element, scan_ancestors)
+        if value is not None:
+            item[field.name] = value
+    return item
+
+
+def _extract_item(element, fields: List[CompiledField], scan_ancestors: bool) -> Dict:
+    """提取一個項目的所有欄位"""
+    item = {}
+    for field in fields:
+        value = field.extract(element, scan_ancestors)
+        if value is not None:
+            item[field.name] = value
+    return item
+
+
+class CompiledSchema:
+    """
+    預先編譯的提取 schema
+
+    選擇器只在建立時編譯一次，之後每次 extract 只需解析 HTML 與套用 XPath。
+    支援 text、attribute、html、regex、nested、list、nested_list 欄位類型。
+    """
+
+    def __init__(self, schema: Dict):
+        """
+        驗證並編譯 schema
+
+        Args:
+            schema: JsonCssExtractionStrategy 格式的 schema
+
+        Raises:
+            ValueError: schema 結構錯誤、含有不支援的欄位類型或選擇器無法編譯
+        """
+        validate_schema(schema)
+        self.schema = schema
+        try:
+            self._base = _compile_xpath(schema["baseSelector"], "descendant-or-self::")
+        except (SelectorError, etree.XPathSyntaxError) as e:
+            raise ValueError(f"baseSelector {schema['baseSelector']!r} 無法編譯: {e}") from e
+        self._base_fields = [CompiledField(field) for field in schema.get("baseFields", [])]
+        self._fields = [CompiledField(field) for field in schema["fields"]]
+
+    def extract(self, html: Union[str, bytes]) -> List[Dict]:
+        """
+        從 HTML 提取資料
+
+        Args:
+            html: 完整的 HTML 文件
+
+        Returns:
+            提取結果列表（沒有任何欄位的項目不列入）
+        """
+        root = parse_html(html)
+        return self.extract_tree(root) if root is not None else []
+
+    def extract_tree(self, root) -> List[Dict]:
+        """
+        從已解析的文件提取資料（同一份 HTML 套用多個 schema 時只需解析一次）
+
+        Args:
+            root: parse_html 返回的根元素
+
+        Returns:
+            提取結果列表（沒有任何欄位的項目不列入）
+        """
+        results = []
+        for element in self._base(root):
+            # 項目內外都沒有 rt、rp、template 時，取得文字不需要逐一檢查祖先元素
+            scan_ancestors = (
+                next(element.iter(*NESTING_CONTAINER_TAGS), None) is not None
+                or next(element.iterancestors(*NESTING_CONTAINER_TAGS), None) is not None
+            )
+            item = _extract_list_item(element, self._base_fields, scan_ancestors)
+            item.update(_extract_item(element, self._fields, scan_ancestors))
+            if item:
+                results.append(item)
+        return results
+
+
+def schema_hash(schema: Dict) -> str:
+    """
+    計算 schema 內容的雜湊（與欄位順序以外的鍵順序無關）
+
+    Args:
+        schema: JsonCssExtractionStrategy 格式的 schema
+
+    Returns:
+        十六進位雜湊字串
+    """
+    canonical = json.dumps(schema, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+_compiled_cache: Dict[str, CompiledSchema] = {}
+
+
+def compile_schema(schema: Dict) -> CompiledSchema:
+    """
+    取得編譯後的 schema（相同內容的 schema 只驗證與編譯一次）
+
+    Args:
+        schema: JsonCssExtractionStrategy 格式的 schema
+
+    Returns:
+        CompiledSchema
+
+    Raises:
+        ValueError: schema 結構錯誤或選擇器無法編譯
+    """
+    key = schema_hash(schema)
+    compiled: Optional[CompiledSchema] = _compiled_cache.get(key)
+    if compiled is None:
+        compiled = _compiled_cache[key] = CompiledSchema(schema)
+    return compiled
@@ -0,0 +1,257 @@
+"""
+匯率快照
+
+爬取到的牌告匯率列（字串字典）在進入應用程式時只正規化一次：
+幣別代碼、數值化的買入／賣出匯率（numpy 陣列欄位）、可交易遮罩，
+以及依幣別查詢的索引。之後的表格、下拉選單與換算都直接讀取快照。
+
+批次換算使用預先計算的交叉匯率矩陣（含台幣），
+外幣換外幣以台幣為中介：先以本行買入換成台幣，再以本行賣出換成目標幣別。
+"""
+
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 暫停交易的顯示文字
+SUSPENDED_TEXT = "暫停交易"
+
+# 台幣（交叉匯率矩陣的最後一列／欄）的代碼與別名
+TWD_CODE = "TWD"
+TWD_ALIASES = frozenset((TWD_CODE, "NTD", "新台幣", "台幣", "新臺幣", "臺幣"))
+
+_CODE_PATTERN = re.compile(r"\(([A-Z]{3})\)")
+
+
+def parse_rate(text: str) -> float:
+    """
+    將匯率字串轉為數值
+
+    Args:
+        text: 匯率字串（可能為空字串或 "-"）
+
+    Returns:
+        匯率，無法轉換時返回 NaN
+    """
+    try:
+        return float(text.replace(",", ""))
+    except (AttributeError, ValueError):
+        return float("nan")
+
+
+class RateSnapshot:
+    """
+    某一時間點的匯率快照
+
+    Attributes:
+        currencies: 幣別顯示名稱，例如 "美金 (USD)"
+        codes: 幣別代碼，例如 "USD"
+        buy: 本行即期買入（float64，暫停交易為 NaN）
+        sell: 本行即期賣出（float64，暫停交易為 NaN）
+        tradable: 買入與賣出都有報價的遮罩
+        quoted: 買入或賣出至少一個有報價的遮罩
+        fetched_at: 取得時間
+    """
+
+    def __init__(
+        self,
+        currencies: List[str],
+        codes: List[str],
+        buy_text: List[str],
+        sell_text: List[str],
+        fetched_at: Optional[datetime] = None
+    ):
+        """
+        建立快照（一般使用 from_rows）
+
+        Args:
+            currencies: 幣別顯示名稱
+            codes: 幣別代碼
+            buy_text: 本行即期買入原始字串
+            sell_text: 本行即期賣出原始字串
+            fetched_at: 取得時間，預設為現在
+        """
+        self.currencies = currencies
+        self.codes = codes
+        self.buy_text = buy_text
+        self.sell_text = sell_text
+        self.buy = np.array([parse_rate(text) for text in buy_text], dtype=np.float64)
+        self.sell = np.array([parse_rate(text) for text in sell_text], dtype=np.float64)
+        self.tradable = ~(np.isnan(self.buy) | np.isnan(self.sell))
+        self.quoted = ~(np.isnan(self.buy) & np.isnan(self.sell))
+        self.fetched_at = fetched_at or datetime.now()
+
+        # 幣別名稱與代碼都可查詢
+        self.index: Dict[str, int] = {}
+        for i, (currency, code) in enumerate(zip(currencies, codes)):
+            self.index[currency] = i
+            if code:
+                self.index.setdefault(code, i)
+
+        self._cross_rates: Optional[np.ndarray] = None
+        self._quoted_currencies: Optional[List[str]] = None
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, str]], fetched_at: Optional[datetime] = None) -> "RateSnapshot":
+        """
+        從爬蟲結果建立快照
+
+        Args:
+            rows: 含 "幣別"、"本行即期買入"、"本行即期賣出" 的字典列表
+            fetched_at: 取得時間，預設為現在
+
+        Returns:
+            RateSnapshot（略過沒有幣別的列）
+        """
+        currencies, codes, buy_text, sell_text = [], [], [], []
+        for row in rows:
+            currency = (row.get("幣別") or "").strip()
+            if not currency:
+                continue
+            match = _CODE_PATTERN.search(currency)
+            currencies.append(currency)
+            codes.append(match.group(1) if match else "")
+            buy_text.append((row.get("本行即期買入") or "").strip())
+            sell_text.append((row.get("本行即期賣出") or "").strip())
+        return cls(currencies, codes, buy_text, sell_text, fetched_at)
+
+    def __len__(self) -> int:
+        return len(self.currencies)
+
+    def lookup(self, currency: str) -> Optional[int]:
+        """
+        依幣別名稱或代碼取得列索引
+
+        Args:
+            currency: 幣別名稱（"美金 (USD)"）或代碼（"USD"）
+
+        Returns:
+            列索引，找不到時返回 None
+        """
+        return self.index.get(currency)
+
+    def rates(self, currency: str) -> Optional[Tuple[float, float]]:
+        """
+        取得幣別的 (買入, 賣出) 匯率
+
+        Args:
+            currency: 幣別名稱或代碼
+
+        Returns:
+            (買入, 賣出)，找不到幣別時返回 None；暫停交易的欄位為 NaN
+        """
+        i = self.lookup(currency)
+        if i is None:
+            return None
+        return float(self.buy[i]), float(self.sell[i])
+
+    def tradable_currencies(self) -> List[str]:
+        """
+        可交易（買入與賣出都有報價）的幣別名稱
+
+        Returns:
+            幣別名稱列表（維持原始順序）
+        """
+        return [self.currencies[i] for i in np.flatnonzero(self.tradable)]
+
+    def quoted_currencies(self) -> List[str]:
+        """
+        買入或賣出至少一個有報價的幣別名稱（只計算一次）
+
+        Returns:
+            幣別名稱列表（維持原始順序）
+        """
+        if self._quoted_currencies is None:
+            self._quoted_currencies = [self.currencies[i] for i in np.flatnonzero(self.quoted)]
+        return self._quoted_currencies
+
+    def display_rows(self) -> List[Tuple[str, str, str]]:
+        """
+        表格顯示用的列，空值顯示為「暫停交易」
+
+        Returns:
+            (幣別, 買入, 賣出) 列表
+        """
+        return [
+            (currency, buy or SUSPENDED_TEXT, sell or SUSPENDED_TEXT)
+            for currency, buy, sell in zip(self.currencies, self.buy_text, self.sell_text)
+        ]
+
+    def matrix_labels(self) -> List[str]:
+        """
+        交叉匯率矩陣的列／欄標籤（幣別代碼，最後一個為台幣）
+
+        Returns:
+            標籤列表
+        """
+        return [code or currency for currency, code in zip(self.currencies, self.codes)] + [TWD_CODE]
+
+    def cross_rates(self) -> np.ndarray:
+        """
+        交叉匯率矩陣（只計算一次）
+
+        matrix[i, j] 為 1 單位幣別 i 可換得的幣別 j 數量：
+        以本行買入將 i 換成台幣，再以本行賣出換成 j；台幣的買入與賣出皆為 1。
+        同幣別為 1，暫停交易的幣別為 NaN。
+
+        Returns:
+            (N+1) x (N+1) 的 float64 矩陣，順序同 matrix_labels()
+        """
+        if self._cross_rates is None:
+            buy = np.append(self.buy, 1.0)
+            sell = np.append(self.sell, 1.0)
+            matrix = buy[:, np.newaxis] / sell[np.newaxis, :]
+            np.fill_diagonal(matrix, 1.0)
+            self._cross_rates = matrix
+        return self._cross_rates
+
+    def _matrix_index(self, currency: str) -> int:
+        """幣別在交叉匯率矩陣中的索引，找不到時返回 -1"""
+        if currency in TWD_ALIASES or currency.upper() in TWD_ALIASES:
+            return len(self)
+        i = self.lookup(currency)
+        if i is None:
+            i = self.lookup(currency.upper())
+        return -1 if i is None else i
+
+    def indices(self, currencies: Sequence[str]) -> np.ndarray:
+        """
+        將幣別欄位轉為交叉匯率矩陣的索引（每個不同的幣別只查詢一次）
+
+        Args:
+            currencies: 幣別名稱或代碼（可含 "TWD"）
+
+        Returns:
+            intp 陣列，找不到的幣別為 -1
+        """
+        values = np.asarray([str(currency).strip() for currency in currencies], dtype=str)
+        if values.size == 0:
+            return np.empty(0, dtype=np.intp)
+        unique, inverse = np.unique(values, return_inverse=True)
+        mapped = np.array([self._matrix_index(currency) for currency in unique], dtype=np.intp)
+        return mapped[inverse.reshape(-1)]
+
+    def convert(
+        self,
+        amounts: np.ndarray,
+        source_indices: np.ndarray,
+        target_indices: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        批次換算（向量化）
+
+        Args:
+            amounts: 原幣金額
+            source_indices: 原幣別索引（indices() 的結果）
+            target_indices: 目標幣別索引（indices() 的結果）
+
+        Returns:
+            (使用的匯率, 換算金額)，幣別找不到或暫停交易時為 NaN
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        valid = (source_indices >= 0) & (target_indices >= 0)
+        rates = np.full(amounts.shape, np.nan)
+        rates[valid] = self.cross_rates()[source_indices[valid], target_indices[valid]]
+        return rates, amounts * rates
@@ -0,0 +1,197 @@
+"""
+提前更新（refresh-ahead）的程序共用快取
+
+資料在到期前由背景事件迴圈上的工作主動重新取得（stale-while-revalidate）：
+讀取永遠直接返回目前的資料，不會因為快取過期而等待爬蟲；
+只有程序啟動後第一次載入完成前，讀取才需要等待。
+手動更新只標記這一份資料並觸發一次背景更新，不影響其他快取。
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from crawl_common.runtime import AsyncRuntime, get_runtime
+from crawl_common.single_flight import SingleFlight, get_single_flight
+
+
+class RefreshAheadCache:
+    """
+    單一資料的提前更新快取
+
+    載入透過 SingleFlight 以 key 合併，同一時間最多只有一個載入工作，
+    期間的更新請求（包含第一次載入前同時到達的讀取）都共用它。
+    載入失敗時保留舊資料，於 retry_interval 秒後重試。
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[bool], Awaitable[Any]],
+        ttl: float,
+        refresh_ahead: float = 0.8,
+        retry_interval: float = 30.0,
+        name: str = "快取",
+        key: Optional[str] = None,
+        runtime: Optional[AsyncRuntime] = None,
+        flights: Optional[SingleFlight] = None
+    ):
+        """
+        Args:
+            loader: 載入資料的 coroutine 函數，參數為是否強制重新取得（略過 HTTP 快取）
+            ttl: 資料有效秒數，超過後仍會返回舊資料但標記為過期
+            refresh_ahead: 經過 ttl 的多少比例後開始背景更新
+            retry_interval: 載入失敗後的重試間隔（秒）
+            name: 顯示於訊息的名稱
+            key: 合併載入工作的資源名稱，預設同 name
+            runtime: 執行載入的背景事件迴圈，預設為程序共用的執行環境
+            flights: 請求合併器，預設為程序共用的合併器
+        """
+        self.loader = loader
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.retry_interval = retry_interval
+        self.name = name
+        self.key = key or name
+        self.runtime = runtime or get_runtime()
+        self.flights = flights or get_single_flight()
+
+        self._lock = threading.Lock()
+        self._value: Any = None
+        self._has_value = False
+        self._fetched_at: Optional[float] = None
+        self._last_error: Optional[Exception] = None
+        self._last_attempt_at: Optional[float] = None
+        self._force_next = False
+        self._maintainer: Optional[Future] = None
+        self._refresh_count = 0
+
+    def start(self):
+        """啟動背景更新工作並開始第一次載入（重複呼叫無作用）"""
+        with self._lock:
+            if self._maintainer is not None and not self._maintainer.done():
+                return
+            self._maintainer = self.runtime.submit(self._maintain_loop())
+
+    def stop(self):
+        """停止背景更新工作"""
+        with self._lock:
+            maintainer, self._maintainer = self._maintainer, None
+        if maintainer is not None:
+            maintainer.cancel()
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """
+        取得資料（已有資料時立即返回，即使已過期）
+
+        Args:
+            timeout: 尚未有資料時最長等待秒數，None 表示不限
+
+        Returns:
+            最近一次成功載入的資料
+
+        Raises:
+            Exception: 第一次載入失敗時拋出載入的例外
+        """
+        with self._lock:
+            if self._has_value:
+                return self._value
+        self.refresh().result(timeout=timeout)
+        with self._lock:
+            return self._value
+
+    def refresh(self) -> Future:
+        """
+        觸發背景載入（已有載入中的工作時共用它）
+
+        Returns:
+            載入工作的 Future
+        """
+        return self.flights.submit(self.key, self._start_load)
+
+    def _start_load(self):
+        """建立載入工作（只有實際發出載入時才會被呼叫）"""
+        with self._lock:
+            force, self._force_next = self._force_next, False
+        return self._load(force)
+
+    def invalidate(self):
+        """
+        手動更新：強制重新取得這一份資料
+
+        在背景執行，完成前讀取仍返回舊資料；
+        已有載入中的工作時，等它完成後再強制載入一次。
+        """
+        with self._lock:
+            self._force_next = True
+        if not self.flights.in_flight(self.key):
+            self.refresh()
+
+    async def _load(self, force_refresh: bool) -> Any:
+        """執行載入並更新資料（失敗時保留舊資料）"""
+        started = time.time()
+        with self._lock:
+            self._last_attempt_at = started
+        try:
+            value = await self.loader(force_refresh)
+        except Exception as e:
+            with self._lock:
+                self._last_error = e
+            print(f"✗ {self.name}背景更新失敗: {e}")
+            raise
+
+        with self._lock:
+            self._value = value
+            self._has_value = True
+            self._fetched_at = time.time()
+            self._last_error = None
+            self._refresh_count += 1
+        print(f"✓ {self.name}背景更新完成（{time.time() - started:.1f} 秒）")
+        return value
+
+    def _next_refresh_at(self) -> float:
+        """下一次背景更新的時間"""
+        with self._lock:
+            if self._force_next:
+                return 0.0
+            if self._last_error is not None and self._last_attempt_at is not None:
+                return self._last_attempt_at + self.retry_interval
+            if self._fetched_at is None:
+                return 0.0
+            return self._fetched_at + self.ttl * self.refresh_ahead
+
+    async def _maintain_loop(self):
+        """在到期前持續更新資料"""
+        while True:
+            delay = self._next_refresh_at() - time.time()
+            if delay > 0:
+                # 手動更新會改變下一次更新時間，因此最多睡 1 秒就重新計算
+                await asyncio.sleep(min(delay, 1.0))
+                continue
+            try:
+                await asyncio.wrap_future(self.refresh())
+            except Exception:
+                pass  # 已於 _load 記錄，依 retry_interval 重試
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        取得快取狀態
+
+        Returns:
+            包含 fetched_at（時間戳記）、age（秒）、stale（是否超過 ttl）、
+            refreshing（是否載入中）、last_error、refresh_count、
+            joins（加入進行中載入的次數）的字典
+        """
+        joins = self.flights.stats(self.key).get(self.key, {}).get("joins", 0)
+        with self._lock:
+            age = time.time() - self._fetched_at if self._fetched_at is not None else None
+            return {
+                "fetched_at": self._fetched_at,
+                "age": age,
+                "stale": age is None or age > self.ttl,
+                "refreshing": self.flights.in_flight(self.key),
+                "last_error": self._last_error,
+                "refresh_count": self._refresh_count,
+                "joins": joins,
+            }
@@ -0,0 +1,383 @@
+"""
+失敗分類、退避重試、斷路器與負向快取
+
+- 失敗分為逾時、HTTP 錯誤、提取結果為空、JSON 解析錯誤與其他錯誤，
+  只有可能自行恢復的失敗（逾時、HTTP、JSON、其他）才重試，間隔以指數退避加上隨機抖動
+- 每個主機一個斷路器：連續失敗達門檻後開啟，期間直接失敗不送出請求，
+  冷卻後放行一個試探請求，成功才關閉
+- 負向快取：同一個鍵（例如股票代碼）連續多次提取結果為空時（下市、選擇器失效），
+  在有效期限內直接略過
+"""
+
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+from urllib.parse import urlparse
+
+import httpx
+
+T = TypeVar("T")
+
+# 失敗類型
+FAILURE_TIMEOUT = "timeout"
+FAILURE_HTTP = "http"
+FAILURE_EMPTY = "empty"
+FAILURE_JSON = "json"
+FAILURE_ERROR = "error"
+
+FAILURE_LABELS = {
+    FAILURE_TIMEOUT: "逾時",
+    FAILURE_HTTP: "HTTP 錯誤",
+    FAILURE_EMPTY: "提取結果為空",
+    FAILURE_JSON: "JSON 解析錯誤",
+    FAILURE_ERROR: "其他錯誤",
+}
+
+
+class CircuitOpenError(Exception):
+    """主機的斷路器開啟中，未送出請求"""
+
+    def __init__(self, host: str, retry_in: float):
+        """
+        Args:
+            host: 主機名稱
+            retry_in: 距離放行試探請求的秒數
+        """
+        super().__init__(f"{host} 連續失敗，暫停請求 {retry_in:.0f} 秒")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def classify_exception(error: BaseException) -> str:
+    """
+    將例外分類為失敗類型
+
+    Args:
+        error: 例外
+
+    Returns:
+        FAILURE_* 之一
+    """
+    if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException)):
+        return FAILURE_TIMEOUT
+    if isinstance(error, httpx.HTTPError):
+        return FAILURE_HTTP
+    if isinstance(error, ValueError) and "JSON" in type(error).__name__:
+        return FAILURE_JSON
+    if "timeout" in str(error).lower():
+        return FAILURE_TIMEOUT
+    return FAILURE_ERROR
+
+
+class RetryPolicy:
+    """指數退避重試策略"""
+
+    def __init__(
+        self,
+        max_retries: int = 2,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        retry_on=(FAILURE_TIMEOUT, FAILURE_HTTP, FAILURE_JSON, FAILURE_ERROR)
+    ):
+        """
+        Args:
+            max_retries: 最多重試次數（不含第一次）
+            base_delay: 第一次重試前的等待秒數
+            max_delay: 等待秒數上限
+            retry_on: 要重試的失敗類型
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = frozenset(retry_on)
+
+    def should_retry(self, failure: str, attempt: int) -> bool:
+        """
+        是否重試
+
+        Args:
+            failure: 失敗類型
+            attempt: 已經嘗試的次數（第一次失敗後為 1）
+
+        Returns:
+            失敗類型可重試且未超過次數時為 True
+        """
+        return failure in self.retry_on and attempt <= self.max_retries
+
+    def delay(self, attempt: int) -> float:
+        """
+        第 attempt 次失敗後的等待秒數（full jitter，避免多個請求同時重試）
+
+        Args:
+            attempt: 已經嘗試的次數
+
+        Returns:
+            秒數
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+async def call_with_retry(
+    func: Callable[[], Awaitable[T]],
+    policy: RetryPolicy,
+    breaker: Optional["CircuitBreaker"] = None,
+    label: str = "請求"
+) -> T:
+    """
+    呼叫 coroutine 函數，失敗時依策略退避重試
+
+    Args:
+        func: 每次嘗試時呼叫，失敗時拋出例外
+        policy: 重試策略
+        breaker: 主機的斷路器，每次嘗試前檢查並回報結果
+        label: 顯示於訊息的名稱
+
+    Returns:
+        func 的回傳值
+
+    Raises:
+        CircuitOpenError: 斷路器開啟中
+        Exception: 不可重試或重試次數用盡時拋出最後一次的例外
+    """
+    attempt = 0
+    while True:
+        if breaker is not None:
+            breaker.check()
+        attempt += 1
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            if breaker is not None:
+                breaker.record_cancelled()
+            raise
+        except Exception as e:
+            failure = classify_exception(e)
+            # 4xx 代表請求本身有問題，不算主機故障也不重試
+            client_error = (
+                isinstance(e, httpx.HTTPStatusError) and e.response.status_code < 500
+            )
+            if breaker is not None and client_error:
+                # 主機有回應：視為成功（half_open 時關閉斷路器並釋放試探請求）
+                breaker.record_success()
+            retry = not client_error and policy.should_retry(failure, attempt)
+            # 一次呼叫只計一次主機失敗（重試用盡或不可重試時），
+            # 避免單一壞掉的請求靠重試就開啟整個主機的斷路器；
+            # half_open 的試探請求失敗則立即回報（重新開啟）
+            if breaker is not None and not client_error and (
+                not retry or breaker.state != CircuitBreaker.CLOSED
+            ):
+                breaker.record_failure()
+            breaker_open = breaker is not None and breaker.state == CircuitBreaker.OPEN
+            if not retry or breaker_open:
+                raise
+            delay = policy.delay(attempt)
+            print(f"⚠ {label}失敗（{FAILURE_LABELS[failure]}），{delay:.1f} 秒後重試（第 {attempt} 次）: {e}")
+            await asyncio.sleep(delay)
+            continue
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+
+class CircuitBreaker:
+    """
+    單一主機的斷路器
+
+    closed（正常）→ 連續失敗 failure_threshold 次 → open（直接失敗）
+    → 經過 recovery_timeout 秒 → half_open（放行一個試探請求）
+    → 成功則 closed，失敗則再次 open
+
+    試探請求被取消（例如整體更新逾時）時以 record_cancelled 回報，視為失敗；
+    未回報的試探請求超過 recovery_timeout 秒時視為遺失，再放行一個試探請求。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, host: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        """
+        Args:
+            host: 主機名稱
+            failure_threshold: 開啟前的連續失敗次數
+            recovery_timeout: 開啟後到放行試探請求的秒數
+        """
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started_at = 0.0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """
+        是否允許送出請求（half_open 時只放行一個試探請求）
+
+        Returns:
+            允許時為 True
+        """
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self._opened_at >= self.recovery_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if (
+            self.state == self.HALF_OPEN and self._probe_in_flight
+            and now - self._probe_started_at >= self.recovery_timeout
+        ):
+            # 試探請求一直沒有回報結果（被取消或遺失），不再等待
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            self._probe_started_at = now
+            return True
+        self.rejected += 1
+        return False
+
+    def check(self):
+        """
+        不允許送出請求時拋出例外
+
+        Raises:
+            CircuitOpenError: 斷路器開啟中
+        """
+        if not self.allow():
+            retry_in = max(0.0, self._opened_at + self.recovery_timeout - time.monotonic())
+            raise CircuitOpenError(self.host, retry_in)
+
+    def record_success(self):
+        """回報請求成功"""
+        if self.state != self.CLOSED:
+            print(f"✓ {self.host} 已恢復，關閉斷路器")
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        """回報請求失敗（主機層級的失敗，例如逾時、連線或 5xx 錯誤）"""
+        self._failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or (
+            self.state == self.CLOSED and self._failures >= self.failure_threshold
+        ):
+            if self.state == self.CLOSED:
+                print(f"⚠ {self.host} 連續失敗 {self._failures} 次，暫停請求 {self.recovery_timeout:.0f} 秒")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def record_cancelled(self):
+        """
+        回報請求在完成前被取消
+
+        half_open 時被取消的是試探請求，視為失敗並重新開啟（冷卻後再試探）；
+        closed 時不計入失敗，避免整體逾時一次取消多個請求就開啟斷路器。
+        """
+        if self.state == self.HALF_OPEN:
+            self.record_failure()
+
+    def stats(self) -> Dict:
+        """
+        斷路器狀態
+
+        Returns:
+            包含 state、failures、rejected 的字典
+        """
+        return {"state": self.state, "failures": self._failures, "rejected": self.rejected}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(url: str) -> CircuitBreaker:
+    """
+    取得網址所屬主機的共用斷路器
+
+    Args:
+        url: 網址
+
+    Returns:
+        該主機的 CircuitBreaker
+    """
+    host = urlparse(url).hostname or url
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = CircuitBreaker(host)
+    return breaker
+
+
+class NegativeCache:
+    """連續提取不到資料的鍵，在有效期限內略過"""
+
+    def __init__(self, threshold: int = 3, ttl: float = 1800.0):
+        """
+        Args:
+            threshold: 連續幾次提取結果為空後開始略過
+            ttl: 略過的有效秒數，到期後再試一次
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self._empty_counts: Dict[str, int] = {}
+        self._blocked_until: Dict[str, float] = {}
+        self.skipped = 0
+
+    def is_blocked(self, key: str) -> bool:
+        """
+        是否略過此鍵（到期時移除，讓下一次請求重新確認）
+
+        Args:
+            key: 鍵
+
+        Returns:
+            仍在有效期限內時為 True
+        """
+        until = self._blocked_until.get(key)
+        if until is None:
+            return False
+        if time.monotonic() >= until:
+            del self._blocked_until[key]
+            # 到期後只再試一次，仍為空就立即再次略過
+            self._empty_counts[key] = self.threshold - 1
+            return False
+        self.skipped += 1
+        return True
+
+    def record_empty(self, key: str):
+        """
+        回報提取結果為空
+
+        Args:
+            key: 鍵
+        """
+        count = self._empty_counts.get(key, 0) + 1
+        self._empty_counts[key] = count
+        if count >= self.threshold:
+            self._blocked_until[key] = time.monotonic() + self.ttl
+            print(f"⚠ {key} 連續 {count} 次提取不到資料，{self.ttl / 60:.0f} 分鐘內略過")
+
+    def record_success(self, key: str):
+        """
+        回報成功取得資料
+
+        Args:
+            key: 鍵
+        """
+        self._empty_counts.pop(key, None)
+        self._blocked_until.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        負向快取統計
+
+        Returns:
+            包含 blocked（略過中的鍵數）、skipped（累計略過次數）的字典
+        """
+        now = time.monotonic()
+        return {
+            "blocked": sum(1 for until in self._blocked_until.values() if until > now),
+            "skipped": self.skipped,
+        }
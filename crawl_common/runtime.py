@@ -0,0 +1,118 @@
+"""
+共用的背景 asyncio 執行環境
+
+整個程序只建立一個常駐的 daemon 執行緒與一個事件迴圈，
+GUI（tkinter）或 Streamlit 透過 submit() 將 coroutine 丟到此迴圈執行，
+不必每次更新都重新建立執行緒與事件迴圈，也能讓多個工作同時共用同一個瀏覽器。
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Coroutine, Optional
+
+
+class AsyncRuntime:
+    """常駐背景事件迴圈"""
+
+    def __init__(self, name: str = "crawl-runtime"):
+        """
+        初始化執行環境（第一次使用時才啟動執行緒）
+
+        Args:
+            name: 背景執行緒名稱
+        """
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """取得背景事件迴圈，尚未啟動時自動啟動"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._start()
+            return self._loop
+
+    def _start(self):
+        """建立事件迴圈並在 daemon 執行緒中持續運作"""
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+            loop.close()
+
+        self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._loop = loop
+
+    def in_runtime_thread(self) -> bool:
+        """目前是否在背景事件迴圈的執行緒中"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(
+        self,
+        coro: Coroutine,
+        callback: Optional[Callable[[Future], Any]] = None
+    ) -> Future:
+        """
+        將 coroutine 丟到背景事件迴圈執行
+
+        Args:
+            coro: 要執行的 coroutine
+            callback: 完成時呼叫的函數，參數為 Future（在背景執行緒中被呼叫，
+                      更新 GUI 時請透過 queue 或 after() 轉回主執行緒）
+
+        Returns:
+            concurrent.futures.Future，可用 result() 等待結果
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        if callback is not None:
+            future.add_done_callback(callback)
+        return future
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """
+        在背景事件迴圈執行 coroutine 並阻塞等待結果
+
+        Args:
+            coro: 要執行的 coroutine
+            timeout: 最長等待秒數，None 表示不限
+
+        Returns:
+            coroutine 的回傳值
+        """
+        if self.in_runtime_thread():
+            raise RuntimeError("不可在背景事件迴圈的執行緒中呼叫 run()，請改用 await")
+        return self.submit(coro).result(timeout=timeout)
+
+    def stop(self):
+        """停止背景事件迴圈（應用程式結束時呼叫）"""
+        with self._lock:
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+            self._thread = None
+
+
+_runtime: Optional[AsyncRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> AsyncRuntime:
+    """
+    取得程序共用的背景執行環境
+
+    Returns:
+        全域唯一的 AsyncRuntime
+    """
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AsyncRuntime()
+        return _runtime
@@ -0,0 +1,330 @@
+"""
+多程序分片爬取
+
+單一事件迴圈只能使用一個 CPU 核心，而 DOM 序列化與 JSON 提取都是 CPU 密集的工作。
+ShardPool 將股票代碼依雜湊分配到多個工作程序，每個工作程序有自己的事件迴圈與瀏覽器：
+
+- 協調端（ShardPool.run）把每個分片送到對應工作程序的任務佇列，
+  工作程序每完成一支股票就放入共用的結果佇列，協調端立即轉交給 on_result
+- 同一支股票總是分配到同一個工作程序，延遲統計與負向快取得以沿用
+- 工作程序意外結束時自動重新啟動，並重新送出該分片尚未完成的股票，
+  本輪更新不會因此遺失；重新啟動超過次數上限的分片視為失敗
+
+工作程序以 spawn 方式啟動（Windows 與 macOS 的預設），進入點函數必須可在模組層級匯入。
+"""
+
+import asyncio
+import multiprocessing
+import queue
+import threading
+import time
+import zlib
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+# 任務佇列訊息（協調端 -> 工作程序）
+MSG_FETCH = "fetch"
+MSG_CANCEL = "cancel"
+MSG_STOP = "stop"
+
+# 結果佇列訊息（工作程序 -> 協調端）
+MSG_RESULT = "result"
+MSG_DONE = "done"
+
+# 每支股票完成時呼叫，參數為 (股票代碼, 資料或 None)
+ShardCallback = Callable[[str, Optional[Dict]], None]
+
+
+def partition_codes(stock_codes: List[str], shards: int) -> List[List[str]]:
+    """
+    依股票代碼的雜湊分配到各分片（同一支股票總是分配到同一個分片）
+
+    Args:
+        stock_codes: 股票代碼列表（依優先順序，各分片內維持原順序）
+        shards: 分片數
+
+    Returns:
+        每個分片的股票代碼列表（可能為空）
+    """
+    parts: List[List[str]] = [[] for _ in range(shards)]
+    for code in stock_codes:
+        parts[zlib.crc32(code.encode("utf-8")) % shards].append(code)
+    return parts
+
+
+async def serve_shard(
+    worker_id: int,
+    task_queue,
+    result_queue,
+    fetch: Callable[[List[str], ShardCallback], Awaitable[None]]
+):
+    """
+    工作程序的主迴圈：依任務佇列執行分片，將每支股票的結果放入結果佇列
+
+    Args:
+        worker_id: 工作程序編號
+        task_queue: 此工作程序的任務佇列
+        result_queue: 所有工作程序共用的結果佇列
+        fetch: 爬取一個分片的 coroutine 函數，每支股票完成時呼叫 on_result
+    """
+    loop = asyncio.get_running_loop()
+    parent = multiprocessing.parent_process()
+    jobs: Dict[int, asyncio.Task] = {}
+
+    async def run_job(job_id: int, stock_codes: List[str]):
+        try:
+            await fetch(
+                stock_codes,
+                lambda code, data: result_queue.put((MSG_RESULT, job_id, worker_id, code, data))
+            )
+        except Exception as e:
+            print(f"✗ 工作程序 {worker_id} 爬取失敗: {e}")
+        finally:
+            jobs.pop(job_id, None)
+            result_queue.put((MSG_DONE, job_id, worker_id, None, None))
+
+    def next_message():
+        # 定期檢查主程序是否仍在執行，主程序異常結束時工作程序跟著結束
+        while True:
+            try:
+                return task_queue.get(timeout=1.0)
+            except queue.Empty:
+                if parent is not None and not parent.is_alive():
+                    return (MSG_STOP,)
+
+    while True:
+        message = await loop.run_in_executor(None, next_message)
+        kind = message[0]
+        if kind == MSG_STOP:
+            break
+        if kind == MSG_FETCH:
+            _, job_id, stock_codes = message
+            jobs[job_id] = asyncio.ensure_future(run_job(job_id, stock_codes))
+        elif kind == MSG_CANCEL:
+            task = jobs.get(message[1])
+            if task is not None:
+                task.cancel()
+
+    for task in list(jobs.values()):
+        task.cancel()
+    await asyncio.gather(*jobs.values(), return_exceptions=True)
+
+
+class _ShardJob:
+    """一次分片更新的狀態（只在協調端的事件迴圈中存取）"""
+
+    def __init__(self, job_id: int, on_result: ShardCallback):
+        self.job_id = job_id
+        self.on_result = on_result
+        # 工作程序編號 -> 分片的股票（依優先順序）與尚未回報的股票
+        self.shards: Dict[int, List[str]] = {}
+        self.outstanding: Dict[int, Set[str]] = {}
+        # 工作程序編號 -> 送出時的工作程序世代（重新啟動後需要重新送出）
+        self.generations: Dict[int, int] = {}
+        self.resends: Dict[int, int] = {}
+        self.changed = asyncio.Event()
+
+    def report(self, worker_id: int, stock_code: str, stock_data: Optional[Dict]):
+        codes = self.outstanding.get(worker_id)
+        if codes is None or stock_code not in codes:
+            return  # 重複或已放棄的結果
+        codes.discard(stock_code)
+        self.on_result(stock_code, stock_data)
+        self.changed.set()
+
+    def fail_worker(self, worker_id: int):
+        """將工作程序尚未回報的股票視為失敗"""
+        for code in [code for code in self.shards.get(worker_id, ()) if code in self.outstanding[worker_id]]:
+            self.report(worker_id, code, None)
+
+    @property
+    def finished(self) -> bool:
+        return not any(self.outstanding.values())
+
+
+class ShardPool:
+    """
+    分片爬取的工作程序池
+
+    所有方法都必須在同一個（長駐的）事件迴圈中呼叫，stop 除外。
+    """
+
+    def __init__(
+        self,
+        worker_main: Callable,
+        workers: int,
+        max_restarts: int = 2,
+        name: str = "分片爬取"
+    ):
+        """
+        初始化工作程序池（第一次 run 時才啟動工作程序）
+
+        Args:
+            worker_main: 工作程序進入點，參數為 (worker_id, task_queue, result_queue)，
+                通常以 asyncio.run(serve_shard(...)) 實作；必須可在模組層級匯入
+            workers: 工作程序數
+            max_restarts: 每次更新中每個分片最多重新送出幾次
+            name: 顯示於訊息的名稱
+        """
+        self.worker_main = worker_main
+        self.workers = workers
+        self.max_restarts = max_restarts
+        self.name = name
+
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: List[Optional[multiprocessing.process.BaseProcess]] = [None] * workers
+        self._task_queues: List[Optional[multiprocessing.Queue]] = [None] * workers
+        self._generations = [0] * workers
+        self._result_queue: Optional[multiprocessing.Queue] = None
+        self._reader: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped = threading.Event()
+        self._jobs: Dict[int, _ShardJob] = {}
+        self._next_job_id = 0
+        self.restarts = 0
+
+    def _start_worker(self, worker_id: int):
+        """啟動（或重新啟動）工作程序；使用新的任務佇列，避免新程序收到舊任務"""
+        task_queue = self._context.Queue()
+        process = self._context.Process(
+            target=self.worker_main,
+            args=(worker_id, task_queue, self._result_queue),
+            name=f"{self.name}-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        self._processes[worker_id] = process
+        self._task_queues[worker_id] = task_queue
+        self._generations[worker_id] += 1
+
+    def _start(self):
+        """啟動所有工作程序與結果讀取執行緒"""
+        self._result_queue = self._context.Queue()
+        for worker_id in range(self.workers):
+            self._start_worker(worker_id)
+        self._reader = threading.Thread(target=self._read_results, name=f"{self.name}-reader", daemon=True)
+        self._reader.start()
+        print(f"✓ {self.name}：啟動 {self.workers} 個工作程序")
+
+    def _read_results(self):
+        """背景執行緒：讀取結果佇列並轉交到協調端的事件迴圈"""
+        while not self._stopped.is_set():
+            try:
+                message = self._result_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            self._loop.call_soon_threadsafe(self._dispatch, message)
+
+    def _dispatch(self, message):
+        kind, job_id, worker_id, stock_code, stock_data = message
+        job = self._jobs.get(job_id)
+        if job is None:
+            return  # 已結束（逾時取消）的更新
+        if kind == MSG_RESULT:
+            job.report(worker_id, stock_code, stock_data)
+        elif kind == MSG_DONE and job.generations.get(worker_id) == self._generations[worker_id]:
+            # 分片已結束但沒有回報的股票（例如爬取時發生例外）視為失敗
+            job.fail_worker(worker_id)
+            job.changed.set()
+
+    def _send(self, job: _ShardJob, worker_id: int):
+        """將分片尚未完成的股票送到工作程序（維持優先順序）"""
+        job.generations[worker_id] = self._generations[worker_id]
+        outstanding = job.outstanding[worker_id]
+        codes = [code for code in job.shards[worker_id] if code in outstanding]
+        self._task_queues[worker_id].put((MSG_FETCH, job.job_id, codes))
+
+    def _check_workers(self, job: _ShardJob):
+        """重新啟動已結束的工作程序，並重新送出本次更新受影響的分片"""
+        for worker_id, codes in job.outstanding.items():
+            if not codes:
+                continue
+            process = self._processes[worker_id]
+            if not process.is_alive():
+                print(
+                    f"⚠ {self.name}：工作程序 {worker_id} 已結束（結束代碼 {process.exitcode}），重新啟動"
+                )
+                self.restarts += 1
+                self._start_worker(worker_id)
+            if job.generations[worker_id] == self._generations[worker_id]:
+                continue
+
+            # 分片送出後工作程序曾重新啟動（可能由其他更新觸發），尚未完成的股票重新送出
+            job.resends[worker_id] = job.resends.get(worker_id, 0) + 1
+            if job.resends[worker_id] > self.max_restarts:
+                print(f"✗ {self.name}：分片 {worker_id} 重新送出超過 {self.max_restarts} 次，{len(codes)} 支股票視為失敗")
+                job.fail_worker(worker_id)
+            else:
+                self._send(job, worker_id)
+
+    async def run(self, stock_codes: List[str], on_result: ShardCallback):
+        """
+        將股票分片到各工作程序爬取，依完成順序回報結果
+
+        每支股票都會呼叫一次 on_result（失敗時資料為 None）；
+        被取消時（例如整體更新逾時）通知工作程序停止該次更新。
+
+        Args:
+            stock_codes: 股票代碼列表
+            on_result: 每支股票完成時呼叫，參數為 (股票代碼, 資料或 None)
+        """
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            await self._loop.run_in_executor(None, self._start)
+
+        self._next_job_id += 1
+        job = _ShardJob(self._next_job_id, on_result)
+        self._jobs[job.job_id] = job
+        for worker_id, codes in enumerate(partition_codes(stock_codes, self.workers)):
+            if codes:
+                job.shards[worker_id] = codes
+                job.outstanding[worker_id] = set(codes)
+                self._send(job, worker_id)
+
+        try:
+            while not job.finished:
+                job.changed.clear()
+                try:
+                    await asyncio.wait_for(job.changed.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+                self._check_workers(job)
+        finally:
+            del self._jobs[job.job_id]
+            if not job.finished:
+                for worker_id, codes in job.outstanding.items():
+                    if codes and self._processes[worker_id].is_alive():
+                        self._task_queues[worker_id].put((MSG_CANCEL, job.job_id))
+
+    def stats(self) -> Dict[str, int]:
+        """
+        工作程序池統計
+
+        Returns:
+            包含 workers、alive、restarts 的字典
+        """
+        return {
+            "workers": self.workers,
+            "alive": sum(1 for process in self._processes if process is not None and process.is_alive()),
+            "restarts": self.restarts,
+        }
+
+    def stop(self, timeout: float = 10.0):
+        """
+        通知工作程序關閉瀏覽器並結束（可從任何執行緒呼叫）
+
+        Args:
+            timeout: 等待所有工作程序結束的秒數，超過時強制結束
+        """
+        self._stopped.set()
+        for process, task_queue in zip(self._processes, self._task_queues):
+            if process is not None and process.is_alive():
+                task_queue.put((MSG_STOP,))
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
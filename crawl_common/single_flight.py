@@ -0,0 +1,174 @@
+"""
+單一飛行（single-flight）請求合併
+
+以資源名稱（例如 "bot-rates"、"stock:2330"）為鍵：
+某個資源正在取得時，之後到達的呼叫者直接加入同一個工作並取得相同的結果，
+不會再發出一次爬取。可從任何執行緒或背景事件迴圈中呼叫。
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from crawl_common.runtime import AsyncRuntime, get_runtime
+
+
+class SingleFlight:
+    """依資源名稱合併同時進行的取得工作"""
+
+    def __init__(self, runtime: Optional[AsyncRuntime] = None):
+        """
+        Args:
+            runtime: 執行工作的背景事件迴圈，預設為程序共用的執行環境
+        """
+        self.runtime = runtime or get_runtime()
+        self._lock = threading.Lock()
+        self._flights: Dict[str, Future] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def acquire(self, key: str) -> Tuple[Future, bool]:
+        """
+        取得資源的工作（已在進行中時加入它）
+
+        取得擁有權的呼叫者必須以 set_result 或 set_exception 完成 Future，
+        完成後資源即可再次被取得。
+
+        Args:
+            key: 資源名稱
+
+        Returns:
+            (工作的 Future, 是否為擁有者)
+        """
+        with self._lock:
+            counts = self._counts.setdefault(key, {"flights": 0, "joins": 0})
+            future = self._flights.get(key)
+            if future is not None and not future.done():
+                counts["joins"] += 1
+                return future, False
+
+            future = Future()
+            self._flights[key] = future
+            counts["flights"] += 1
+
+        future.add_done_callback(lambda done: self._release(key, done))
+        return future, True
+
+    def _release(self, key: str, future: Future):
+        """工作完成後移除（只移除自己，不影響之後建立的工作）"""
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+
+    def submit(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        callback: Optional[Callable[[Future], Any]] = None
+    ) -> Future:
+        """
+        執行資源的取得工作，已在進行中時加入它
+
+        Args:
+            key: 資源名稱
+            factory: 建立 coroutine 的函數（加入既有工作時不會被呼叫）
+            callback: 完成時呼叫的函數，參數為 Future（在背景執行緒中被呼叫）
+
+        Returns:
+            concurrent.futures.Future
+        """
+        future, owner = self.acquire(key)
+        if owner:
+            def relay(done: Future):
+                if done.cancelled():
+                    future.cancel()
+                elif done.exception() is not None:
+                    future.set_exception(done.exception())
+                else:
+                    future.set_result(done.result())
+
+            try:
+                self.runtime.submit(factory(), callback=relay)
+            except Exception as e:
+                future.set_exception(e)
+        if callback is not None:
+            future.add_done_callback(callback)
+        return future
+
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        在 coroutine 中執行資源的取得工作，已在進行中時等待它的結果
+
+        Args:
+            key: 資源名稱
+            factory: 建立 coroutine 的函數
+
+        Returns:
+            工作的結果
+        """
+        return await asyncio.wrap_future(self.submit(key, factory))
+
+    def in_flight(self, key: str) -> bool:
+        """
+        資源是否正在取得
+
+        Args:
+            key: 資源名稱
+
+        Returns:
+            是否有進行中的工作
+        """
+        with self._lock:
+            future = self._flights.get(key)
+            return future is not None and not future.done()
+
+    def stats(self, prefix: str = "") -> Dict[str, Dict[str, int]]:
+        """
+        取得各資源的工作數與加入數
+
+        Args:
+            prefix: 只列出名稱以此開頭的資源（例如 "stock:"）
+
+        Returns:
+            資源名稱 -> {"flights": 實際執行次數, "joins": 加入既有工作的次數}
+        """
+        with self._lock:
+            return {
+                key: dict(counts)
+                for key, counts in self._counts.items()
+                if key.startswith(prefix)
+            }
+
+    def totals(self, prefix: str = "") -> Dict[str, int]:
+        """
+        加總各資源的工作數與加入數
+
+        Args:
+            prefix: 只加總名稱以此開頭的資源
+
+        Returns:
+            {"flights": 實際執行次數, "joins": 加入既有工作的次數}
+        """
+        totals = {"flights": 0, "joins": 0}
+        for counts in self.stats(prefix).values():
+            totals["flights"] += counts["flights"]
+            totals["joins"] += counts["joins"]
+        return totals
+
+
+_shared_flights: Optional[SingleFlight] = None
+_shared_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """
+    取得程序共用的請求合併器
+
+    Returns:
+        全域唯一的 SingleFlight
+    """
+    global _shared_flights
+    with _shared_lock:
+        if _shared_flights is None:
+            _shared_flights = SingleFlight()
+        return _shared_flights
@@ -1,9 +1,14 @@
 
-import asyncio,json
+import asyncio,sys
+from pathlib import Path
 from crawl4ai import AsyncWebCrawler,CrawlerRunConfig,CacheMode
-from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
 from pprint import pprint
 
+# 加入專案根目錄以匯入共用模組
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from crawl_common.extraction_pool import get_extraction_executor
+from crawl_common.http_client import close_http_client,fetch_with_browser_fallback
+
 async def main():
     
     schema ={
@@ -29,19 +34,23 @@ async def main():
         ]
     }
 
-    extraction_strategy = JsonCssExtractionStrategy(schema)
+    async def fetch_with_browser():
+        # 瀏覽器只取回 HTML，提取與 HTTP 快速路徑相同，大型頁面在程序池中解析
+        run_config = CrawlerRunConfig(
+            cache_mode=CacheMode.BYPASS
+            )
+        async with AsyncWebCrawler() as crawler:
+            result = await crawler.arun(
+                url=url,
+                config=run_config)
+        return await get_extraction_executor().extract(schema,result.html)
 
-    run_config = CrawlerRunConfig(
-        cache_mode=CacheMode.BYPASS,
-        extraction_strategy=extraction_strategy
-        )
-    async with AsyncWebCrawler() as crawler:
-        url='https://rate.bot.com.tw/xrt?Lang=zh-TW'
-        result = await crawler.arun(
-            url=url,
-            config=run_config)
-        data = json.loads(result.extracted_content)
-        pprint(data)
+    # 牌告匯率是伺服器端產生的頁面，先用 HTTP + lxml 提取，沒有資料時才啟動瀏覽器
+    url='https://rate.bot.com.tw/xrt?Lang=zh-TW'
+    data = await fetch_with_browser_fallback(url,schema,fetch_with_browser)
+    await close_http_client()
+    get_extraction_executor().shutdown()
+    pprint(data)
         
 
 if __name__ == "__main__":
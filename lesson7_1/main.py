@@ -1,15 +1,35 @@
-import asyncio
-import json
+import io
+import math
+import sys
 from datetime import datetime
+from pathlib import Path
 import streamlit as st
+import numpy as np
 import pandas as pd
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CacheMode
-from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
 
+# 加入專案根目錄以匯入共用模組
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from crawl_common.browser import get_shared_crawler_manager
+from crawl_common.extraction_pool import get_extraction_executor
+from crawl_common.http_client import fetch_with_browser_fallback
+from crawl_common.rates import TWD_CODE, RateSnapshot
+from crawl_common.refresh_ahead import RefreshAheadCache
 
-@st.cache_data(ttl=600)  # 10分鐘快取
-def fetch_exchange_rates():
-    """爬取台灣銀行匯率資料"""
+# 匯率資料有效 10 分鐘，經過 8 分鐘就在背景提前更新
+RATE_TTL = 600
+RATE_REFRESH_AHEAD = 0.8
+
+
+async def fetch_exchange_rates(force_refresh: bool = False):
+    """
+    爬取台灣銀行匯率資料（在共用的背景事件迴圈執行）
+
+    Args:
+        force_refresh: 是否略過 HTTP 快取強制重新取得
+
+    Returns:
+        (顯示用的 DataFrame, RateSnapshot)
+    """
     
     async def _fetch():
         schema = {
@@ -34,20 +54,25 @@ def fetch_exchange_rates():
             ]
         }
 
-        strategy = JsonCssExtractionStrategy(schema)
-        run_config = CrawlerRunConfig(
-            cache_mode=CacheMode.BYPASS,
-            extraction_strategy=strategy
-        )
+        async def _fetch_with_browser():
+            # 只有需要瀏覽器時才匯入 crawl4ai（含 Playwright）
+            from crawl4ai import CrawlerRunConfig, CacheMode
+            
+            run_config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS)
+            
+            # 使用程序共用的長駐瀏覽器；表格解析送到程序池，不佔用事件迴圈
+            crawler_manager = get_shared_crawler_manager()
+            result = await crawler_manager.arun(url=url, config=run_config)
+            return await get_extraction_executor().extract(schema, result.html)
         
-        async with AsyncWebCrawler() as crawler:
-            url = 'https://rate.bot.com.tw/xrt?Lang=zh-TW'
-            result = await crawler.arun(url=url, config=run_config)
-            data = json.loads(result.extracted_content)
-            return data
+        # 伺服器端產生的頁面：先以 HTTP + lxml 提取，提取不到資料時才使用瀏覽器
+        url = 'https://rate.bot.com.tw/xrt?Lang=zh-TW'
+        data = await fetch_with_browser_fallback(
+            url, schema, _fetch_with_browser, ttl=0 if force_refresh else None
+        )
+        return data
     
-    # 執行非同步函數
-    data = asyncio.run(_fetch())
+    data = await _fetch()
     
     # 轉換為 DataFrame
     df = pd.DataFrame(data)
@@ -61,7 +86,137 @@ def fetch_exchange_rates():
         # 過濾掉無法交易的貨幣（買入和賣出都是暫停交易的）
         df = df[~((df['本行即期買入'] == '暫停交易') & (df['本行即期賣出'] == '暫停交易'))]
     
-    return df
+    # 快照與交叉匯率矩陣也在背景建立，頁面只讀取結果
+    snapshot = RateSnapshot.from_rows(df.fillna('').to_dict('records'))
+    snapshot.cross_rates()
+    return df, snapshot
+
+
+@st.cache_resource
+def get_rate_store() -> RefreshAheadCache:
+    """
+    取得所有工作階段共用的匯率快取（每個程序只建立一次）
+
+    資料在到期前由背景工作更新，頁面只讀取目前的資料，不會等待爬蟲；
+    回傳的 DataFrame 與快照由所有工作階段共用，請勿修改。
+    """
+    store = RefreshAheadCache(
+        fetch_exchange_rates,
+        ttl=RATE_TTL,
+        refresh_ahead=RATE_REFRESH_AHEAD,
+        name="台灣銀行匯率",
+        key="bot-rates"
+    )
+    store.start()
+    return store
+
+
+# 批次換算的欄位（目標幣別可省略，預設為台幣）
+BATCH_AMOUNT_COLUMN = '金額'
+BATCH_SOURCE_COLUMN = '原幣別'
+BATCH_TARGET_COLUMN = '目標幣別'
+
+
+def convert_batch(snapshot: RateSnapshot, batch_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    批次換算（整欄向量化計算，不逐列查詢）
+
+    Args:
+        snapshot: 匯率快照
+        batch_df: 含金額、原幣別（與目標幣別）欄位的資料
+
+    Returns:
+        加上匯率、換算金額與狀態欄位的 DataFrame
+
+    Raises:
+        ValueError: 缺少必要欄位
+    """
+    missing = [c for c in (BATCH_AMOUNT_COLUMN, BATCH_SOURCE_COLUMN) if c not in batch_df.columns]
+    if missing:
+        raise ValueError(f"缺少欄位：{'、'.join(missing)}")
+
+    result = batch_df.copy()
+    if BATCH_TARGET_COLUMN not in result.columns:
+        result[BATCH_TARGET_COLUMN] = TWD_CODE
+    result[BATCH_TARGET_COLUMN] = result[BATCH_TARGET_COLUMN].fillna(TWD_CODE)
+
+    amounts = pd.to_numeric(
+        result[BATCH_AMOUNT_COLUMN].astype(str).str.replace(',', '', regex=False),
+        errors='coerce'
+    ).to_numpy(dtype=np.float64)
+    source_idx = snapshot.indices(result[BATCH_SOURCE_COLUMN].fillna('').tolist())
+    target_idx = snapshot.indices(result[BATCH_TARGET_COLUMN].tolist())
+    rates, converted = snapshot.convert(amounts, source_idx, target_idx)
+
+    result['匯率'] = rates
+    result['換算金額'] = np.round(converted, 4)
+    result['狀態'] = np.select(
+        [
+            (source_idx < 0) | (target_idx < 0),
+            np.isnan(amounts),
+            np.isnan(rates),
+        ],
+        ['找不到幣別', '金額格式錯誤', '暫停交易'],
+        default='成功'
+    )
+    return result
+
+
+def render_batch_conversion(snapshot: RateSnapshot):
+    """批次換算區塊：上傳 CSV 或貼上資料，換算後可下載 CSV"""
+    st.subheader("📑 批次換算")
+    st.caption(
+        f"欄位：{BATCH_AMOUNT_COLUMN}、{BATCH_SOURCE_COLUMN}、{BATCH_TARGET_COLUMN}"
+        f"（可省略，預設 {TWD_CODE}）。幣別可填代碼（USD）或名稱（美金 (USD)），"
+        "外幣換外幣以台幣為中介：本行買入換成台幣，再以本行賣出換成目標幣別。"
+    )
+
+    tab_upload, tab_paste = st.tabs(["上傳 CSV", "貼上資料"])
+    with tab_upload:
+        uploaded = st.file_uploader("選擇 CSV 檔案", type=["csv"])
+    with tab_paste:
+        pasted = st.text_area(
+            "貼上 CSV 或 Excel 複製的資料（第一列為欄位名稱）",
+            placeholder=f"{BATCH_AMOUNT_COLUMN},{BATCH_SOURCE_COLUMN},{BATCH_TARGET_COLUMN}\n"
+                        f"1000,USD,TWD\n500,USD,JPY\n30000,TWD,EUR",
+            height=150
+        )
+
+    try:
+        if uploaded is not None:
+            batch_df = pd.read_csv(uploaded, dtype=str, encoding='utf-8-sig')
+        elif pasted.strip():
+            # 從 Excel 複製的資料以 Tab 分隔
+            batch_df = pd.read_csv(io.StringIO(pasted.strip()), sep=None, engine='python', dtype=str)
+        else:
+            return
+        batch_df.columns = [str(column).strip() for column in batch_df.columns]
+        result = convert_batch(snapshot, batch_df)
+    except (ValueError, pd.errors.ParserError) as e:
+        st.error(f"❌ 無法讀取批次資料：{e}")
+        return
+
+    failed = int((result['狀態'] != '成功').sum())
+    if failed:
+        st.warning(f"⚠️ {len(result):,} 筆中有 {failed:,} 筆無法換算")
+    else:
+        st.success(f"✅ 已換算 {len(result):,} 筆")
+
+    st.dataframe(result, use_container_width=True, hide_index=True)
+    st.download_button(
+        "⬇️ 下載換算結果 (CSV)",
+        # 加上 BOM 讓 Excel 正確顯示中文
+        data=result.to_csv(index=False).encode('utf-8-sig'),
+        file_name=f"換算結果_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        mime="text/csv"
+    )
+
+    with st.expander("交叉匯率矩陣（1 單位列幣別可換得的欄幣別數量）"):
+        labels = snapshot.matrix_labels()
+        st.dataframe(
+            pd.DataFrame(snapshot.cross_rates(), index=labels, columns=labels),
+            use_container_width=True
+        )
 
 
 def main():
@@ -74,19 +229,29 @@ def main():
     st.title("💱 台幣匯率轉換系統")
     st.markdown("---")
     
-    # 手動更新按鈕
+    store = get_rate_store()
+    
+    # 手動更新按鈕：只讓匯率資料在背景重新取得，不清除其他快取
     col_update = st.columns([6, 1])[1]
     with col_update:
         if st.button("🔄 手動更新", use_container_width=True):
-            st.cache_data.clear()
-            st.rerun()
-    
-    # 顯示更新時間
-    st.info(f"📅 最後更新時間：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            store.invalidate()
+            st.toast("已在背景更新匯率，完成後重新整理即可看到最新資料")
     
     # 獲取匯率資料
     try:
-        df = fetch_exchange_rates()
+        df, snapshot = store.get()
+        
+        # 顯示更新時間
+        stats = store.stats()
+        fetched_at = datetime.fromtimestamp(stats["fetched_at"])
+        status = "（背景更新中）" if stats["refreshing"] else ""
+        if stats["stale"] and stats["last_error"] is not None:
+            st.warning(f"⚠️ 匯率更新失敗，顯示的是 {fetched_at.strftime('%Y-%m-%d %H:%M:%S')} 的資料")
+        else:
+            st.info(f"📅 最後更新時間：{fetched_at.strftime('%Y-%m-%d %H:%M:%S')}{status}")
+        if stats["joins"]:
+            st.caption(f"已合併 {stats['joins']} 次同時發生的更新請求")
         
         if df.empty:
             st.error("❌ 無法取得匯率資料")
@@ -109,13 +274,10 @@ def main():
         with col2:
             st.subheader("💰 台幣轉換計算器")
             
-            # 過濾可交易的貨幣（至少有一個欄位不是暫停交易）
-            tradable_df = df[
-                (df['本行即期買入'] != '暫停交易') | 
-                (df['本行即期賣出'] != '暫停交易')
-            ].copy()
+            # 可交易的貨幣（至少有一個欄位不是暫停交易），由快照預先計算
+            currency_list = snapshot.quoted_currencies()
             
-            if tradable_df.empty:
+            if not currency_list:
                 st.warning("⚠️ 目前沒有可交易的貨幣")
                 return
             
@@ -129,7 +291,6 @@ def main():
             )
             
             # 選擇目標貨幣
-            currency_list = tradable_df['幣別'].tolist()
             selected_currency = st.selectbox(
                 "選擇目標貨幣",
                 currency_list
@@ -137,7 +298,7 @@ def main():
             
             # 計算轉換
             if selected_currency:
-                selected_row = tradable_df[tradable_df['幣別'] == selected_currency].iloc[0]
+                selected_index = snapshot.lookup(selected_currency)
                 
                 st.markdown("---")
                 st.markdown(f"### 📈 {selected_currency} 匯率資訊")
@@ -146,14 +307,14 @@ def main():
                 col_buy, col_sell = st.columns(2)
                 
                 with col_buy:
-                    buy_rate = selected_row['本行即期買入']
+                    buy_rate = snapshot.buy_text[selected_index]
                     st.metric(
                         "本行買入",
                         buy_rate if buy_rate != '暫停交易' else '暫停交易'
                     )
                     
                 with col_sell:
-                    sell_rate = selected_row['本行即期賣出']
+                    sell_rate = snapshot.sell_text[selected_index]
                     st.metric(
                         "本行賣出",
                         sell_rate if sell_rate != '暫停交易' else '暫停交易'
@@ -164,8 +325,8 @@ def main():
                 
                 # 計算轉換金額（使用銀行賣出匯率，因為客戶是買外幣）
                 if sell_rate != '暫停交易':
-                    try:
-                        sell_rate_float = float(sell_rate)
+                    sell_rate_float = float(snapshot.sell[selected_index])
+                    if not math.isnan(sell_rate_float):
                         foreign_amount = twd_amount / sell_rate_float
                         
                         st.success(
@@ -174,10 +335,13 @@ def main():
                         )
                         
                         st.caption(f"使用匯率：{sell_rate_float:.4f} (本行賣出)")
-                    except ValueError:
+                    else:
                         st.error("❌ 匯率資料格式錯誤")
                 else:
                     st.warning("⚠️ 此貨幣暫停交易")
+        
+        st.markdown("---")
+        render_batch_conversion(snapshot)
     
     except Exception as e:
         st.error(f"❌ 發生錯誤：{str(e)}")
@@ -4,24 +4,36 @@
 整合 crawl4ai 爬蟲與 tkinter GUI，提供即時匯率查詢與台幣轉換功能。
 """
 
-import asyncio
-import json
+import math
+import sys
 import tkinter as tk
 from tkinter import ttk, messagebox
-from threading import Thread
 from datetime import datetime
-from typing import Optional, List, Dict
+from pathlib import Path
+from typing import Optional, List, Dict, Tuple
 
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, CacheMode
-from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
+# 加入專案根目錄以匯入共用模組
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from crawl_common.browser import get_shared_crawler_manager
+from crawl_common.extraction_pool import get_extraction_executor
+from crawl_common.http_client import close_http_client, fetch_with_browser_fallback
+from crawl_common.rates import RateSnapshot
+from crawl_common.runtime import get_runtime
+from crawl_common.single_flight import get_single_flight
+
+# 匯率資料在請求合併器中的資源名稱
+RATES_FLIGHT_KEY = "bot-rates"
 
 
 # ============= 爬蟲模組 =============
 
-async def fetch_exchange_rates() -> Optional[List[Dict[str, str]]]:
+async def fetch_exchange_rates(force_refresh: bool = False) -> Optional[List[Dict[str, str]]]:
     """
     爬取台灣銀行匯率資訊
     
+    Args:
+        force_refresh: 忽略 HTTP 快取的 TTL，立即向伺服器重新驗證（未變更時只需 304）
+    
     Returns:
         匯率資料列表，格式:
         [
@@ -58,37 +70,41 @@ async def fetch_exchange_rates() -> Optional[List[Dict[str, str]]]:
             ]
         }
 
-        # 建立提取策略
-        extraction_strategy = JsonCssExtractionStrategy(schema)
+        async def fetch_with_browser() -> List[Dict]:
+            # 只有需要瀏覽器時才匯入 crawl4ai（含 Playwright）
+            from crawl4ai import CrawlerRunConfig, CacheMode
 
-        # 配置爬蟲
-        run_config = CrawlerRunConfig(
-            cache_mode=CacheMode.BYPASS,
-            extraction_strategy=extraction_strategy
-        )
+            # 配置爬蟲（不在瀏覽器端提取，HTML 交給程序池以相同的 schema 解析）
+            run_config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS)
 
-        # 執行爬蟲
-        async with AsyncWebCrawler() as crawler:
-            url = 'https://rate.bot.com.tw/xrt?Lang=zh-TW'
-            result = await crawler.arun(url=url, config=run_config)
-            data = json.loads(result.extracted_content)
-            
-            # 清理資料
-            cleaned_data = []
-            for item in data:
-                currency = item.get("幣別", "").strip()
-                buy_rate = item.get("本行即期買入", "").strip()
-                sell_rate = item.get("本行即期賣出", "").strip()
-                
-                # 只加入有幣別資料的項目
-                if currency:
-                    cleaned_data.append({
-                        "幣別": currency,
-                        "本行即期買入": buy_rate,
-                        "本行即期賣出": sell_rate
-                    })
+            # 執行爬蟲（使用程序共用的長駐瀏覽器）
+            crawler_manager = get_shared_crawler_manager()
+            result = await crawler_manager.arun(url=url, config=run_config)
+            return await get_extraction_executor().extract(schema, result.html)
+
+        # 牌告匯率為伺服器端產生的頁面，先以 HTTP 下載並用 lxml 提取，
+        # 提取不到資料時才使用瀏覽器
+        url = 'https://rate.bot.com.tw/xrt?Lang=zh-TW'
+        data = await fetch_with_browser_fallback(
+            url, schema, fetch_with_browser, ttl=0 if force_refresh else None
+        )
+        
+        # 清理資料
+        cleaned_data = []
+        for item in data:
+            currency = item.get("幣別", "").strip()
+            buy_rate = item.get("本行即期買入", "").strip()
+            sell_rate = item.get("本行即期賣出", "").strip()
             
-            return cleaned_data if cleaned_data else None
+            # 只加入有幣別資料的項目
+            if currency:
+                cleaned_data.append({
+                    "幣別": currency,
+                    "本行即期買入": buy_rate,
+                    "本行即期賣出": sell_rate
+                })
+        
+        return cleaned_data if cleaned_data else None
             
     except Exception as e:
         print(f"爬蟲錯誤: {e}")
@@ -111,13 +127,16 @@ class ExchangeRateApp(tk.Tk):
         self.configure(bg="#f0f0f0")
         
         # 資料儲存
-        self.exchange_data: List[Dict[str, str]] = []
+        self.snapshot: Optional[RateSnapshot] = None
         self.last_update: Optional[datetime] = None
         self.is_loading: bool = False
         
         # 建立 UI
         self._setup_ui()
         
+        # 綁定視窗關閉事件
+        self.protocol("WM_DELETE_WINDOW", self._on_closing)
+        
         # 載入初始資料
         self._load_initial_data()
     
@@ -279,33 +298,59 @@ class ExchangeRateApp(tk.Tk):
     def _manual_update(self):
         """手動更新匯率"""
         if not self.is_loading:
-            self._fetch_data_thread()
+            self._fetch_data_thread(force_refresh=True)
     
-    def _fetch_data_thread(self):
-        """在背景執行緒中爬取資料"""
+    def _fetch_data_thread(self, force_refresh: bool = False):
+        """
+        在共用的背景事件迴圈中爬取資料
+        
+        爬取以 RATES_FLIGHT_KEY 合併：已有進行中的爬取時直接等待它的結果。
+        is_loading 只在主執行緒中讀寫。
+        
+        Args:
+            force_refresh: 是否忽略 HTTP 快取的 TTL（手動更新時使用）
+        """
         if self.is_loading:
             return
         
         self.is_loading = True
         self._show_loading()
         
-        def run_async():
-            """在新的事件迴圈中執行非同步函數"""
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+        def on_done(future):
+            """爬蟲完成回調（在背景執行緒中執行）"""
             try:
-                data = loop.run_until_complete(fetch_exchange_rates())
+                data = future.result()
+                # 在背景執行緒中一次正規化為快照，UI 只讀取快照
+                snapshot = RateSnapshot.from_rows(data) if data else None
                 # 使用 after 確保在主執行緒中更新 UI
-                self.after(0, lambda: self._update_ui_with_data(data))
+                self.after(0, lambda: self._finish_loading(snapshot=snapshot))
             except Exception as e:
-                self.after(0, lambda: self._show_error(f"爬蟲失敗: {str(e)}"))
-            finally:
-                loop.close()
-                self.is_loading = False
-        
-        # 啟動背景執行緒
-        thread = Thread(target=run_async, daemon=True)
-        thread.start()
+                error = str(e)
+                self.after(0, lambda: self._finish_loading(error=f"爬蟲失敗: {error}"))
+        
+        get_single_flight().submit(
+            RATES_FLIGHT_KEY,
+            lambda: fetch_exchange_rates(force_refresh),
+            callback=on_done
+        )
+    
+    def _finish_loading(
+        self,
+        snapshot: Optional[RateSnapshot] = None,
+        error: Optional[str] = None
+    ):
+        """
+        爬取完成（在主執行緒中執行）
+        
+        Args:
+            snapshot: 匯率快照，失敗時為 None
+            error: 錯誤訊息
+        """
+        self.is_loading = False
+        if error is not None:
+            self._show_error(error)
+        else:
+            self._update_ui_with_data(snapshot)
     
     def _show_loading(self):
         """顯示載入狀態"""
@@ -319,17 +364,17 @@ class ExchangeRateApp(tk.Tk):
         self.update_btn.config(state="normal")
         self.config(cursor="")
     
-    def _update_ui_with_data(self, data: Optional[List[Dict[str, str]]]):
+    def _update_ui_with_data(self, snapshot: Optional[RateSnapshot]):
         """更新 UI 資料"""
         self._hide_loading()
         
-        if data is None or len(data) == 0:
+        if snapshot is None or len(snapshot) == 0:
             messagebox.showerror("錯誤", "無法取得匯率資料，請檢查網路連線或稍後再試")
             return
         
         # 儲存資料
-        self.exchange_data = data
-        self.last_update = datetime.now()
+        self.snapshot = snapshot
+        self.last_update = snapshot.fetched_at
         
         # 更新表格
         self._update_treeview()
@@ -352,30 +397,14 @@ class ExchangeRateApp(tk.Tk):
         for item in self.tree.get_children():
             self.tree.delete(item)
         
-        # 插入新資料
-        for item in self.exchange_data:
-            currency = item.get("幣別", "N/A")
-            buy = item.get("本行即期買入", "").strip()
-            sell = item.get("本行即期賣出", "").strip()
-            
-            # 空值處理
-            buy_display = buy if buy else "暫停交易"
-            sell_display = sell if sell else "暫停交易"
-            
-            self.tree.insert("", "end", values=(currency, buy_display, sell_display))
+        # 插入新資料（空值已在快照中處理為「暫停交易」）
+        for values in self.snapshot.display_rows():
+            self.tree.insert("", "end", values=values)
     
     def _update_currency_combo(self):
         """更新貨幣下拉選單（過濾無法交易的貨幣）"""
-        available_currencies = []
-        
-        for item in self.exchange_data:
-            currency = item.get("幣別", "")
-            buy = item.get("本行即期買入", "").strip()
-            sell = item.get("本行即期賣出", "").strip()
-            
-            # 只加入可交易的貨幣（買入和賣出都有值）
-            if currency and buy and sell:
-                available_currencies.append(currency)
+        # 只加入可交易的貨幣（買入和賣出都有值）
+        available_currencies = self.snapshot.tradable_currencies()
         
         self.currency_combo['values'] = available_currencies
         
@@ -403,21 +432,16 @@ class ExchangeRateApp(tk.Tk):
                 return
             
             # 查找匯率
-            rate_data = self._find_rate_by_currency(selected_currency)
-            if not rate_data:
+            rates = self._find_rate_by_currency(selected_currency)
+            if rates is None:
                 messagebox.showerror("錯誤", "找不到該貨幣的匯率")
                 return
             
-            buy_rate_str = rate_data["本行即期買入"]
-            sell_rate_str = rate_data["本行即期賣出"]
-            
-            if not buy_rate_str or not sell_rate_str:
+            buy_rate, sell_rate = rates
+            if math.isnan(buy_rate) or math.isnan(sell_rate):
                 messagebox.showerror("錯誤", "該貨幣暫停交易")
                 return
             
-            buy_rate = float(buy_rate_str)
-            sell_rate = float(sell_rate_str)
-            
             # 計算轉換
             # 買入：使用者賣台幣給銀行，用買入匯率
             buy_result = twd_amount / buy_rate
@@ -453,17 +477,36 @@ class ExchangeRateApp(tk.Tk):
         except Exception as e:
             messagebox.showerror("錯誤", f"計算失敗: {str(e)}")
     
-    def _find_rate_by_currency(self, currency: str) -> Optional[Dict[str, str]]:
-        """根據幣別查找匯率資料"""
-        for item in self.exchange_data:
-            if item.get("幣別") == currency:
-                return item
-        return None
+    def _find_rate_by_currency(self, currency: str) -> Optional[Tuple[float, float]]:
+        """
+        根據幣別查找匯率（快照索引，O(1)）
+        
+        Args:
+            currency: 幣別名稱或代碼
+        
+        Returns:
+            (買入, 賣出) 匯率，暫停交易的欄位為 NaN；找不到或尚無資料時返回 None
+        """
+        if self.snapshot is None:
+            return None
+        return self.snapshot.rates(currency)
     
     def _show_error(self, message: str):
         """顯示錯誤訊息"""
         self._hide_loading()
         messagebox.showerror("錯誤", message)
+    
+    def _on_closing(self):
+        """視窗關閉事件處理（關閉 HTTP 用戶端、長駐瀏覽器、背景事件迴圈與提取程序池）"""
+        runtime = get_runtime()
+        try:
+            runtime.run(close_http_client(), timeout=5)
+            runtime.run(get_shared_crawler_manager().close(), timeout=10)
+        except Exception as e:
+            print(f"關閉瀏覽器失敗: {e}")
+        runtime.stop()
+        get_extraction_executor().shutdown()
+        self.destroy()
 
 
 # ============= 主程式入口 =============
@@ -0,0 +1,235 @@
+"""
+即時報價分頁
+
+為觀察清單中的股票各保持一個開啟的報價頁面。頁面會自行更新報價欄位，
+由 MutationObserver 在欄位變動時只把變動的欄位推送回 Python，
+不需要每分鐘重新導航與等待頁面載入。
+
+分頁數量有上限；觀察清單超過上限時，畫面內的股票固定保持開啟，
+其餘股票依序輪流使用剩下的分頁。
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from crawl_common.browser import CrawlerManager
+from crawl_common.extraction import compile_schema_watch_js
+from quote_sources import normalize_quote_time
+
+# 頁面推送變動欄位時呼叫的函式名稱（以 Playwright expose_function 註冊）
+PUSH_BINDING = "__stockLivePush"
+
+
+class LiveQuoteManager:
+    """
+    即時報價分頁管理器
+
+    所有方法都必須在 CrawlerManager 所在的事件迴圈中執行；
+    on_update 也會在該事件迴圈的執行緒中被呼叫。
+    """
+
+    def __init__(
+        self,
+        crawler_manager: CrawlerManager,
+        schema: Dict,
+        url_template: str,
+        ready_js: str,
+        watch_selector: str,
+        on_update: Callable[[str, Dict], None],
+        max_tabs: int = 8,
+        rotate_interval: float = 30.0,
+        timeout_ms: int = 15000
+    ):
+        """
+        建立管理器（不會立即開啟分頁）
+
+        Args:
+            crawler_manager: 長駐瀏覽器管理器
+            schema: 報價欄位的提取 schema
+            url_template: 報價頁網址，以 {code} 代入股票代碼
+            ready_js: 頁面就緒條件（JavaScript 函式運算式）
+            watch_selector: 要監看變動的元素 CSS 選擇器
+            on_update: 報價變動時呼叫，參數為 (股票代碼, 完整的最新資料)
+            max_tabs: 同時開啟的分頁上限
+            rotate_interval: 分頁輪替與檢查的間隔（秒）
+            timeout_ms: 等待頁面就緒的逾時時間（毫秒）
+        """
+        self.crawler_manager = crawler_manager
+        self.url_template = url_template
+        self.on_update = on_update
+        self.max_tabs = max_tabs
+        self.rotate_interval = rotate_interval
+        self.script = compile_schema_watch_js(
+            schema, PUSH_BINDING, watch_selector, ready_js=ready_js, timeout_ms=timeout_ms
+        )
+
+        self.codes: List[str] = []
+        self.pinned: List[str] = []
+        self._pages: Dict[str, object] = {}
+        self._latest: Dict[str, Dict] = {}
+        self._cursor = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.push_count = 0
+        self.rotation_count = 0
+
+    async def start(self):
+        """開始維護分頁（定期輪替並重新開啟意外關閉的分頁）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._maintain_loop())
+
+    async def stop(self):
+        """停止維護並關閉所有分頁"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for code in list(self._pages):
+            await self._close_tab(code)
+
+    async def set_codes(self, codes: List[str], pinned: List[str]):
+        """
+        設定要監看的股票
+
+        Args:
+            codes: 觀察清單中的股票代碼（依優先順序）
+            pinned: 需要固定開啟的股票（通常為畫面內可見的股票）
+        """
+        self.codes = list(codes)
+        self.pinned = [code for code in pinned if code in set(codes)]
+        await self._sync()
+
+    def _pinned_tabs(self) -> List[str]:
+        """固定開啟的股票（最多佔分頁上限的一半）"""
+        return self.pinned[:max(1, self.max_tabs // 2)]
+
+    def _select(self) -> List[str]:
+        """選出目前應該開啟分頁的股票"""
+        if len(self.codes) <= self.max_tabs:
+            return list(self.codes)
+
+        # 其餘分頁依游標輪流分給未固定的股票
+        pinned = self._pinned_tabs()
+        rest = [code for code in self.codes if code not in pinned]
+        start = self._cursor % len(rest)
+        rotating = (rest[start:] + rest[:start])[:self.max_tabs - len(pinned)]
+        return pinned + rotating
+
+    async def _sync(self):
+        """關閉不再需要的分頁，並開啟缺少的分頁"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            wanted = self._select()
+            for code in [code for code in self._pages if code not in wanted]:
+                await self._close_tab(code)
+            missing = [code for code in wanted if code not in self._pages]
+            if missing:
+                await asyncio.gather(*(self._open_tab(code) for code in missing))
+
+    async def _maintain_loop(self):
+        """定期輪替分頁；觀察清單未超過上限時只補開關閉的分頁"""
+        while True:
+            await asyncio.sleep(self.rotate_interval)
+            if len(self.codes) > self.max_tabs:
+                self._cursor += self.max_tabs - len(self._pinned_tabs())
+                self.rotation_count += 1
+            try:
+                await self._sync()
+            except Exception as e:
+                print(f"✗ 即時分頁維護失敗: {e}")
+
+    async def _open_tab(self, code: str):
+        """開啟股票的報價分頁並註冊變動監看"""
+        url = self.url_template.format(code=code)
+        page = None
+        try:
+            page = await self.crawler_manager.new_page(url)
+            self._pages[code] = page
+            await page.expose_function(
+                PUSH_BINDING, lambda payload, code=code: self._on_push(code, payload)
+            )
+            page.on("close", lambda closed, code=code: self._on_page_closed(code, closed))
+            await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+            await self._attach(code, page)
+            # 網站自行重新載入頁面時重新註冊監看
+            page.on(
+                "framenavigated",
+                lambda frame, code=code, page=page: self._on_navigated(code, page, frame)
+            )
+        except Exception as e:
+            print(f"✗ 股票 {code} 即時分頁開啟失敗: {e}")
+            await self._close_tab(code)
+
+    def _on_navigated(self, code: str, page, frame):
+        """頁面主框架重新導航後，在新文件中重新註冊監看"""
+        if frame == page.main_frame and self._pages.get(code) is page:
+            asyncio.ensure_future(self._reattach(code, page))
+
+    async def _reattach(self, code: str, page):
+        """重新註冊監看，失敗時關閉分頁（下次維護時重新開啟）"""
+        try:
+            await self._attach(code, page)
+        except Exception as e:
+            print(f"✗ 股票 {code} 即時分頁重新監看失敗: {e}")
+            if self._pages.get(code) is page:
+                await self._close_tab(code)
+
+    async def _attach(self, code: str, page):
+        """在頁面中執行監看腳本，並送出第一筆完整資料"""
+        result = await page.evaluate(f"async () => {{ {self.script} }}")
+        if result.get("timed_out") or not result["items"][0]:
+            raise RuntimeError("等待報價載入逾時")
+        if self._pages.get(code) is page:
+            self._latest[code] = {}
+            self._apply(code, result["items"][0])
+
+    def _on_push(self, code: str, payload: str):
+        """頁面推送變動欄位（在事件迴圈中被 Playwright 呼叫）"""
+        if code not in self._pages:
+            return
+        self.push_count += 1
+        self._apply(code, json.loads(payload))
+
+    def _apply(self, code: str, fields: Dict):
+        """合併變動欄位並通知呼叫端"""
+        data = self._latest.setdefault(code, {})
+        data.update(fields)
+        normalize_quote_time(data)
+        data['stock_code'] = code
+        data['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.on_update(code, dict(data))
+
+    def _on_page_closed(self, code: str, page):
+        """分頁被關閉（含瀏覽器當掉）時移除記錄，下次維護時重新開啟"""
+        if self._pages.get(code) is page:
+            del self._pages[code]
+            self._latest.pop(code, None)
+
+    async def _close_tab(self, code: str):
+        """關閉股票的報價分頁"""
+        page = self._pages.pop(code, None)
+        self._latest.pop(code, None)
+        if page is None:
+            return
+        try:
+            await page.close()
+        except Exception:
+            pass
+
+    def stats(self) -> Dict:
+        """
+        取得即時模式統計
+
+        Returns:
+            包含開啟分頁數、監看股票數、推送次數與輪替次數的字典
+        """
+        return {
+            "open_tabs": len(self._pages),
+            "watched": len(self.codes),
+            "pushes": self.push_count,
+            "rotations": self.rotation_count,
+        }
@@ -7,21 +7,92 @@
 Author: Created on 2025-12-20
 """
 
+import time
+
+# 啟動計時起點（用於啟動時間報告）
+STARTUP_T0 = time.perf_counter()
+
 import asyncio
-import json
+import os
 import tkinter as tk
+from concurrent.futures import Future
 from tkinter import ttk, messagebox, scrolledtext
-from typing import Dict, List, Optional, Set
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Set, Tuple
 from datetime import datetime
-import threading
 import queue
-from crawl4ai import AsyncWebCrawler, CrawlerRunConfig, BrowserConfig, CacheMode
-from crawl4ai.extraction_strategy import JsonCssExtractionStrategy
-import twstock
+import sys
+from pathlib import Path
+
+# 加入專案根目錄以匯入共用模組
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from crawl_common.blocking import ResourceBlockProfile
+from crawl_common.browser import CrawlerManager, get_shared_crawler_manager
+from crawl_common.concurrency import AdaptiveLimiter
+from crawl_common.extraction import compile_schema_js, read_js_extraction
+from crawl_common.extraction_pool import get_extraction_executor
+from crawl_common.latency import LatencyTracker
+from crawl_common.resilience import (
+    FAILURE_EMPTY, FAILURE_ERROR, FAILURE_HTTP, FAILURE_LABELS, FAILURE_TIMEOUT,
+    NegativeCache, RetryPolicy, classify_exception, get_circuit_breaker,
+)
+from crawl_common.runtime import get_runtime
+from crawl_common.shards import ShardPool, serve_shard
+from crawl_common.single_flight import get_single_flight
+from live_quotes import LiveQuoteManager
+from quote_sources import (
+    FallbackQuoteSource, QuoteCallback, QuoteSource, TwseBatchSource, normalize_quote_time,
+)
+from refresh_policy import SESSION_CLOSED, SESSION_LABELS, RefreshPolicy, TradingCalendar
+from refresh_scheduler import StaggeredRefreshScheduler
+from stock_cards import VirtualStockGrid
+from stock_search import StockSearchIndex
+from stock_universe import load_stock_universe
+
+# crawl4ai（含 Playwright）延後到第一次更新時才在背景執行緒中匯入
+if TYPE_CHECKING:
+    from crawl4ai import CrawlerRunConfig
+
+IMPORT_DONE = time.perf_counter()
 
 
 # ==================== 爬蟲模組 ====================
 
+# 報價頁面只讀取 div.quotes-info 的文字，圖片、字型、樣式與廣告分析請求一律中止
+QUOTE_BLOCK_PROFILE = ResourceBlockProfile("wantgoo 報價頁", url_hosts=("wantgoo.com",))
+
+STOCK_URL_TEMPLATE = 'https://www.wantgoo.com/stock/{code}/technical-chart'
+
+# 報價頁面就緒條件：價格、股票代碼與成交量都已載入
+STOCK_READY_JS = "() => document.querySelector('div.quotes-info div.deal') && document.querySelector('span.astock-code[c-model=\"id\"]') && document.querySelector('#quotesUl span[c-model=\"volume\"]')"
+STOCK_WAIT_TIMEOUT_MS = 15000
+
+# 即時模式監看的元素：報價區塊、報價時間與各 c-model 欄位
+STOCK_WATCH_SELECTOR = "div.quotes-info, time#lastQuoteTime, main.main [c-model]"
+
+# 報價頁面的重試策略：逾時、HTTP 與 JSON 錯誤最多重試 2 次（指數退避）
+STOCK_RETRY_POLICY = RetryPolicy(max_retries=2, base_delay=1.0, max_delay=8.0)
+
+# 一次更新的整體期限（秒）：超過時取消仍在爬取的股票，先交出已完成的結果
+REFRESH_DEADLINE = 20.0
+
+# 單支股票在請求合併器中的資源名稱前綴（例如 "stock:2330"）
+STOCK_FLIGHT_PREFIX = "stock:"
+
+# 自動更新：新加入的股票平均分散在 60 秒內，之後依活躍度決定各自的間隔，每秒檢查一次到期的股票
+AUTO_UPDATE_INTERVAL = 60.0
+AUTO_UPDATE_TICK_MS = 1000
+# 休市期間每 30 秒檢查一次是否開盤
+MARKET_CLOSED_CHECK_MS = 30000
+
+# 分片爬取：瀏覽器備援一次要爬取至少 SHARD_MIN_CODES 支股票時，分散到多個工作程序
+# （每個工作程序各有一個 Chromium，記憶體用量較大，因此最多 4 個並保留一個核心給 GUI）
+BROWSER_SHARDS = min(4, max(1, (os.cpu_count() or 2) - 1))
+SHARD_MIN_CODES = 40
+
+# 休市日檔案（JSON 日期字串列表，例如 ["2026-02-16", "2026-02-17"]），不存在時只排除週末與固定假日
+HOLIDAY_FILE = Path(__file__).resolve().parent / "twse_holidays.json"
+
+
 def get_stock_schema() -> Dict:
     """
     取得股票資訊的 CSS 提取 Schema
@@ -92,125 +163,616 @@ def get_stock_schema() -> Dict:
     }
 
 
+async def fetch_stock_page(
+    crawler_manager: CrawlerManager,
+    stock_code: str,
+    base_config: "CrawlerRunConfig",
+    in_page: bool = True
+) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    載入一次股票報價頁面並提取資訊
+    
+    Args:
+        crawler_manager: 長駐瀏覽器管理器
+        stock_code: 股票代碼
+        base_config: 基礎爬蟲執行設定
+        in_page: 是否使用頁面內提取（base_config 需由 fetch_multiple_stocks 對應建立）
+    
+    Returns:
+        (股票資訊字典或 None, 失敗類型（FAILURE_*）或 None)
+    """
+    url = STOCK_URL_TEMPLATE.format(code=stock_code)
+    stock_data = None
+    failure = None
+    
+    try:
+        # 每次載入使用獨立的設定副本（crawl4ai 會在設定上記錄目前網址）
+        result = await crawler_manager.arun(url=url, config=base_config.clone())
+        
+        if in_page and result.success:
+            # 頁面內腳本已等待就緒並提取欄位，直接讀取 JSON 結果
+            extracted = read_js_extraction(result)
+            if extracted['items']:
+                stock_data = extracted['items'][0]
+                stock_data['stock_code'] = stock_code
+                stock_data['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            else:
+                failure = FAILURE_TIMEOUT if extracted['timed_out'] else FAILURE_EMPTY
+                print(f"✗ 股票 {stock_code} 頁面內提取失敗: {extracted['error'] or '沒有資料'}")
+        elif result.success and result.html:
+            # 完整 DOM 送到程序池解析，不阻塞其他股票的爬取
+            data = await get_extraction_executor().extract(get_stock_schema(), result.html)
+            if data:
+                stock_data = data[0]
+                stock_data['stock_code'] = stock_code
+                stock_data['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            else:
+                failure = FAILURE_EMPTY
+        elif result.success:
+            failure = FAILURE_EMPTY
+        else:
+            if 'timeout' in (result.error_message or '').lower():
+                failure = FAILURE_TIMEOUT
+            elif (result.status_code or 0) >= 400:
+                failure = FAILURE_HTTP
+            else:
+                failure = FAILURE_ERROR
+            print(f"✗ 股票 {stock_code} 下載失敗（{FAILURE_LABELS[failure]}）")
+            
+    except Exception as e:
+        failure = classify_exception(e)
+        print(f"✗ 股票 {stock_code} 發生錯誤: {e}")
+    
+    if stock_data is not None:
+        # 頁面顯示的時間格式與 API 不同，統一後休市偵測才能解析
+        normalize_quote_time(stock_data)
+    return stock_data, failure
+
+
 async def fetch_single_stock(
-    crawler: AsyncWebCrawler,
+    crawler_manager: CrawlerManager,
     stock_code: str,
-    base_config: CrawlerRunConfig,
-    semaphore: asyncio.Semaphore
+    base_config: "CrawlerRunConfig",
+    limiter: AdaptiveLimiter,
+    in_page: bool = True,
+    latency: Optional[LatencyTracker] = None,
+    negative_cache: Optional[NegativeCache] = None,
+    retry_policy: Optional[RetryPolicy] = None
 ) -> Optional[Dict]:
     """
     抓取單一股票資訊
     
+    - 提供 latency 時，載入時間超過該股票延遲 p95 仍未完成，會在新分頁再送出一次
+      對沖請求，取先成功的結果並取消另一個
+    - 逾時、HTTP 與 JSON 錯誤依 retry_policy 退避重試（等待期間不佔用並行名額）
+    - wantgoo 主機的斷路器開啟時不送出請求
+    - 連續提取結果為空的股票記入負向快取，有效期限內直接略過
+    
     Args:
-        crawler: AsyncWebCrawler 實例
+        crawler_manager: 長駐瀏覽器管理器
         stock_code: 股票代碼
         base_config: 基礎爬蟲執行設定
-        semaphore: 用於限制並行數量的信號量
+        limiter: 自適應並行數控制器（回報延遲與成敗以調整並行數）
+        in_page: 是否使用頁面內提取（base_config 需由 fetch_multiple_stocks 對應建立）
+        latency: 各股票的延遲統計，None 表示不對沖
+        negative_cache: 提取不到資料的股票的負向快取，None 表示不使用
+        retry_policy: 重試策略，None 表示使用 STOCK_RETRY_POLICY
     
     Returns:
         股票資訊字典，失敗時返回 None
     """
-    async with semaphore:
-        url = f'https://www.wantgoo.com/stock/{stock_code}/technical-chart'
+    if negative_cache is not None and negative_cache.is_blocked(stock_code):
+        return None
+    
+    breaker = get_circuit_breaker(STOCK_URL_TEMPLATE.format(code=stock_code))
+    retry_policy = retry_policy or STOCK_RETRY_POLICY
+    
+    def load():
+        return asyncio.ensure_future(
+            fetch_stock_page(crawler_manager, stock_code, base_config, in_page)
+        )
+    
+    async def load_with_hedge() -> Tuple[Optional[Dict], Optional[str]]:
+        """載入一次；超過 p95 時再對沖一次，取先成功者"""
+        started = time.monotonic()
+        primary = load()
+        attempts = [primary]
+        pending = {primary}
+        hedge_after = latency.hedge_delay(stock_code) if latency is not None else None
+        failure = None
         
         try:
-            # 針對每個股票創建帶有等待條件的配置
-            config = CrawlerRunConfig(
-                cache_mode=base_config.cache_mode,
-                extraction_strategy=base_config.extraction_strategy,
-                scan_full_page=base_config.scan_full_page,
-                verbose=base_config.verbose,
-                # 等待關鍵元素載入完成
-                wait_for="js:() => document.querySelector('div.quotes-info div.deal') && document.querySelector('span.astock-code[c-model=\"id\"]') && document.querySelector('#quotesUl span[c-model=\"volume\"]')",
-                wait_for_timeout=15000,
-                page_timeout=30000
-            )
-            
-            result = await crawler.arun(url=url, config=config)
-            
-            if result.success and result.extracted_content:
-                try:
-                    data = json.loads(result.extracted_content)
-                    if data and len(data) > 0:
-                        stock_data = data[0]
-                        stock_data['stock_code'] = stock_code
-                        stock_data['update_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        return stock_data
-                except json.JSONDecodeError:
-                    print(f"✗ 股票 {stock_code} JSON 解析失敗")
-                    return None
-            else:
-                print(f"✗ 股票 {stock_code} 下載失敗")
-                return None
+            while pending:
+                wait_timeout = None
+                if hedge_after is not None and len(attempts) == 1:
+                    wait_timeout = max(0.0, started + hedge_after - time.monotonic())
+                done, pending = await asyncio.wait(
+                    pending, timeout=wait_timeout, return_when=asyncio.FIRST_COMPLETED
+                )
                 
-        except Exception as e:
-            print(f"✗ 股票 {stock_code} 發生錯誤: {e}")
+                if not done:
+                    # 超過 p95 仍未完成：對沖一次（超過對沖比例上限時繼續等待）
+                    hedge_after = None
+                    if latency.try_hedge():
+                        print(f"⚠ 股票 {stock_code} 超過延遲 p95，送出對沖請求")
+                        hedge = load()
+                        attempts.append(hedge)
+                        pending.add(hedge)
+                    continue
+                
+                for task in done:
+                    data, task_failure = task.result()
+                    if data is not None:
+                        if task is not primary:
+                            latency.hedge_wins += 1
+                        return data, None
+                    failure = failure or task_failure
+        finally:
+            # 取消尚未完成的請求（包含整體更新逾時被取消時）
+            for task in attempts:
+                if not task.done():
+                    task.cancel()
+        return None, failure
+    
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            return None
+        attempt += 1
+        
+        try:
+            async with limiter.slot():
+                started = time.monotonic()
+                stock_data, failure = await load_with_hedge()
+                elapsed = time.monotonic() - started
+                limiter.record(elapsed, stock_data is not None, failure == FAILURE_TIMEOUT)
+        except asyncio.CancelledError:
+            # 整體更新逾時取消時，釋放斷路器的試探請求（否則 half_open 會一直拒絕請求）
+            breaker.record_cancelled()
+            raise
+        
+        if stock_data is not None:
+            breaker.record_success()
+            if latency is not None:
+                latency.record(stock_code, elapsed)
+            if negative_cache is not None:
+                negative_cache.record_success(stock_code)
+            return stock_data
+        
+        if failure == FAILURE_EMPTY:
+            # 頁面正常回應但沒有資料：不是主機故障，也不重試
+            breaker.record_success()
+            if negative_cache is not None:
+                negative_cache.record_empty(stock_code)
+            return None
+        
+        # 每支股票只計一次主機失敗（重試用盡或不可重試時），
+        # 避免少數壞掉的股票靠重試就開啟整個 wantgoo 的斷路器；half_open 的試探失敗立即回報
+        retry = retry_policy.should_retry(failure, attempt)
+        if not retry or breaker.state != breaker.CLOSED:
+            breaker.record_failure()
+        if not retry or breaker.state == breaker.OPEN:
             return None
+        delay = retry_policy.delay(attempt)
+        print(f"⚠ 股票 {stock_code} {FAILURE_LABELS[failure]}，{delay:.1f} 秒後重試（第 {attempt} 次）")
+        await asyncio.sleep(delay)
 
 
-async def fetch_multiple_stocks(stock_codes: List[str]) -> List[Dict]:
+async def fetch_multiple_stocks(
+    stock_codes: List[str],
+    crawler_manager: CrawlerManager,
+    limiter: AdaptiveLimiter,
+    on_result: Optional[Callable[[str, Optional[Dict], int, int], None]] = None,
+    in_page: bool = True,
+    latency: Optional[LatencyTracker] = None,
+    negative_cache: Optional[NegativeCache] = None
+) -> List[Dict]:
     """
     批次並行爬取多支股票資訊
     
     Args:
         stock_codes: 股票代碼列表
+        crawler_manager: 長駐瀏覽器管理器（重複使用已啟動的瀏覽器）
+        limiter: 自適應並行數控制器（跨多次更新沿用）
+        on_result: 每支股票完成時立即呼叫，參數為 (股票代碼, 資料或 None, 已完成數, 總數)
+        in_page: 使用頁面內提取（只傳回欄位 JSON）；False 時取回完整 HTML，
+            在程序池中以相同的 schema 提取
+        latency: 各股票的延遲統計（超過 p95 時對沖），None 表示不對沖
+        negative_cache: 提取不到資料的股票的負向快取（跨多次更新沿用），None 表示不使用
     
     Returns:
         成功爬取的股票資訊列表
     """
+    # 第一次更新時才匯入 crawl4ai
+    from crawl4ai import CrawlerRunConfig, CacheMode
+    
     stock_schema = get_stock_schema()
-    extraction_strategy = JsonCssExtractionStrategy(schema=stock_schema)
     
-    browser_config = BrowserConfig(headless=True)
+    if in_page:
+        # 將 schema 編譯成頁面內腳本：等待就緒後直接提取欄位，
+        # 不捲動頁面，且只傳回 div.quotes-info 的 HTML，使 Markdown 產生幾乎不花時間
+        base_crawler_run_config = CrawlerRunConfig(
+            cache_mode=CacheMode.BYPASS,
+            js_code=compile_schema_js(
+                stock_schema, ready_js=STOCK_READY_JS, timeout_ms=STOCK_WAIT_TIMEOUT_MS
+            ),
+            css_selector="div.quotes-info",
+            scan_full_page=False,
+            page_timeout=30000,
+            verbose=False
+        )
+    else:
+        base_crawler_run_config = CrawlerRunConfig(
+            cache_mode=CacheMode.BYPASS,
+            scan_full_page=True,
+            verbose=False,
+            # 等待關鍵元素載入完成
+            wait_for=f"js:{STOCK_READY_JS}",
+            wait_for_timeout=STOCK_WAIT_TIMEOUT_MS,
+            page_timeout=30000
+        )
     
-    base_crawler_run_config = CrawlerRunConfig(
-        cache_mode=CacheMode.BYPASS,
-        extraction_strategy=extraction_strategy,
-        scan_full_page=True,
-        verbose=False
-    )
+    # 依延遲、錯誤率與記憶體動態調整同時爬取數量
+    limiter.begin_batch()
     
-    # 限制同時爬取數量
-    semaphore = asyncio.Semaphore(3)
+    # 中止報價頁面不需要的資源；攔截統計由同時進行的批次共用，
+    # 因此不重設，本輪只顯示期間的增加量
+    crawler_manager.add_blocking_profile(QUOTE_BLOCK_PROFILE)
+    block_baseline = QUOTE_BLOCK_PROFILE.stats()
     
-    async with AsyncWebCrawler(config=browser_config) as crawler:
-        tasks = [
-            fetch_single_stock(crawler, code, base_crawler_run_config, semaphore)
-            for code in stock_codes
-        ]
-        
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # 過濾成功的結果
-        successful_results = []
-        for result in results:
-            if isinstance(result, Exception):
-                print(f"發生異常: {result}")
-            elif result is not None:
+    async def fetch_with_code(code: str):
+        return code, await fetch_single_stock(
+            crawler_manager, code, base_crawler_run_config, limiter, in_page, latency,
+            negative_cache
+        )
+    
+    tasks = [asyncio.ensure_future(fetch_with_code(code)) for code in stock_codes]
+    
+    # 依完成順序逐筆回報，不必等待最慢的股票
+    successful_results = []
+    done_count = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                stock_code, result = await next_done
+            except Exception as e:
+                print(f"發生異常: {e}")
+                continue
+            
+            done_count += 1
+            if result is not None:
                 successful_results.append(result)
+            if on_result is not None:
+                on_result(stock_code, result, done_count, len(stock_codes))
+    finally:
+        # 整體更新逾時被取消時，一併取消仍在爬取的股票
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+    
+    stats = limiter.stats()
+    print(
+        f"並行數 {stats['limit']}（峰值 {stats['peak_in_flight']}），"
+        f"平均延遲 {stats['avg_latency']:.1f}s，"
+        f"錯誤 {stats['errors']}、逾時 {stats['timeouts']}"
+    )
+    if latency is not None:
+        latency_stats = latency.stats()
+        print(
+            f"延遲 p50 {latency_stats['p50']:.1f}s、p95 {latency_stats['p95']:.1f}s，"
+            f"累計對沖 {latency_stats['hedges']} 次（勝出 {latency_stats['hedge_wins']} 次）"
+        )
+    if not in_page:
+        extraction_stats = get_extraction_executor().stats()
+        print(
+            f"提取：事件迴圈 {extraction_stats['loop_tasks']} 次 {extraction_stats['loop_seconds']:.2f}s，"
+            f"程序池 {extraction_stats['pool_tasks']} 次 {extraction_stats['pool_seconds']:.2f}s"
+            f"（傳輸與排隊 {extraction_stats['pool_wait_seconds']:.2f}s）"
+        )
+    
+    breaker_stats = get_circuit_breaker(STOCK_URL_TEMPLATE.format(code="")).stats()
+    if breaker_stats['state'] != 'closed' or breaker_stats['rejected']:
+        print(f"斷路器：{breaker_stats['state']}，累計拒絕 {breaker_stats['rejected']} 個請求")
+    if negative_cache is not None:
+        negative_stats = negative_cache.stats()
+        if negative_stats['blocked']:
+            print(
+                f"負向快取：略過 {negative_stats['blocked']} 支提取不到資料的股票"
+                f"（累計 {negative_stats['skipped']} 次）"
+            )
+    
+    block_stats = QUOTE_BLOCK_PROFILE.stats_since(block_baseline)
+    print(
+        f"資源攔截：中止 {block_stats['requests_blocked']} 個請求"
+        f"（約省 {block_stats['bytes_saved_estimate'] / 1024:.0f} KB），"
+        f"放行 {block_stats['requests_allowed']} 個"
+        f"（{block_stats['bytes_received'] / 1024:.0f} KB）"
+    )
+    
+    return successful_results
+
+
+class WantgooBrowserSource(QuoteSource):
+    """以長駐瀏覽器爬取 wantgoo 報價頁面的報價來源（作為備援）"""
+    
+    name = "wantgoo"
+    
+    def __init__(
+        self,
+        crawler_manager: CrawlerManager,
+        limiter: AdaptiveLimiter,
+        latency: Optional[LatencyTracker] = None,
+        negative_cache: Optional[NegativeCache] = None
+    ):
+        """
+        Args:
+            crawler_manager: 長駐瀏覽器管理器
+            limiter: 自適應並行數控制器
+            latency: 各股票的延遲統計（跨多次更新沿用），None 時自動建立
+            negative_cache: 提取不到資料的股票的負向快取（跨多次更新沿用），None 時自動建立
+        """
+        self.crawler_manager = crawler_manager
+        self.limiter = limiter
+        self.latency = latency or LatencyTracker()
+        self.negative_cache = negative_cache or NegativeCache()
+    
+    async def fetch(self, stock_codes: List[str], on_result: QuoteCallback):
+        """並行爬取報價頁面"""
+        await fetch_multiple_stocks(
+            stock_codes,
+            self.crawler_manager,
+            self.limiter,
+            on_result=lambda code, data, done, total: on_result(code, data),
+            latency=self.latency,
+            negative_cache=self.negative_cache
+        )
+
+
+def shard_worker_main(worker_id: int, task_queue, result_queue):
+    """
+    分片爬取的工作程序進入點：建立自己的事件迴圈與長駐瀏覽器，依任務佇列爬取分片
+    
+    Args:
+        worker_id: 工作程序編號
+        task_queue: 此工作程序的任務佇列
+        result_queue: 所有工作程序共用的結果佇列
+    """
+    async def serve():
+        crawler_manager = CrawlerManager()
+        source = WantgooBrowserSource(crawler_manager, AdaptiveLimiter(initial=3, max_limit=8))
+        try:
+            await serve_shard(worker_id, task_queue, result_queue, source.fetch)
+        finally:
+            await crawler_manager.close()
+    
+    asyncio.run(serve())
+
+
+class ShardedBrowserSource(QuoteSource):
+    """
+    將報價頁面分散到多個工作程序爬取的報價來源（觀察大量股票時使用）
+    
+    股票數少於 min_codes 時直接使用本程序的瀏覽器，避免啟動工作程序的成本。
+    """
+    
+    name = "wantgoo"
+    
+    def __init__(self, local_source: WantgooBrowserSource, workers: int, min_codes: int = SHARD_MIN_CODES):
+        """
+        Args:
+            local_source: 股票數少時使用的本程序瀏覽器來源
+            workers: 工作程序數
+            min_codes: 改用工作程序爬取的最少股票數
+        """
+        self.local_source = local_source
+        self.min_codes = min_codes
+        self.pool = ShardPool(shard_worker_main, workers=workers, name="wantgoo 分片爬取")
+    
+    async def fetch(self, stock_codes: List[str], on_result: QuoteCallback):
+        """股票數多時分片到各工作程序並行爬取，否則在本程序爬取"""
+        if len(stock_codes) < self.min_codes:
+            await self.local_source.fetch(stock_codes, on_result)
+            return
         
-        return successful_results
+        started = time.perf_counter()
+        await self.pool.run(stock_codes, on_result)
+        stats = self.pool.stats()
+        print(
+            f"分片爬取 {len(stock_codes)} 支股票：{stats['workers']} 個工作程序"
+            f"（運作中 {stats['alive']}，累計重新啟動 {stats['restarts']} 次），"
+            f"耗時 {time.perf_counter() - started:.1f}s"
+        )
+    
+    def close(self):
+        """結束所有工作程序"""
+        self.pool.stop()
+
+
+def create_quote_source(
+    crawler_manager: CrawlerManager,
+    limiter: AdaptiveLimiter,
+    shards: int = BROWSER_SHARDS
+) -> FallbackQuoteSource:
+    """
+    建立預設的報價來源：先批次查詢 TWSE 即時報價，查不到的股票再用瀏覽器爬取
+    
+    Args:
+        crawler_manager: 長駐瀏覽器管理器
+        limiter: 自適應並行數控制器
+        shards: 瀏覽器備援的工作程序數，1 表示只在本程序爬取
+    
+    Returns:
+        依序嘗試各來源的報價來源
+    """
+    browser_source = WantgooBrowserSource(crawler_manager, limiter)
+    if shards > 1:
+        browser_source = ShardedBrowserSource(browser_source, workers=shards)
+    return FallbackQuoteSource([
+        TwseBatchSource(batch_size=50),
+        browser_source,
+    ])
+
+
+async def fetch_quotes(
+    stock_codes: List[str],
+    quote_source: QuoteSource,
+    on_result: Optional[Callable[[str, Optional[Dict], int, int], None]] = None,
+    deadline: Optional[float] = None,
+    source_counts: Optional[Dict[str, int]] = None
+) -> List[Dict]:
+    """
+    從報價來源取得多支股票資訊
+    
+    每支股票以 "stock:<代碼>" 合併：已有進行中查詢的股票（例如自動與手動更新重疊）
+    直接等待該次查詢的結果，只向報價來源查詢其餘的股票。
+    超過 deadline 仍未完成的股票會被取消並回報 None（GUI 沿用舊資料並標示為延遲）。
+    
+    Args:
+        stock_codes: 股票代碼列表（依優先順序）
+        quote_source: 報價來源
+        on_result: 每支股票完成時立即呼叫，參數為 (股票代碼, 資料或 None, 已完成數, 總數)
+        deadline: 整體更新的期限（秒），None 表示不限
+        source_counts: 本次更新各來源成功的股票數（逐支填入，逾時也保留已完成的部分；
+            quote_source 需為 FallbackQuoteSource），None 表示不統計
+    
+    Returns:
+        成功取得的股票資訊列表
+    """
+    flights = get_single_flight()
+    successful_results = []
+    done_count = 0
+    
+    owned: Dict[str, Future] = {}
+    joined: Dict[str, Future] = {}
+    for code in stock_codes:
+        future, is_owner = flights.acquire(f"{STOCK_FLIGHT_PREFIX}{code}")
+        (owned if is_owner else joined)[code] = future
+    if joined:
+        print(f"✓ {len(joined)} 支股票已在查詢中，直接使用該次查詢的結果")
+    
+    def report(stock_code: str, stock_data: Optional[Dict]):
+        nonlocal done_count
+        done_count += 1
+        if stock_data is not None:
+            successful_results.append(stock_data)
+        if on_result is not None:
+            on_result(stock_code, stock_data, done_count, len(stock_codes))
+    
+    def handle(stock_code: str, stock_data: Optional[Dict]):
+        future = owned.get(stock_code)
+        if future is None or future.done():
+            return
+        future.set_result(stock_data)
+        report(stock_code, stock_data)
+    
+    unfinished = []
+    
+    async def fetch_owned():
+        if not owned:
+            return
+        try:
+            if source_counts is not None:
+                await quote_source.fetch(list(owned), handle, counts=source_counts)
+            else:
+                await quote_source.fetch(list(owned), handle)
+        finally:
+            # 報價來源沒有回報（或逾時被取消）的股票也要完成，讓等待中的查詢結束
+            for code, future in owned.items():
+                if not future.done():
+                    unfinished.append(code)
+                    future.set_result(None)
+                    report(code, None)
+    
+    async def fetch_owned_until_deadline():
+        try:
+            await asyncio.wait_for(fetch_owned(), deadline)
+        except asyncio.TimeoutError:
+            print(f"⚠ 更新超過 {deadline:g} 秒，取消仍在查詢的 {len(unfinished)} 支股票（沿用舊資料）")
+    
+    async def wait_joined(stock_code: str, future: Future):
+        report(stock_code, await asyncio.wrap_future(future))
+    
+    await asyncio.gather(
+        fetch_owned_until_deadline(),
+        *(wait_joined(code, future) for code, future in joined.items())
+    )
+    return successful_results
 
 
-def run_crawler_in_thread(stock_codes: List[str], result_queue: queue.Queue):
+def run_crawler_in_thread(
+    stock_codes: List[str],
+    result_queue: queue.Queue,
+    quote_source: FallbackQuoteSource,
+    limiter: AdaptiveLimiter
+):
     """
-    在背景執行緒中執行爬蟲任務
+    將報價更新任務送到共用的背景事件迴圈執行
+    
+    每支股票完成時立即放入 ('stock', (代碼, 資料, 已完成數, 總數))，
+    全部完成後放入 ('sources', 各來源成功數)、('concurrency', 並行統計)、
+    ('flights', 股票查詢的累計執行與合併次數) 與 ('success', 結果列表)。
     
     Args:
-        stock_codes: 要爬取的股票代碼列表
+        stock_codes: 要更新的股票代碼列表
         result_queue: 用於傳遞結果的佇列
+        quote_source: 報價來源
+        limiter: 瀏覽器來源使用的自適應並行數控制器
     """
-    try:
-        # 在執行緒中建立新的事件迴圈
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        results = loop.run_until_complete(fetch_multiple_stocks(stock_codes))
-        result_queue.put(('success', results))
-        
-        loop.close()
-    except Exception as e:
-        result_queue.put(('error', str(e)))
+    def on_result(stock_code, stock_data, done, total):
+        result_queue.put(('stock', (stock_code, stock_data, done, total)))
+
+    # 各來源成功數只統計本次更新（與同時進行的排程更新互不影響）
+    source_counts: Dict[str, int] = {}
+
+    def on_done(future):
+        try:
+            results = future.result()
+            result_queue.put(('sources', dict(source_counts)))
+            result_queue.put(('concurrency', limiter.stats()))
+            result_queue.put(('flights', get_single_flight().totals(STOCK_FLIGHT_PREFIX)))
+            result_queue.put(('success', results))
+        except Exception as e:
+            result_queue.put(('error', str(e)))
+
+    get_runtime().submit(
+        fetch_quotes(
+            stock_codes, quote_source, on_result,
+            deadline=REFRESH_DEADLINE, source_counts=source_counts
+        ),
+        callback=on_done
+    )
+
+
+def run_scheduled_refresh(
+    stock_codes: List[str],
+    result_queue: queue.Queue,
+    quote_source: FallbackQuoteSource
+):
+    """
+    將一批到期的股票送到共用的背景事件迴圈更新（自動更新排程使用）
+    
+    每支股票完成時放入 ('scheduled', (代碼, 資料))，
+    整批完成後放入 ('scheduled_done', (代碼列表, 錯誤訊息或 None))。
+    
+    Args:
+        stock_codes: 到期的股票代碼列表
+        result_queue: 用於傳遞結果的佇列
+        quote_source: 報價來源
+    """
+    def on_result(stock_code, stock_data, done, total):
+        result_queue.put(('scheduled', (stock_code, stock_data)))
+
+    def on_done(future):
+        try:
+            future.result()
+            result_queue.put(('scheduled_done', (stock_codes, None)))
+        except Exception as e:
+            result_queue.put(('scheduled_done', (stock_codes, str(e))))
+
+    get_runtime().submit(
+        fetch_quotes(stock_codes, quote_source, on_result, deadline=REFRESH_DEADLINE),
+        callback=on_done
+    )
 
 
 # ==================== GUI 主程式 ====================
@@ -235,19 +797,65 @@ class StockMonitorApp:
         # 股票資料快取
         self.stock_data_cache: Dict[str, Dict] = {}
         
+        # 畫面內可見的股票（更新時優先爬取）
+        self.visible_stocks: List[str] = []
+        
+        # 股票清單與搜尋索引（於 load_tw_stocks 建立）
+        self.all_stocks: List[Tuple[str, str]] = []
+        self.search_index = StockSearchIndex([])
+        self.search_after_id = None
+        self.tree_filled_count = 0
+        self.tree_fill_after_id = None
+        
+        # 啟動時間（秒，自程式開始執行起算；股票清單為載入耗時）
+        self.startup_timings: Dict[str, float] = {'匯入模組': IMPORT_DONE - STARTUP_T0}
+        
         # 自動更新相關
         self.auto_update_enabled = False
         self.update_timer_id = None
-        self.is_updating = False
+        self.refresh_scheduler = StaggeredRefreshScheduler(interval=AUTO_UPDATE_INTERVAL)
+        # 交易時段與活躍度決定更新間隔，並限制每分鐘查詢的股票數
+        self.refresh_policy = RefreshPolicy(TradingCalendar.load(HOLIDAY_FILE), budget_per_minute=120)
+        self.market_session: Optional[str] = None
+        # 進行中的更新數（自動與手動更新可重疊，相同股票的查詢會被合併）
+        self.active_updates = 0
+        self.last_flight_totals: Dict[str, int] = {}
         
         # 爬蟲結果佇列
         self.result_queue = queue.Queue()
         
+        # 長駐瀏覽器（綁定在程序共用的背景事件迴圈上）
+        self.crawler_manager = get_shared_crawler_manager()
+        
+        # 自適應並行數（跨多次更新沿用學到的並行數）
+        self.concurrency_limiter = AdaptiveLimiter(initial=3, max_limit=16)
+        self.last_crawl_stats: Dict = {}
+        
+        # 報價來源：TWSE 批次即時報價為主，瀏覽器爬蟲為備援
+        self.quote_source = create_quote_source(self.crawler_manager, self.concurrency_limiter)
+        self.last_source_counts: Dict[str, int] = {}
+        
+        # 即時模式：每支股票保持一個分頁，報價變動時由頁面推送
+        self.live_mode_enabled = False
+        self.live_sync_after_id = None
+        self.live_quotes = LiveQuoteManager(
+            self.crawler_manager,
+            get_stock_schema(),
+            STOCK_URL_TEMPLATE,
+            STOCK_READY_JS,
+            STOCK_WATCH_SELECTOR,
+            on_update=lambda code, data: self.result_queue.put(('live', (code, data))),
+            max_tabs=8,
+            rotate_interval=30.0,
+            timeout_ms=STOCK_WAIT_TIMEOUT_MS
+        )
+        
         # 建立 UI
         self.setup_ui()
+        self.startup_timings['建立介面'] = time.perf_counter() - STARTUP_T0
         
-        # 載入台灣股票清單
-        self.load_tw_stocks()
+        # 視窗先繪製出來，再載入台灣股票清單
+        self.root.after_idle(self.on_first_paint)
         
         # 綁定視窗關閉事件
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -290,12 +898,22 @@ class StockMonitorApp:
         self.auto_update_var = tk.BooleanVar(value=False)
         auto_update_check = ttk.Checkbutton(
             toolbar,
-            text="自動更新 (每分鐘)",
+            text="自動更新 (依盤況)",
             variable=self.auto_update_var,
             command=self.toggle_auto_update
         )
         auto_update_check.pack(side=tk.LEFT, padx=5)
         
+        # 即時模式開關
+        self.live_mode_var = tk.BooleanVar(value=False)
+        live_mode_check = ttk.Checkbutton(
+            toolbar,
+            text="即時模式 (保持分頁開啟)",
+            variable=self.live_mode_var,
+            command=self.toggle_live_mode
+        )
+        live_mode_check.pack(side=tk.LEFT, padx=5)
+        
         # 狀態標籤
         self.status_label = ttk.Label(toolbar, text="就緒")
         self.status_label.pack(side=tk.LEFT, padx=20)
@@ -458,58 +1076,80 @@ class StockMonitorApp:
             font=('Arial', 12, 'bold')
         ).pack(pady=5)
         
-        # 滾動區域
-        canvas = tk.Canvas(right_frame)
-        scrollbar = ttk.Scrollbar(right_frame, orient="vertical", command=canvas.yview)
-        self.stocks_container = ttk.Frame(canvas)
-        
-        self.stocks_container.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=self.stocks_container, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side="left", fill="both", expand=True, padx=5, pady=5)
-        scrollbar.pack(side="right", fill="y")
-        
-        # 空狀態提示
-        self.empty_label = ttk.Label(
-            self.stocks_container,
-            text="📊 尚未加入任何股票\n\n請從左側清單選擇股票加入觀察",
-            font=('Arial', 12),
-            foreground='gray'
+        # 虛擬化卡片格狀檢視（只建立畫面內看得到的卡片）
+        self.stock_grid = VirtualStockGrid(
+            right_frame,
+            on_remove=self.remove_from_watchlist,
+            data_source=self.stock_data_cache.get,
+            on_visible_change=self.on_visible_stocks_change
         )
-        self.empty_label.pack(pady=50)
     
     def load_tw_stocks(self):
-        """載入台灣股票清單"""
+        """載入台灣股票清單（優先使用快照），並分批填入 Treeview"""
         # TODO: Phase 4.1 - 整合 twstock
         try:
-            # 取得所有上市公司代碼
-            self.all_stocks = []
+            started = time.perf_counter()
             
-            # twstock.codes 包含所有股票代碼資訊
-            for code, info in twstock.codes.items():
-                if info.type == '股票':  # 只顯示股票類型
-                    self.all_stocks.append((code, info.name))
+            # 依代碼排序的上市櫃股票清單，twstock 資料未變動時直接讀取快照
+            self.all_stocks, from_snapshot = load_stock_universe()
             
-            # 依代碼排序
-            self.all_stocks.sort(key=lambda x: x[0])
-            
-            # 顯示在 Treeview 中
-            for code, name in self.all_stocks:
-                self.stock_tree.insert('', tk.END, values=(code, name))
+            # 建立搜尋索引（只建立一次）
+            self.search_index = StockSearchIndex(self.all_stocks)
+            self.startup_timings['股票清單'] = time.perf_counter() - started
             
             # 更新統計資訊
             self.update_stock_count(len(self.all_stocks))
             
-            print(f"✓ 載入 {len(self.all_stocks)} 支台灣股票")
+            source = "快照" if from_snapshot else "twstock"
+            print(f"✓ 載入 {len(self.all_stocks)} 支台灣股票（{source}）")
+            
+            # 閒置時分批顯示在 Treeview 中
+            self.populate_stock_tree()
             
         except Exception as e:
             messagebox.showerror("錯誤", f"載入股票清單失敗: {e}")
     
+    def populate_stock_tree(self, chunk_size: int = 200):
+        """
+        在閒置時分批將股票插入 Treeview，避免一次插入凍結視窗
+        
+        以代碼作為項目 id，搜尋時重複使用同一批項目。
+        
+        Args:
+            chunk_size: 每批插入的筆數
+        """
+        start = self.tree_filled_count
+        end = min(start + chunk_size, len(self.all_stocks))
+        
+        for code, name in self.all_stocks[start:end]:
+            self.stock_tree.insert('', tk.END, iid=code, values=(code, name))
+        self.tree_filled_count = end
+        
+        if end < len(self.all_stocks):
+            self.tree_fill_after_id = self.root.after_idle(self.populate_stock_tree, chunk_size)
+            return
+        
+        self.tree_fill_after_id = None
+        self.startup_timings['清單填入完成'] = time.perf_counter() - STARTUP_T0
+        self.report_startup_timings()
+        
+        # 填入期間使用者已輸入搜尋條件
+        if self.search_var.get().strip():
+            self.apply_search()
+    
+    def on_first_paint(self):
+        """視窗第一次繪製完成後記錄時間，再開始載入股票清單"""
+        self.startup_timings['首次繪製'] = time.perf_counter() - STARTUP_T0
+        self.load_tw_stocks()
+    
+    def report_startup_timings(self):
+        """輸出啟動時間報告（毫秒），方便觀察啟動效能是否退步"""
+        parts = [
+            f"{name} {seconds * 1000:.0f} ms"
+            for name, seconds in self.startup_timings.items()
+        ]
+        print(f"⏱ 啟動時間：{'、'.join(parts)}")
+    
     def update_stock_count(self, count: int, total: int = None):
         """更新股票數量統計"""
         if total is not None:
@@ -519,24 +1159,28 @@ class StockMonitorApp:
         self.stock_count_label.config(text=text)
     
     def on_search(self, *args):
-        """搜尋框文字變更時觸發"""
+        """搜尋框文字變更時觸發（延遲執行，連續輸入只搜尋一次）"""
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(150, self.apply_search)
+    
+    def apply_search(self):
+        """依搜尋索引過濾並排序股票清單"""
         # TODO: Phase 4.3 - 實作搜尋功能
-        search_text = self.search_var.get().lower()
+        self.search_after_id = None
+        search_text = self.search_var.get().strip()
         
-        # 清空 Treeview
-        for item in self.stock_tree.get_children():
-            self.stock_tree.delete(item)
+        # 清單尚未分批填完時，等填入完成後再套用搜尋
+        if self.tree_fill_after_id is not None:
+            return
         
-        # 過濾並顯示符合的股票
-        matched_count = 0
-        for code, name in self.all_stocks:
-            if search_text in code.lower() or search_text in name.lower():
-                self.stock_tree.insert('', tk.END, values=(code, name))
-                matched_count += 1
+        # 以索引查詢，並用一次 set_children 重新掛上符合的既有項目（其餘自動卸下）
+        matched = self.search_index.search(search_text)
+        self.stock_tree.set_children('', *(self.all_stocks[idx][0] for idx in matched))
         
         # 更新統計資訊
         if search_text:
-            self.update_stock_count(matched_count, total=len(self.all_stocks))
+            self.update_stock_count(len(matched), total=len(self.all_stocks))
         else:
             self.update_stock_count(len(self.all_stocks))
     
@@ -573,214 +1217,39 @@ class StockMonitorApp:
             self.watchlist.remove(stock_code)
             if stock_code in self.stock_data_cache:
                 del self.stock_data_cache[stock_code]
+            self.refresh_policy.forget(stock_code)
             self.update_watchlist_display()
     
     def update_watchlist_display(self):
-        """更新右側觀察清單顯示"""
-        # TODO: Phase 5 - 實作資料顯示
-        # 清空現有顯示
-        for widget in self.stocks_container.winfo_children():
-            widget.destroy()
+        """
+        更新右側觀察清單顯示
         
-        if not self.watchlist:
-            # 顯示空狀態
-            self.empty_label = ttk.Label(
-                self.stocks_container,
-                text="📊 尚未加入任何股票\n\n請從左側清單選擇股票加入觀察",
-                font=('Arial', 14),
-                foreground='gray'
-            )
-            self.empty_label.pack(pady=50)
-        else:
-            # 使用三欄布局顯示股票卡片
-            sorted_stocks = sorted(self.watchlist)
-            current_row_frame = None
-            
-            for idx, stock_code in enumerate(sorted_stocks):
-                col = idx % 3  # 0, 1, 或 2（左、中、右欄）
-                
-                # 為每一列創建 Frame
-                if col == 0:
-                    current_row_frame = ttk.Frame(self.stocks_container)
-                    current_row_frame.pack(fill=tk.X, padx=5, pady=5)
-                
-                self.create_stock_card(stock_code, current_row_frame, col)
+        卡片由虛擬化格狀檢視管理：只有畫面內的股票會有卡片元件，
+        觀察清單成員變動時才重新計算版面。
+        """
+        self.stock_grid.set_codes(sorted(self.watchlist))
+        self.schedule_live_sync()
+        if self.auto_update_enabled:
+            self.refresh_scheduler.set_codes(self.prioritized_codes())
     
-    def create_stock_card(self, stock_code: str, parent_frame: ttk.Frame, column: int):
+    def refresh_stock_card(self, stock_code: str):
         """
-        建立股票資訊卡片
+        只更新單一股票卡片（資料到達時使用）
         
         Args:
             stock_code: 股票代碼
-            parent_frame: 父容器
-            column: 欄位編號（0 或 1）
         """
-        # 主卡片容器
-        card_frame = ttk.LabelFrame(
-            parent_frame,
-            text=f"  股票 {stock_code}  ",
-            padding=15
-        )
-        card_frame.grid(row=0, column=column, sticky="nsew", padx=5, pady=5)
-        parent_frame.columnconfigure(column, weight=1)
-        
-        # 取得快取資料
-        stock_data = self.stock_data_cache.get(stock_code)
-        
-        if stock_data:
-            # 內容容器
-            content_frame = ttk.Frame(card_frame)
-            content_frame.pack(fill=tk.BOTH, expand=True)
-            
-            # === 標題區（股票代碼與名稱） ===
-            header_frame = ttk.Frame(content_frame)
-            header_frame.pack(fill=tk.X, pady=(0, 10))
-            
-            ttk.Label(
-                header_frame,
-                text=f"{stock_data.get('股票號碼', 'N/A')}",
-                font=('Arial', 20, 'bold')
-            ).pack(side=tk.LEFT)
-            
-            ttk.Label(
-                header_frame,
-                text=f"{stock_data.get('股票名稱', 'N/A')}",
-                font=('Arial', 18)
-            ).pack(side=tk.LEFT, padx=(10, 0))
-            
-            # === 即時價格區（大字體顯示） ===
-            price_frame = ttk.Frame(content_frame)
-            price_frame.pack(fill=tk.X, pady=(0, 10))
-            
-            price_text = stock_data.get('即時價格', 'N/A')
-            price_label = tk.Label(
-                price_frame,
-                text=price_text,
-                font=('Arial', 36, 'bold'),
-                fg='black'
-            )
-            price_label.pack(side=tk.LEFT)
-            
-            # 漲跌顯示（帶顏色）
-            change = stock_data.get('漲跌', 'N/A')
-            change_rate = stock_data.get('漲跌百分比', 'N/A')
-            
-            # 判斷漲跌顏色
-            color = 'black'
-            if change != 'N/A' and change:
-                try:
-                    change_value = float(change.replace(',', ''))
-                    if change_value > 0:
-                        color = '#d32f2f'  # 紅色（漲）
-                        change = f"▲ {change}"
-                    elif change_value < 0:
-                        color = '#388e3c'  # 綠色（跌）
-                        change = f"▼ {change}"
-                except:
-                    pass
-            
-            change_frame = ttk.Frame(price_frame)
-            change_frame.pack(side=tk.LEFT, padx=(15, 0))
-            
-            tk.Label(
-                change_frame,
-                text=change,
-                font=('Arial', 20, 'bold'),
-                fg=color
-            ).pack()
-            
-            tk.Label(
-                change_frame,
-                text=change_rate,
-                font=('Arial', 17),
-                fg=color
-            ).pack()
-            
-            # === 詳細資訊區（兩欄佈局） ===
-            info_frame = ttk.Frame(content_frame)
-            info_frame.pack(fill=tk.X, pady=(5, 10))
-            
-            # 左欄
-            left_col = ttk.Frame(info_frame)
-            left_col.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-            
-            self._add_info_row(left_col, "開盤", stock_data.get('開盤價', 'N/A'))
-            self._add_info_row(left_col, "最高", stock_data.get('最高價', 'N/A'))
-            self._add_info_row(left_col, "最低", stock_data.get('最低價', 'N/A'))
-            
-            # 右欄
-            right_col = ttk.Frame(info_frame)
-            right_col.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(20, 0))
-            
-            self._add_info_row(right_col, "成交量", stock_data.get('成交量(張)', 'N/A'))
-            self._add_info_row(right_col, "昨收", stock_data.get('前一日收盤價', 'N/A'))
-            self._add_info_row(right_col, "更新", stock_data.get('update_time', 'N/A'), size=11)
-            
-        else:
-            # 等待資料
-            ttk.Label(
-                card_frame,
-                text="⏳ 等待更新資料...",
-                font=('Arial', 16),
-                foreground='gray'
-            ).pack(pady=20)
-        
-        # === 移除按鈕區 ===
-        btn_frame = ttk.Frame(card_frame)
-        btn_frame.pack(fill=tk.X, pady=(10, 0))
-        
-        # 使用 tk.Button 以便自訂顏色
-        remove_btn = tk.Button(
-            btn_frame,
-            text="✕ 移除",
-            command=lambda: self.remove_from_watchlist(stock_code),
-            font=('Arial', 13, 'bold'),
-            bg='#f44336',
-            fg='#FFFF00',  # 黃色文字
-            activebackground='#d32f2f',
-            activeforeground='#FFFF00',
-            relief=tk.FLAT,
-            cursor='hand2',
-            padx=20,
-            pady=8
-        )
-        remove_btn.pack(side=tk.RIGHT)
-        
-        # 滑鼠懸停效果
-        def on_enter(e):
-            remove_btn.config(bg='#d32f2f')
-        
-        def on_leave(e):
-            remove_btn.config(bg='#f44336')
-        
-        remove_btn.bind("<Enter>", on_enter)
-        remove_btn.bind("<Leave>", on_leave)
+        self.stock_grid.update_stock(stock_code)
     
-    def _add_info_row(self, parent, label: str, value: str, size: int = 14):
+    def on_visible_stocks_change(self, visible_codes: List[str]):
         """
-        添加資訊列
+        畫面內可見的股票改變時記錄下來，下次更新優先爬取
         
         Args:
-            parent: 父容器
-            label: 標籤文字
-            value: 數值
-            size: 字體大小
+            visible_codes: 可見的股票代碼列表
         """
-        row = ttk.Frame(parent)
-        row.pack(fill=tk.X, pady=3)
-        
-        ttk.Label(
-            row,
-            text=f"{label}:",
-            font=('Arial', size),
-            foreground='#666'
-        ).pack(side=tk.LEFT)
-        
-        ttk.Label(
-            row,
-            text=value,
-            font=('Arial', size, 'bold')
-        ).pack(side=tk.LEFT, padx=(5, 0))
+        self.visible_stocks = visible_codes
+        self.schedule_live_sync()
     
     def manual_update(self):
         """手動更新股票資料"""
@@ -789,26 +1258,33 @@ class StockMonitorApp:
             messagebox.showinfo("提示", "觀察清單為空，請先加入股票")
             return
         
-        if self.is_updating:
-            messagebox.showinfo("提示", "正在更新中，請稍候...")
-            return
-        
+        # 更新進行中也可以手動更新：仍在查詢的股票會直接等待該次查詢的結果
         self.start_update()
     
+    @property
+    def is_updating(self) -> bool:
+        """是否有進行中的更新"""
+        return self.active_updates > 0
+    
     def start_update(self):
         """開始更新股票資料"""
-        self.is_updating = True
-        self.update_btn.config(state=tk.DISABLED)
+        self.active_updates += 1
         self.status_label.config(text=f"🔄 更新中... (0/{len(self.watchlist)})")
         
-        # 在背景執行緒中執行爬蟲
-        stock_codes = list(self.watchlist)
-        thread = threading.Thread(
-            target=run_crawler_in_thread,
-            args=(stock_codes, self.result_queue),
-            daemon=True
+        # 在背景事件迴圈中執行爬蟲（畫面內可見的股票排在最前面）
+        run_crawler_in_thread(
+            self.prioritized_codes(), self.result_queue, self.quote_source, self.concurrency_limiter
         )
-        thread.start()
+    
+    def prioritized_codes(self) -> List[str]:
+        """
+        觀察清單的股票代碼（畫面內可見的股票排在最前面）
+        
+        Returns:
+            股票代碼列表
+        """
+        visible = [code for code in self.visible_stocks if code in self.watchlist]
+        return visible + sorted(self.watchlist - set(visible))
     
     def check_queue(self):
         """檢查爬蟲結果佇列"""
@@ -816,7 +1292,21 @@ class StockMonitorApp:
             while True:
                 msg_type, data = self.result_queue.get_nowait()
                 
-                if msg_type == 'success':
+                if msg_type == 'stock':
+                    self.on_stock_result(*data)
+                elif msg_type == 'live':
+                    self.on_live_quote(*data)
+                elif msg_type == 'scheduled':
+                    self.on_scheduled_result(*data)
+                elif msg_type == 'scheduled_done':
+                    self.on_scheduled_batch_done(*data)
+                elif msg_type == 'sources':
+                    self.last_source_counts = data
+                elif msg_type == 'concurrency':
+                    self.last_crawl_stats = data
+                elif msg_type == 'flights':
+                    self.last_flight_totals = data
+                elif msg_type == 'success':
                     self.on_update_complete(data)
                 elif msg_type == 'error':
                     self.on_update_error(data)
@@ -827,30 +1317,138 @@ class StockMonitorApp:
         # 每 100ms 檢查一次
         self.root.after(100, self.check_queue)
     
-    def on_update_complete(self, results: List[Dict]):
-        """更新完成回調"""
-        # 更新快取
-        for stock_data in results:
-            stock_code = stock_data.get('stock_code')
-            if stock_code:
-                self.stock_data_cache[stock_code] = stock_data
+    def on_stock_result(
+        self,
+        stock_code: str,
+        stock_data: Optional[Dict],
+        done: int,
+        total: int
+    ):
+        """
+        單支股票完成回調：立即更新該股票的卡片與進度
         
-        # 更新顯示
-        self.update_watchlist_display()
+        Args:
+            stock_code: 股票代碼
+            stock_data: 股票資料，失敗時為 None（保留舊資料）
+            done: 已完成數量
+            total: 本次更新總數
+        """
+        self.status_label.config(text=f"🔄 更新中... ({done}/{total})")
+        
+        # 更新期間已被移除的股票不再顯示
+        if stock_code not in self.watchlist:
+            return
+        if stock_data is None:
+            self.mark_stale(stock_code)
+            return
+        
+        self.refresh_scheduler.record_success(stock_code)
+        self.refresh_policy.observe(stock_code, stock_data)
+        self.stock_data_cache[stock_code] = stock_data
+        self.refresh_stock_card(stock_code)
+    
+    def on_scheduled_result(self, stock_code: str, stock_data: Optional[Dict]):
+        """
+        自動更新排程中單支股票完成：依活躍度排定下一次更新並更新卡片
+        
+        Args:
+            stock_code: 股票代碼
+            stock_data: 股票資料，失敗時為 None（保留舊資料）
+        """
+        if stock_data is not None:
+            self.refresh_policy.observe(stock_code, stock_data)
+            self.refresh_scheduler.set_interval(
+                stock_code, self.refresh_policy.interval_for(stock_code, self.market_session)
+            )
+        self.refresh_scheduler.mark_done(stock_code, stock_data is not None)
+        if stock_code not in self.watchlist:
+            return
+        if stock_data is None:
+            self.mark_stale(stock_code)
+            return
+        
+        self.stock_data_cache[stock_code] = stock_data
+        self.refresh_stock_card(stock_code)
+        self.last_update_label.config(text=f"最後更新: {stock_data['update_time']}")
+    
+    def mark_stale(self, stock_code: str):
+        """
+        本次沒有取得新資料（失敗或超過更新期限）：沿用舊資料並在卡片標示為延遲
+        
+        Args:
+            stock_code: 股票代碼
+        """
+        cached = self.stock_data_cache.get(stock_code)
+        if cached is None or cached.get('stale'):
+            return
+        self.stock_data_cache[stock_code] = {**cached, 'stale': True}
+        self.refresh_stock_card(stock_code)
+    
+    def on_scheduled_batch_done(self, stock_codes: List[str], error_msg: Optional[str]):
+        """
+        自動更新排程的一批完成：顯示資料新鮮度
+        
+        Args:
+            stock_codes: 該批的股票代碼
+            error_msg: 錯誤訊息，成功時為 None
+        """
+        self.refresh_scheduler.finish_batch(stock_codes)
+        if error_msg is not None:
+            print(f"✗ 自動更新批次失敗: {error_msg}")
+        
+        if self.is_updating or self.live_mode_enabled or not self.auto_update_enabled:
+            return
+        stats = self.refresh_scheduler.stats()
+        label = SESSION_LABELS.get(self.market_session, "")
+        text = f"⏱ {label}自動更新中（最久 {stats['max_staleness']:.0f} 秒未更新"
+        active = self.refresh_policy.stats()['active']
+        if active:
+            text += f"，{active} 支活躍"
+        if stats['overdue']:
+            text += f"，{stats['overdue']} 支逾時"
+        self.status_label.config(text=text + "）")
+    
+    def on_live_quote(self, stock_code: str, stock_data: Dict):
+        """
+        即時模式報價變動回調
+        
+        Args:
+            stock_code: 股票代碼
+            stock_data: 合併變動欄位後的完整資料
+        """
+        if not self.live_mode_enabled or stock_code not in self.watchlist:
+            return
         
+        self.refresh_scheduler.record_success(stock_code)
+        self.stock_data_cache[stock_code] = stock_data
+        self.refresh_stock_card(stock_code)
+        self.last_update_label.config(text=f"最後更新: {stock_data['update_time']}")
+    
+    def on_update_complete(self, results: List[Dict]):
+        """更新完成回調（各股票卡片已在資料到達時逐筆更新）"""
         # 更新狀態
-        self.is_updating = False
-        self.update_btn.config(state=tk.NORMAL)
+        self.active_updates -= 1
         current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        self.status_label.config(text=f"✓ 更新完成")
+        # 顯示各報價來源的成功數；有用到瀏覽器時一併顯示並行數
+        details = [f"{name} {count}" for name, count in self.last_source_counts.items()]
+        concurrency = self.last_crawl_stats.get('limit')
+        if concurrency and WantgooBrowserSource.name in self.last_source_counts:
+            details.append(f"並行數 {concurrency}")
+        if self.last_flight_totals.get('joins'):
+            details.append(f"累計合併查詢 {self.last_flight_totals['joins']}")
+        if details:
+            self.status_label.config(text=f"✓ 更新完成（{'、'.join(details)}）")
+        else:
+            self.status_label.config(text=f"✓ 更新完成")
         self.last_update_label.config(text=f"最後更新: {current_time}")
         
         print(f"✓ 成功更新 {len(results)}/{len(self.watchlist)} 支股票")
+        if self.last_source_counts:
+            print(f"報價來源：{'、'.join(details)}")
     
     def on_update_error(self, error_msg: str):
         """更新錯誤回調"""
-        self.is_updating = False
-        self.update_btn.config(state=tk.NORMAL)
+        self.active_updates -= 1
         self.status_label.config(text=f"✗ 更新失敗")
         messagebox.showerror("錯誤", f"更新股票資料時發生錯誤:\n{error_msg}")
     
@@ -860,27 +1458,114 @@ class StockMonitorApp:
         self.auto_update_enabled = self.auto_update_var.get()
         
         if self.auto_update_enabled:
-            print("✓ 啟用自動更新（每 60 秒）")
+            print(f"✓ 啟用自動更新（每支股票每 {AUTO_UPDATE_INTERVAL:.0f} 秒，錯開排程）")
+            self.refresh_scheduler.set_codes(self.prioritized_codes())
             self.schedule_auto_update()
         else:
             print("✗ 停用自動更新")
             if self.update_timer_id:
                 self.root.after_cancel(self.update_timer_id)
                 self.update_timer_id = None
+            self.refresh_scheduler.clear()
+            self.market_session = None
+    
+    def toggle_live_mode(self):
+        """切換即時模式（啟用時暫停每分鐘的自動更新）"""
+        self.live_mode_enabled = self.live_mode_var.get()
+        runtime = get_runtime()
+        
+        if self.live_mode_enabled:
+            print(f"✓ 啟用即時模式（最多 {self.live_quotes.max_tabs} 個分頁）")
+            self.crawler_manager.add_blocking_profile(QUOTE_BLOCK_PROFILE)
+            runtime.submit(self.live_quotes.start())
+            self.sync_live_quotes()
+            self.status_label.config(text="⚡ 即時模式")
+        else:
+            print("✗ 停用即時模式")
+            if self.live_sync_after_id:
+                self.root.after_cancel(self.live_sync_after_id)
+                self.live_sync_after_id = None
+            runtime.submit(self.live_quotes.stop())
+            self.status_label.config(text="就緒")
+            if self.auto_update_enabled:
+                # 即時模式期間累積的到期股票重新錯開，避免一次全部送出
+                self.refresh_scheduler.clear()
+                self.refresh_scheduler.set_codes(self.prioritized_codes())
+    
+    def schedule_live_sync(self):
+        """觀察清單或可見股票變動後，稍候再同步即時分頁（避免捲動時反覆開關分頁）"""
+        if not self.live_mode_enabled:
+            return
+        if self.live_sync_after_id:
+            self.root.after_cancel(self.live_sync_after_id)
+        self.live_sync_after_id = self.root.after(500, self.sync_live_quotes)
+    
+    def sync_live_quotes(self):
+        """將觀察清單與可見股票交給即時分頁管理器"""
+        self.live_sync_after_id = None
+        if not self.live_mode_enabled:
+            return
+        visible = [code for code in self.visible_stocks if code in self.watchlist]
+        get_runtime().submit(self.live_quotes.set_codes(self.prioritized_codes(), visible))
     
     def schedule_auto_update(self):
-        """排程自動更新"""
-        if self.auto_update_enabled and self.watchlist and not self.is_updating:
-            self.start_update()
+        """
+        自動更新排程的 tick：送出已到期的股票（即時模式下由頁面推送報價，不重新爬取）
         
-        # 每 60 秒執行一次
-        if self.auto_update_enabled:
-            self.update_timer_id = self.root.after(60000, self.schedule_auto_update)
+        每支股票各自到期，更新平均分散在間隔中；
+        上一批尚未完成或超過每分鐘預算時，到期的股票會合併到下一批，不會整輪略過。
+        休市期間（週末、休市日、盤後）不查詢。
+        """
+        self.update_timer_id = None
+        if not self.auto_update_enabled:
+            return
+        
+        session = self.refresh_policy.session()
+        if session == SESSION_CLOSED:
+            if self.market_session != SESSION_CLOSED and not self.is_updating:
+                next_open = self.refresh_policy.calendar.next_open()
+                self.status_label.config(text=f"🌙 休市中（下次盤前 {next_open.strftime('%m/%d %H:%M')}）")
+                print(f"✓ 休市中，暫停自動更新至 {next_open.strftime('%Y-%m-%d %H:%M')}")
+            self.market_session = session
+            self.update_timer_id = self.root.after(MARKET_CLOSED_CHECK_MS, self.schedule_auto_update)
+            return
+        
+        if self.market_session == SESSION_CLOSED:
+            # 開盤時重新錯開，避免休市期間到期的股票一次送出
+            self.refresh_scheduler.clear()
+            self.refresh_scheduler.set_codes(self.prioritized_codes())
+        self.market_session = session
+        
+        if not self.live_mode_enabled:
+            batch = self.refresh_scheduler.take_due(limit=self.refresh_policy.available())
+            if batch:
+                self.refresh_policy.consume(len(batch))
+                run_scheduled_refresh(batch, self.result_queue, self.quote_source)
+        
+        self.update_timer_id = self.root.after(AUTO_UPDATE_TICK_MS, self.schedule_auto_update)
     
     def on_closing(self):
         """視窗關閉事件處理"""
         if self.update_timer_id:
             self.root.after_cancel(self.update_timer_id)
+        if self.tree_fill_after_id:
+            self.root.after_cancel(self.tree_fill_after_id)
+        if self.live_sync_after_id:
+            self.root.after_cancel(self.live_sync_after_id)
+        
+        # 關閉即時分頁與長駐瀏覽器，並停止背景事件迴圈
+        runtime = get_runtime()
+        try:
+            if self.live_mode_enabled:
+                runtime.run(self.live_quotes.stop(), timeout=10)
+            runtime.run(self.crawler_manager.close(), timeout=10)
+        except Exception as e:
+            print(f"關閉瀏覽器失敗: {e}")
+        runtime.stop()
+        # 分片爬取的工作程序各自關閉瀏覽器後結束
+        self.quote_source.close()
+        # 提取程序池的工作程序
+        get_extraction_executor().shutdown()
         
         self.root.destroy()
 
@@ -0,0 +1,313 @@
+"""
+報價來源
+
+所有來源都輸出與 get_stock_schema() 相同欄位名稱的股票資料字典，
+讓 GUI 不需要知道資料來自哪裡。
+
+- TwseBatchSource：臺灣證券交易所基本市況報導 API（與 twstock 相同的請求，改以 httpx 非同步送出），
+  一次 HTTP 請求即可取得數十支股票的即時報價；失敗時退避重試，
+  連續失敗時由斷路器暫停請求，股票直接交給下一個來源
+- FallbackQuoteSource：依序嘗試多個來源，前一個來源拿不到的股票才交給下一個
+  （瀏覽器爬蟲只作為最後的備援）
+"""
+
+import asyncio
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from crawl_common.http_client import get_http_client
+from crawl_common.resilience import RetryPolicy, call_with_retry, get_circuit_breaker
+from refresh_policy import TAIPEI_TZ
+
+# 基本市況報導 API（twstock.realtime 請求的網址，也作為斷路器的主機）
+TWSE_REALTIME_URL = "https://mis.twse.com.tw/stock/api/getStockInfo.jsp"
+# 取得工作階段 cookie 的首頁（twstock.realtime 在查詢前先請求）
+TWSE_SESSION_URL = "https://mis.twse.com.tw/stock/index.jsp"
+# 單次請求的逾時（秒）：連線卡住時在整體更新期限內失敗，交給下一個來源
+TWSE_TIMEOUT = httpx.Timeout(8.0, connect=3.0)
+
+# 所有來源的「日期時間」欄位統一使用的格式（休市偵測依此解析）
+QUOTE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 頁面上的行情時間：年份可省略或為民國年，日期以 / 或 - 分隔，時間可省略秒
+_QUOTE_TIME_PATTERN = re.compile(
+    r"(?:(\d{3,4})[/-])?(\d{1,2})[/-](\d{1,2})(?:\s+(\d{1,2}):(\d{2})(?::(\d{2}))?)?"
+)
+
+# 每支股票完成時呼叫，參數為 (股票代碼, 資料或 None)
+QuoteCallback = Callable[[str, Optional[Dict]], None]
+
+
+class QuoteSource:
+    """報價來源介面"""
+
+    # 顯示於狀態列與統計的名稱
+    name = "報價來源"
+
+    async def fetch(self, stock_codes: List[str], on_result: QuoteCallback):
+        """
+        取得多支股票的報價
+
+        每支股票都必須呼叫一次 on_result，取得失敗時資料為 None。
+
+        Args:
+            stock_codes: 股票代碼列表（依優先順序）
+            on_result: 每支股票完成時呼叫
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """釋放來源持有的資源（例如工作程序），預設不需要"""
+
+
+def _to_float(value) -> Optional[float]:
+    """將 API 的數值字串轉為 float，無效值（'-'、空字串）返回 None"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_quote_time(stock_data: Dict, now: Optional[datetime] = None):
+    """
+    將股票資料的「日期時間」欄位統一為 QUOTE_TIME_FORMAT
+
+    瀏覽器提取的是頁面上顯示的文字（例如 "2025/12/19 13:30"、"12/19 13:30:00"），
+    與 API 的格式不同；省略年份時以台北時間的今年補上（跨年時為去年）。
+    無法辨識的格式（例如只有時間）保留原文。
+
+    Args:
+        stock_data: 股票資料字典（直接修改）
+        now: 台北時間的目前時刻，預設為現在
+    """
+    text = stock_data.get("日期時間")
+    if not isinstance(text, str):
+        return
+    match = _QUOTE_TIME_PATTERN.search(text)
+    if match is None:
+        return
+
+    # 頁面顯示的是台北時間，與主機時區無關
+    now = (now or datetime.now(TAIPEI_TZ)).replace(tzinfo=None)
+    year, month, day, hour, minute, second = (
+        int(value) if value else None for value in match.groups()
+    )
+    if year is not None and year < 1911:
+        year += 1911  # 民國年
+    try:
+        quote_time = datetime(
+            year or now.year, month, day, hour or 0, minute or 0, second or 0
+        )
+    except ValueError:
+        return
+    if year is None and quote_time > now + timedelta(days=1):
+        quote_time = quote_time.replace(year=now.year - 1)
+    stock_data["日期時間"] = quote_time.strftime(QUOTE_TIME_FORMAT)
+
+
+def normalize_twse_quote(raw: Dict) -> Optional[Dict]:
+    """
+    將基本市況報導 API 的 msgArray 項目轉為 get_stock_schema() 的欄位
+
+    Args:
+        raw: API 回傳的單支股票資料（c 代碼、n 名稱、z 成交價、y 昨收、
+            o/h/l 開高低、v 累積成交量（張）、tlong 時間戳記）
+
+    Returns:
+        股票資料字典，沒有可用的價格時返回 None
+    """
+    previous_close = _to_float(raw.get("y"))
+    price = _to_float(raw.get("z"))
+    if price is None:
+        # 本盤尚無成交時，依序使用最佳買價、昨收
+        best_bid = (raw.get("b") or "").strip("_").split("_")[0]
+        price = _to_float(best_bid)
+    if price is None:
+        price = previous_close
+    if price is None:
+        return None
+
+    # 與 schema 提取結果一致：沒有值的欄位不放入
+    data = {"股票號碼": raw.get("c", ""), "股票名稱": raw.get("n", "")}
+    for field, value in (
+        ("即時價格", price),
+        ("開盤價", _to_float(raw.get("o"))),
+        ("最高價", _to_float(raw.get("h"))),
+        ("最低價", _to_float(raw.get("l"))),
+        ("前一日收盤價", previous_close),
+    ):
+        if value is not None:
+            data[field] = f"{value:,.2f}"
+
+    if previous_close:
+        change = price - previous_close
+        data["漲跌"] = f"{change:,.2f}"
+        data["漲跌百分比"] = f"{change / previous_close * 100:.2f}%"
+
+    volume = _to_float(raw.get("v"))
+    if volume is not None:
+        data["成交量(張)"] = f"{int(volume):,}"
+
+    # tlong 為毫秒時間戳記，以台北時間表示（與主機時區無關，休市偵測依台北日期比較）
+    tlong = raw.get("tlong")
+    if tlong:
+        data["日期時間"] = datetime.fromtimestamp(int(tlong) / 1000, TAIPEI_TZ).strftime(QUOTE_TIME_FORMAT)
+
+    return data
+
+
+class TwseBatchSource(QuoteSource):
+    """
+    臺灣證券交易所即時報價批次來源
+
+    每次請求查詢 batch_size 支股票（上市與上櫃皆可），多個批次同時送出。
+    twstock.realtime 以沒有逾時的同步 requests 查詢，卡住的連線會佔住執行緒池，
+    取消也無法中止；因此以共用的 httpx 用戶端送出相同的請求（有逾時、可取消）。
+    """
+
+    name = "TWSE 即時"
+
+    def __init__(self, batch_size: int = 50, retry_policy: Optional[RetryPolicy] = None):
+        """
+        Args:
+            batch_size: 每次請求查詢的股票數
+            retry_policy: 批次查詢的重試策略，預設最多重試 1 次
+        """
+        self.batch_size = batch_size
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=1)
+
+    @staticmethod
+    async def _get_raw(stock_codes: List[str]) -> Dict:
+        """
+        查詢基本市況報導 API 的原始回應
+
+        Args:
+            stock_codes: 股票代碼列表
+
+        Returns:
+            API 回應（msgArray 為各股票資料）
+
+        Raises:
+            httpx.HTTPError: 連線失敗、逾時或 HTTP 狀態碼錯誤
+            ValueError: 回應不是 JSON
+        """
+        # 只用 twstock 的代碼表判斷上市（tse）或上櫃（otc），第一次使用時才匯入
+        import twstock
+
+        client = get_http_client()
+        await client.get(TWSE_SESSION_URL, timeout=TWSE_TIMEOUT)
+        channels = "|".join(
+            f"{'tse' if code in twstock.twse else 'otc'}_{code}.tw" for code in stock_codes
+        )
+        response = await client.get(
+            TWSE_REALTIME_URL,
+            params={"ex_ch": channels, "_": int(time.time() * 1000)},
+            timeout=TWSE_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def _fetch_batch(self, stock_codes: List[str], on_result: QuoteCallback):
+        """查詢一個批次，並逐支回報結果"""
+        quotes: Dict[str, Dict] = {}
+        try:
+            raw = await call_with_retry(
+                lambda: self._get_raw(stock_codes),
+                self.retry_policy,
+                get_circuit_breaker(TWSE_REALTIME_URL),
+                label=f"{self.name} 批次查詢"
+            )
+            for item in raw.get("msgArray") or []:
+                data = normalize_twse_quote(item)
+                if data is not None:
+                    quotes[item.get("c")] = data
+        except Exception as e:
+            print(f"✗ {self.name} 批次查詢失敗: {e}")
+
+        for code in stock_codes:
+            data = quotes.get(code)
+            if data is not None:
+                data["stock_code"] = code
+                data["update_time"] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            on_result(code, data)
+
+    async def fetch(self, stock_codes: List[str], on_result: QuoteCallback):
+        """分批並行查詢所有股票"""
+        batches = [
+            stock_codes[i:i + self.batch_size]
+            for i in range(0, len(stock_codes), self.batch_size)
+        ]
+        await asyncio.gather(*(self._fetch_batch(batch, on_result) for batch in batches))
+
+
+class FallbackQuoteSource(QuoteSource):
+    """
+    依序嘗試多個報價來源
+
+    成功的股票立即回報；失敗的股票交給下一個來源，
+    只有最後一個來源也失敗時才回報 None。
+    """
+
+    name = "多來源"
+
+    def __init__(self, sources: List[QuoteSource]):
+        """
+        Args:
+            sources: 報價來源列表（依優先順序，最後一個為備援）
+        """
+        self.sources = sources
+
+    async def fetch(
+        self,
+        stock_codes: List[str],
+        on_result: QuoteCallback,
+        counts: Optional[Dict[str, int]] = None
+    ):
+        """
+        依序向各來源查詢尚未取得的股票
+
+        Args:
+            stock_codes: 股票代碼列表（依優先順序）
+            on_result: 每支股票完成時呼叫
+            counts: 本次查詢各來源成功的股票數（來源名稱 -> 股票數，逐支累加；
+                由呼叫端提供，同時進行的查詢互不影響）
+        """
+        resolved = set()
+        pending = list(stock_codes)
+
+        for index, source in enumerate(self.sources):
+            is_last = index == len(self.sources) - 1
+
+            def handle(code: str, data: Optional[Dict], source=source, is_last=is_last):
+                if code in resolved:
+                    return
+                if data is not None:
+                    resolved.add(code)
+                    if counts is not None:
+                        counts[source.name] = counts.get(source.name, 0) + 1
+                    on_result(code, data)
+                elif is_last:
+                    resolved.add(code)
+                    on_result(code, None)
+
+            try:
+                await source.fetch(pending, handle)
+            except Exception as e:
+                print(f"✗ 報價來源 {source.name} 發生錯誤: {e}")
+
+            pending = [code for code in pending if code not in resolved]
+            if not pending:
+                break
+
+        # 所有來源都沒有回報的股票視為失敗
+        for code in pending:
+            on_result(code, None)
+
+    def close(self):
+        """釋放所有來源的資源"""
+        for source in self.sources:
+            source.close()
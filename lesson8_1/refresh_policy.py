@@ -0,0 +1,338 @@
+"""
+自動更新策略
+
+- TradingCalendar：臺灣證券交易所交易時段（台北時間週一至週五 09:00–13:30），
+  週末、休市日檔案中的日期與偵測到的休市日不更新
+- RefreshPolicy：依每支股票最近的價格變動與成交量變化決定更新間隔，
+  越活躍的股票更新越頻繁；並以每分鐘的查詢預算限制總查詢量
+"""
+
+import json
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+# 台灣沒有日光節約時間，固定使用 UTC+8
+TAIPEI_TZ = timezone(timedelta(hours=8), "Asia/Taipei")
+
+# 交易時段（盤前試撮 08:30 起；13:30 收盤集合競價，多留 5 分鐘取得收盤價）
+PRE_OPEN_TIME = (8, 30)
+OPEN_TIME = (9, 0)
+CLOSE_TIME = (13, 35)
+
+# 固定日期的國定假日（農曆假日與補假請寫在休市日檔案，其餘由行情日期偵測）
+FIXED_HOLIDAYS = ((1, 1), (2, 28), (10, 10))
+
+SESSION_OPEN = "open"
+SESSION_PRE_OPEN = "pre_open"
+SESSION_CLOSED = "closed"
+
+SESSION_LABELS = {
+    SESSION_OPEN: "盤中",
+    SESSION_PRE_OPEN: "盤前試撮",
+    SESSION_CLOSED: "休市",
+}
+
+
+def _parse_number(value) -> Optional[float]:
+    """將顯示用的數值字串（"1,050.00"、"12,345"）轉為 float"""
+    try:
+        return float(str(value).replace(",", "").rstrip("%"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TradingCalendar:
+    """臺灣證券交易所交易日曆"""
+
+    def __init__(self, holidays: Iterable[date] = ()):
+        """
+        Args:
+            holidays: 休市日（例如農曆春節、補假）
+        """
+        self.holidays: Set[date] = set(holidays)
+        # 偵測休市日用：當天收到的行情日期統計
+        self._observed_day: Optional[date] = None
+        self._stale_quotes = 0
+        self._fresh_quotes = 0
+        self._unknown_format_logged = False
+
+    @classmethod
+    def load(cls, path: Path) -> "TradingCalendar":
+        """
+        從 JSON 檔案讀取休市日（["2026-02-16", ...]），檔案不存在時只使用週末與固定假日
+
+        Args:
+            path: 休市日檔案路徑
+
+        Returns:
+            TradingCalendar
+        """
+        holidays = []
+        try:
+            holidays = [date.fromisoformat(text) for text in json.loads(path.read_text(encoding="utf-8"))]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError) as e:
+            print(f"⚠ 無法讀取休市日檔案 {path.name}: {e}")
+        return cls(holidays)
+
+    @staticmethod
+    def now() -> datetime:
+        """
+        台北時間的現在時刻
+
+        Returns:
+            含時區的 datetime
+        """
+        return datetime.now(TAIPEI_TZ)
+
+    def is_trading_day(self, day: date) -> bool:
+        """
+        是否為交易日
+
+        Args:
+            day: 日期
+
+        Returns:
+            週一至週五且不是休市日時為 True
+        """
+        return (
+            day.weekday() < 5
+            and day not in self.holidays
+            and (day.month, day.day) not in FIXED_HOLIDAYS
+        )
+
+    def session(self, now: Optional[datetime] = None) -> str:
+        """
+        目前的交易時段
+
+        Args:
+            now: 台北時間，預設為現在
+
+        Returns:
+            SESSION_OPEN、SESSION_PRE_OPEN 或 SESSION_CLOSED
+        """
+        now = now or self.now()
+        if not self.is_trading_day(now.date()):
+            return SESSION_CLOSED
+        hm = (now.hour, now.minute)
+        if OPEN_TIME <= hm < CLOSE_TIME:
+            return SESSION_OPEN
+        if PRE_OPEN_TIME <= hm < OPEN_TIME:
+            return SESSION_PRE_OPEN
+        return SESSION_CLOSED
+
+    def next_open(self, now: Optional[datetime] = None) -> datetime:
+        """
+        下一次盤前試撮開始的時間
+
+        Args:
+            now: 台北時間，預設為現在
+
+        Returns:
+            台北時間（目前已在交易時段內時返回 now）
+        """
+        now = now or self.now()
+        if self.session(now) != SESSION_CLOSED:
+            return now
+        day = now.date()
+        if (now.hour, now.minute) >= PRE_OPEN_TIME:
+            day += timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return datetime(day.year, day.month, day.day, *PRE_OPEN_TIME, tzinfo=TAIPEI_TZ)
+
+    def observe_quote(self, quote_time: str, now: Optional[datetime] = None):
+        """
+        以行情時間偵測未列在日曆中的休市日
+
+        盤中開盤 10 分鐘後仍有多支股票的行情停留在先前的日期、
+        且沒有任何一支是當天的行情時，視為今天休市。
+
+        Args:
+            quote_time: 行情時間（"%Y-%m-%d %H:%M:%S"，由報價來源統一格式）
+            now: 台北時間，預設為現在
+        """
+        now = now or self.now()
+        if not quote_time:
+            return
+        try:
+            quote_day = datetime.strptime(quote_time[:10], "%Y-%m-%d").date()
+        except (TypeError, ValueError):
+            if not self._unknown_format_logged:
+                self._unknown_format_logged = True
+                print(f"⚠ 無法辨識行情時間格式「{quote_time}」，這類行情不用於休市偵測")
+            return
+        if self.session(now) != SESSION_OPEN or (now.hour, now.minute) < (OPEN_TIME[0], OPEN_TIME[1] + 10):
+            return
+
+        today = now.date()
+        if self._observed_day != today:
+            self._observed_day = today
+            self._stale_quotes = self._fresh_quotes = 0
+        if quote_day >= today:
+            self._fresh_quotes += 1
+        else:
+            self._stale_quotes += 1
+
+        if self._stale_quotes >= 3 and self._fresh_quotes == 0 and today not in self.holidays:
+            self.holidays.add(today)
+            print(f"✓ 行情日期停留在 {quote_day}，判定今天（{today}）休市")
+
+
+class RefreshPolicy:
+    """
+    依活躍度決定每支股票的更新間隔，並限制每分鐘的查詢數
+
+    活躍度取每次更新間價格變動百分比與成交量增加比例的指數移動平均，
+    分別與 move_reference、volume_reference 比較後取較大者（上限 1），
+    間隔在 max_interval（沒有變動）到 min_interval（活躍度 1）之間線性內插。
+    """
+
+    # 尚未有足夠行情判斷的股票視為中等活躍
+    DEFAULT_ACTIVITY = 0.5
+
+    def __init__(
+        self,
+        calendar: TradingCalendar,
+        min_interval: float = 15.0,
+        max_interval: float = 120.0,
+        pre_open_interval: float = 120.0,
+        budget_per_minute: int = 120,
+        move_reference: float = 0.2,
+        volume_reference: float = 0.5,
+        smoothing: float = 0.3
+    ):
+        """
+        Args:
+            calendar: 交易日曆
+            min_interval: 最活躍股票的更新間隔（秒）
+            max_interval: 沒有變動的股票的更新間隔（秒）
+            pre_open_interval: 盤前試撮時段的更新間隔（秒）
+            budget_per_minute: 每分鐘最多查詢的股票數
+            move_reference: 每次更新間價格變動達此百分比時視為最活躍
+            volume_reference: 每次更新間成交量增加達累積量的此百分比時視為最活躍
+            smoothing: 指數移動平均的權重（越大越重視最近一次）
+        """
+        self.calendar = calendar
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.pre_open_interval = pre_open_interval
+        self.budget_per_minute = budget_per_minute
+        self.move_reference = move_reference
+        self.volume_reference = volume_reference
+        self.smoothing = smoothing
+
+        # 每分鐘預算以令牌桶實作，允許短暫的突發
+        self._tokens = float(budget_per_minute)
+        self._refilled_at = time.monotonic()
+        self._last_quote: Dict[str, Dict[str, float]] = {}
+        self._activity: Dict[str, float] = {}
+
+    def session(self) -> str:
+        """
+        目前的交易時段
+
+        Returns:
+            SESSION_OPEN、SESSION_PRE_OPEN 或 SESSION_CLOSED
+        """
+        return self.calendar.session()
+
+    def _refill(self, now: float):
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        self._tokens = min(
+            float(self.budget_per_minute),
+            self._tokens + elapsed * self.budget_per_minute / 60.0
+        )
+
+    def available(self, now: Optional[float] = None) -> int:
+        """
+        目前可送出的查詢數
+
+        Args:
+            now: 目前時間（time.monotonic()），預設為現在
+
+        Returns:
+            可查詢的股票數
+        """
+        self._refill(time.monotonic() if now is None else now)
+        return int(self._tokens)
+
+    def consume(self, count: int):
+        """
+        扣除已送出的查詢數
+
+        Args:
+            count: 送出的股票數
+        """
+        self._tokens = max(0.0, self._tokens - count)
+
+    def observe(self, stock_code: str, stock_data: Dict):
+        """
+        記錄股票的最新行情，更新活躍度與休市偵測
+
+        Args:
+            stock_code: 股票代碼
+            stock_data: get_stock_schema() 格式的股票資料
+        """
+        self.calendar.observe_quote(stock_data.get("日期時間"))
+
+        price = _parse_number(stock_data.get("即時價格"))
+        volume = _parse_number(stock_data.get("成交量(張)"))
+        previous = self._last_quote.get(stock_code)
+        self._last_quote[stock_code] = {"price": price, "volume": volume}
+        if previous is None or price is None:
+            return
+
+        activity = 0.0
+        if previous["price"]:
+            move = abs(price - previous["price"]) / previous["price"] * 100
+            activity = max(activity, move / self.move_reference)
+        if volume is not None and previous["volume"] is not None and volume > 0:
+            traded = max(0.0, volume - previous["volume"]) / volume * 100
+            activity = max(activity, traded / self.volume_reference)
+
+        current = self._activity.get(stock_code, self.DEFAULT_ACTIVITY)
+        self._activity[stock_code] = current + self.smoothing * (min(activity, 1.0) - current)
+
+    def forget(self, stock_code: str):
+        """
+        移除股票的活躍度記錄（從觀察清單移除時呼叫）
+
+        Args:
+            stock_code: 股票代碼
+        """
+        self._last_quote.pop(stock_code, None)
+        self._activity.pop(stock_code, None)
+
+    def interval_for(self, stock_code: str, session: Optional[str] = None) -> float:
+        """
+        股票的更新間隔
+
+        Args:
+            stock_code: 股票代碼
+            session: 交易時段，預設為目前時段
+
+        Returns:
+            秒數
+        """
+        session = session or self.session()
+        if session == SESSION_PRE_OPEN:
+            return self.pre_open_interval
+        activity = self._activity.get(stock_code, self.DEFAULT_ACTIVITY)
+        return self.max_interval - (self.max_interval - self.min_interval) * activity
+
+    def stats(self) -> Dict[str, float]:
+        """
+        策略統計
+
+        Returns:
+            包含 active（活躍度 ≥ 0.5 的股票數）、tokens（剩餘預算）的字典
+        """
+        return {
+            "active": sum(1 for activity in self._activity.values() if activity >= 0.5),
+            "tokens": self._tokens,
+        }
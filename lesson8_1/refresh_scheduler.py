@@ -0,0 +1,242 @@
+"""
+錯開更新排程
+
+自動更新不再每 60 秒一次更新所有股票，而是讓每支股票有自己的到期時間，
+平均分散在更新間隔中，以優先佇列（heap）依到期時間取出：
+
+- 每次 tick 取出所有已到期的股票合併成一批查詢
+- 查詢中的股票不會再排入佇列；進行中的批次達上限時，到期的股票留在佇列，
+  合併到下一批
+- 落後超過一個間隔時放棄錯過的週期，從現在重新排程，而不是整輪略過
+- 記錄每支股票實際成功更新的時間，提供資料新鮮度（staleness）統計
+- 每支股票可以有不同的更新間隔（set_interval），每批的股票數可由呼叫端限制（預算）
+
+所有方法都在 GUI 主執行緒中呼叫，不需要鎖。
+"""
+
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class StaggeredRefreshScheduler:
+    """每支股票各自到期的更新排程器"""
+
+    def __init__(
+        self,
+        interval: float = 60.0,
+        max_batches: int = 2,
+        max_batch_size: int = 50
+    ):
+        """
+        Args:
+            interval: 預設的更新間隔（秒）
+            max_batches: 同時進行的批次上限
+            max_batch_size: 每批最多的股票數
+        """
+        self.interval = interval
+        self.max_batches = max_batches
+        self.max_batch_size = max_batch_size
+
+        self._heap: List[Tuple[float, int, str]] = []
+        self._due: Dict[str, float] = {}
+        self._seq = 0
+        self._in_flight: Dict[str, float] = {}
+        self._active_batches = 0
+        self._last_success: Dict[str, float] = {}
+        self._added_at: Dict[str, float] = {}
+        self._intervals: Dict[str, float] = {}
+        self.dropped_cycles = 0
+        self.deferred_ticks = 0
+
+    def _push(self, code: str, due: float):
+        """排入佇列（舊的項目留在 heap 中，取出時依 _due 忽略）"""
+        self._due[code] = due
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, code))
+
+    def set_codes(self, stock_codes: List[str], now: Optional[float] = None):
+        """
+        設定要更新的股票（新加入的股票平均分散在接下來的一個間隔內）
+
+        Args:
+            stock_codes: 股票代碼列表（依優先順序，越前面越早到期）
+            now: 目前時間（time.monotonic()），預設為現在
+        """
+        now = time.monotonic() if now is None else now
+        wanted = set(stock_codes)
+        for code in [code for code in self._due if code not in wanted]:
+            del self._due[code]
+        for code in [code for code in self._added_at if code not in wanted]:
+            self._added_at.pop(code, None)
+            self._last_success.pop(code, None)
+            self._intervals.pop(code, None)
+
+        # 查詢中的股票完成時由 mark_done 排入，不重複排程
+        new_codes = []
+        for code in dict.fromkeys(stock_codes):
+            self._added_at.setdefault(code, now)
+            if code not in self._due and code not in self._in_flight:
+                new_codes.append(code)
+        step = self.interval / len(new_codes) if new_codes else 0.0
+        for i, code in enumerate(new_codes):
+            self._push(code, now + i * step)
+
+    def clear(self):
+        """清空排程（停用自動更新時呼叫；進行中的批次完成後不再排入）"""
+        self._heap.clear()
+        self._due.clear()
+        self._added_at.clear()
+        self._last_success.clear()
+        self._intervals.clear()
+
+    def interval_for(self, stock_code: str) -> float:
+        """
+        股票的更新間隔
+
+        Args:
+            stock_code: 股票代碼
+
+        Returns:
+            秒數
+        """
+        return self._intervals.get(stock_code, self.interval)
+
+    def set_interval(self, stock_code: str, interval: float):
+        """
+        設定股票的更新間隔（下一次完成後生效；縮短時已排定的到期時間會提前）
+
+        Args:
+            stock_code: 股票代碼
+            interval: 秒數
+        """
+        if stock_code not in self._added_at:
+            return
+        previous = self.interval_for(stock_code)
+        self._intervals[stock_code] = interval
+        due = self._due.get(stock_code)
+        if due is not None and interval < previous:
+            self._push(stock_code, due - (previous - interval))
+
+    def take_due(self, now: Optional[float] = None, limit: Optional[int] = None) -> List[str]:
+        """
+        取出已到期的股票作為一批
+
+        Args:
+            now: 目前時間（time.monotonic()），預設為現在
+            limit: 本批最多的股票數（例如剩餘的查詢預算），超過的留在佇列
+
+        Returns:
+            股票代碼列表（依到期時間排序），沒有到期或批次已達上限時為空列表
+        """
+        now = time.monotonic() if now is None else now
+        if self._active_batches >= self.max_batches:
+            if self._heap and self._heap[0][0] <= now:
+                # 到期的股票留在佇列，合併到下一批
+                self.deferred_ticks += 1
+            return []
+
+        batch_size = self.max_batch_size if limit is None else min(limit, self.max_batch_size)
+        batch = []
+        while self._heap and self._heap[0][0] <= now and len(batch) < batch_size:
+            due, _, code = heapq.heappop(self._heap)
+            if self._due.get(code) != due:
+                continue  # 已移除或重新排程
+            del self._due[code]
+            self._in_flight[code] = due
+            batch.append(code)
+
+        if batch:
+            self._active_batches += 1
+        return batch
+
+    def mark_done(self, stock_code: str, success: bool, now: Optional[float] = None):
+        """
+        單支股票完成：記錄更新時間並排定下一次
+
+        Args:
+            stock_code: 股票代碼
+            success: 是否成功取得資料
+            now: 目前時間（time.monotonic()），預設為現在
+        """
+        now = time.monotonic() if now is None else now
+        if success and stock_code in self._added_at:
+            self._last_success[stock_code] = now
+
+        due = self._in_flight.pop(stock_code, None)
+        if due is None or stock_code not in self._added_at:
+            return  # 不是排程中的股票，或查詢期間已移除
+
+        # 維持原本的相位；落後超過一個間隔時放棄錯過的週期
+        interval = self.interval_for(stock_code)
+        next_due = due + interval
+        if next_due <= now:
+            self.dropped_cycles += int((now - due) // interval)
+            next_due = now + interval
+        self._push(stock_code, next_due)
+
+    def finish_batch(self, stock_codes: List[str], now: Optional[float] = None):
+        """
+        一批完成（沒有回報結果的股票視為失敗並重新排程）
+
+        Args:
+            stock_codes: 該批的股票代碼
+            now: 目前時間（time.monotonic()），預設為現在
+        """
+        for code in stock_codes:
+            if code in self._in_flight:
+                self.mark_done(code, False, now)
+        self._active_batches = max(0, self._active_batches - 1)
+
+    def record_success(self, stock_code: str, now: Optional[float] = None):
+        """
+        記錄排程以外（手動更新、即時推送）取得的資料
+
+        Args:
+            stock_code: 股票代碼
+            now: 目前時間（time.monotonic()），預設為現在
+        """
+        if stock_code in self._added_at:
+            self._last_success[stock_code] = time.monotonic() if now is None else now
+
+    def staleness(self, now: Optional[float] = None) -> Dict[str, float]:
+        """
+        每支股票距離上次成功更新的秒數（尚未成功過則從加入排程起算）
+
+        Args:
+            now: 目前時間（time.monotonic()），預設為現在
+
+        Returns:
+            股票代碼 -> 秒數
+        """
+        now = time.monotonic() if now is None else now
+        return {
+            code: now - self._last_success.get(code, added_at)
+            for code, added_at in self._added_at.items()
+        }
+
+    def stats(self, now: Optional[float] = None) -> Dict[str, float]:
+        """
+        排程統計
+
+        Args:
+            now: 目前時間（time.monotonic()），預設為現在
+
+        Returns:
+            包含 stocks、queued、in_flight、max_staleness、p95_staleness、
+            mean_staleness、overdue（超過自己的間隔未更新的股票數）、
+            dropped_cycles、deferred_ticks（批次達上限而延後的次數）的字典
+        """
+        staleness = self.staleness(now)
+        ages = sorted(staleness.values())
+        return {
+            "stocks": len(self._added_at),
+            "queued": len(self._due),
+            "in_flight": len(self._in_flight),
+            "max_staleness": ages[-1] if ages else 0.0,
+            "p95_staleness": ages[min(len(ages) - 1, int(len(ages) * 0.95))] if ages else 0.0,
+            "mean_staleness": sum(ages) / len(ages) if ages else 0.0,
+            "overdue": sum(1 for code, age in staleness.items() if age > self.interval_for(code)),
+            "dropped_cycles": self.dropped_cycles,
+            "deferred_ticks": self.deferred_ticks,
+        }
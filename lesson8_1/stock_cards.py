@@ -0,0 +1,412 @@
+"""
+股票資訊卡片元件
+
+StockCard 的元件只建立一次，之後每次更新只修改數值有變動的標籤文字與顏色。
+VirtualStockGrid 只為捲動視窗內看得到的股票建立卡片，捲動時回收重用，
+觀察清單不論 10 支或 1000 支，元件數量與繪製時間都維持固定。
+"""
+
+import tkinter as tk
+from tkinter import ttk
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# 詳細資訊欄位：(元件鍵值, 顯示標籤, 資料欄位, 字體大小)
+LEFT_INFO_ROWS = [
+    ("open", "開盤", "開盤價", 14),
+    ("high", "最高", "最高價", 14),
+    ("low", "最低", "最低價", 14),
+]
+RIGHT_INFO_ROWS = [
+    ("volume", "成交量", "成交量(張)", 14),
+    ("previous_close", "昨收", "前一日收盤價", 14),
+    ("update_time", "更新", "update_time", 11),
+]
+
+
+def format_change(change: str) -> Tuple[str, str]:
+    """
+    依漲跌值決定顯示文字與顏色
+
+    Args:
+        change: 漲跌字串（可能含千分位）
+
+    Returns:
+        (顯示文字, 顏色)，紅色為漲、綠色為跌
+    """
+    color = 'black'
+    if change != 'N/A' and change:
+        try:
+            change_value = float(change.replace(',', ''))
+            if change_value > 0:
+                color = '#d32f2f'  # 紅色（漲）
+                change = f"▲ {change}"
+            elif change_value < 0:
+                color = '#388e3c'  # 綠色（跌）
+                change = f"▼ {change}"
+        except ValueError:
+            pass
+    return change, color
+
+
+class StockCard:
+    """單支股票的資訊卡片（元件重複使用，只更新變動的值）"""
+
+    def __init__(
+        self,
+        parent: tk.Widget,
+        stock_code: str,
+        on_remove: Callable[[str], None]
+    ):
+        """
+        建立卡片元件
+
+        Args:
+            parent: 父容器
+            stock_code: 股票代碼
+            on_remove: 按下移除按鈕時呼叫，參數為股票代碼
+        """
+        self.stock_code = stock_code
+
+        # 目前顯示的值，用於判斷是否需要更新元件
+        self._shown: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._has_data = False
+
+        self.frame = ttk.LabelFrame(
+            parent,
+            text=f"  股票 {stock_code}  ",
+            padding=15
+        )
+
+        # 等待資料提示
+        self.waiting_label = ttk.Label(
+            self.frame,
+            text="⏳ 等待更新資料...",
+            font=('Arial', 16),
+            foreground='gray'
+        )
+        self.waiting_label.pack(pady=20)
+
+        self.labels: Dict[str, tk.Widget] = {}
+        self.content_frame = self._build_content()
+
+        # === 移除按鈕區 ===
+        self.btn_frame = ttk.Frame(self.frame)
+        self.btn_frame.pack(fill=tk.X, pady=(10, 0))
+
+        # 使用 tk.Button 以便自訂顏色
+        remove_btn = tk.Button(
+            self.btn_frame,
+            text="✕ 移除",
+            command=lambda: on_remove(self.stock_code),
+            font=('Arial', 13, 'bold'),
+            bg='#f44336',
+            fg='#FFFF00',  # 黃色文字
+            activebackground='#d32f2f',
+            activeforeground='#FFFF00',
+            relief=tk.FLAT,
+            cursor='hand2',
+            padx=20,
+            pady=8
+        )
+        remove_btn.pack(side=tk.RIGHT)
+
+        # 滑鼠懸停效果
+        remove_btn.bind("<Enter>", lambda e: remove_btn.config(bg='#d32f2f'))
+        remove_btn.bind("<Leave>", lambda e: remove_btn.config(bg='#f44336'))
+
+    def _build_content(self) -> ttk.Frame:
+        """建立資料區元件（有資料時才顯示）"""
+        content_frame = ttk.Frame(self.frame)
+
+        # === 標題區（股票代碼與名稱） ===
+        header_frame = ttk.Frame(content_frame)
+        header_frame.pack(fill=tk.X, pady=(0, 10))
+
+        self.labels['code'] = ttk.Label(header_frame, font=('Arial', 20, 'bold'))
+        self.labels['code'].pack(side=tk.LEFT)
+
+        self.labels['name'] = ttk.Label(header_frame, font=('Arial', 18))
+        self.labels['name'].pack(side=tk.LEFT, padx=(10, 0))
+
+        # === 即時價格區（大字體顯示） ===
+        price_frame = ttk.Frame(content_frame)
+        price_frame.pack(fill=tk.X, pady=(0, 10))
+
+        self.labels['price'] = tk.Label(price_frame, font=('Arial', 36, 'bold'), fg='black')
+        self.labels['price'].pack(side=tk.LEFT)
+
+        # 漲跌顯示（帶顏色）
+        change_frame = ttk.Frame(price_frame)
+        change_frame.pack(side=tk.LEFT, padx=(15, 0))
+
+        self.labels['change'] = tk.Label(change_frame, font=('Arial', 20, 'bold'))
+        self.labels['change'].pack()
+
+        self.labels['change_rate'] = tk.Label(change_frame, font=('Arial', 17))
+        self.labels['change_rate'].pack()
+
+        # === 詳細資訊區（兩欄佈局） ===
+        info_frame = ttk.Frame(content_frame)
+        info_frame.pack(fill=tk.X, pady=(5, 10))
+
+        left_col = ttk.Frame(info_frame)
+        left_col.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        for key, label, _, size in LEFT_INFO_ROWS:
+            self._add_info_row(left_col, key, label, size)
+
+        right_col = ttk.Frame(info_frame)
+        right_col.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(20, 0))
+        for key, label, _, size in RIGHT_INFO_ROWS:
+            self._add_info_row(right_col, key, label, size)
+
+        return content_frame
+
+    def _add_info_row(self, parent, key: str, label: str, size: int):
+        """
+        添加資訊列
+
+        Args:
+            parent: 父容器
+            key: 數值標籤的元件鍵值
+            label: 標籤文字
+            size: 字體大小
+        """
+        row = ttk.Frame(parent)
+        row.pack(fill=tk.X, pady=3)
+
+        ttk.Label(
+            row,
+            text=f"{label}:",
+            font=('Arial', size),
+            foreground='#666'
+        ).pack(side=tk.LEFT)
+
+        self.labels[key] = ttk.Label(row, font=('Arial', size, 'bold'))
+        self.labels[key].pack(side=tk.LEFT, padx=(5, 0))
+
+    def update(self, stock_data: Optional[Dict]):
+        """
+        以最新資料更新卡片，只修改值有變動的元件
+
+        Args:
+            stock_data: 股票資料，None 表示尚無資料
+        """
+        if not stock_data:
+            return
+
+        if not self._has_data:
+            self.waiting_label.pack_forget()
+            self.content_frame.pack(fill=tk.BOTH, expand=True, before=self.btn_frame)
+            self._has_data = True
+
+        change, color = format_change(stock_data.get('漲跌', 'N/A'))
+
+        self._set('code', f"{stock_data.get('股票號碼', 'N/A')}")
+        self._set('name', f"{stock_data.get('股票名稱', 'N/A')}")
+        self._set('price', stock_data.get('即時價格', 'N/A'))
+        self._set('change', change, color)
+        self._set('change_rate', stock_data.get('漲跌百分比', 'N/A'), color)
+        for key, _, field, _ in LEFT_INFO_ROWS + RIGHT_INFO_ROWS:
+            self._set(key, stock_data.get(field, 'N/A'))
+        if stock_data.get('stale'):
+            # 本次更新沒有取得新資料，顯示的是上次的報價
+            self._set('update_time', f"{stock_data.get('update_time', 'N/A')}（延遲）")
+
+    def _set(self, key: str, text: str, color: Optional[str] = None):
+        """只在文字或顏色改變時才設定元件"""
+        if self._shown.get(key) == (text, color):
+            return
+        self._shown[key] = (text, color)
+        if color is None:
+            self.labels[key].config(text=text)
+        else:
+            self.labels[key].config(text=text, fg=color)
+
+    def bind_stock(self, stock_code: str):
+        """
+        將卡片改為顯示另一支股票（回收重用時使用）
+
+        Args:
+            stock_code: 新的股票代碼
+        """
+        if stock_code == self.stock_code:
+            return
+        self.stock_code = stock_code
+        self.frame.config(text=f"  股票 {stock_code}  ")
+
+        # 回到等待資料狀態
+        self._shown.clear()
+        if self._has_data:
+            self.content_frame.pack_forget()
+            self.waiting_label.pack(pady=20, before=self.btn_frame)
+            self._has_data = False
+
+    def destroy(self):
+        """銷毀卡片元件"""
+        self.frame.destroy()
+
+
+class VirtualStockGrid:
+    """
+    虛擬化的三欄股票卡片格狀檢視
+
+    只為與捲動視窗相交的列（加上上下各一列緩衝）建立卡片，
+    捲出畫面的卡片放回回收池，捲入時重新綁定股票代碼後重用。
+    """
+
+    def __init__(
+        self,
+        parent: tk.Widget,
+        on_remove: Callable[[str], None],
+        data_source: Callable[[str], Optional[Dict]],
+        on_visible_change: Optional[Callable[[List[str]], None]] = None,
+        columns: int = 3,
+        row_height: int = 330
+    ):
+        """
+        建立格狀檢視
+
+        Args:
+            parent: 父容器
+            on_remove: 按下卡片移除按鈕時呼叫，參數為股票代碼
+            data_source: 依股票代碼取得目前資料的函數
+            on_visible_change: 畫面內可見股票改變時呼叫，參數為可見股票代碼列表
+            columns: 欄數
+            row_height: 每列卡片高度（像素）
+        """
+        self.on_remove = on_remove
+        self.data_source = data_source
+        self.on_visible_change = on_visible_change
+        self.columns = columns
+        self.row_height = row_height
+
+        self.codes: List[str] = []
+        self._active: Dict[str, Tuple[StockCard, int]] = {}
+        self._pool: List[Tuple[StockCard, int]] = []
+        self._visible: List[str] = []
+        self._render_pending = False
+
+        self.canvas = tk.Canvas(parent, highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_yview_changed)
+
+        self.canvas.pack(side="left", fill="both", expand=True, padx=5, pady=5)
+        self.scrollbar.pack(side="right", fill="y")
+
+        # 空狀態提示
+        self.empty_label = ttk.Label(
+            self.canvas,
+            text="📊 尚未加入任何股票\n\n請從左側清單選擇股票加入觀察",
+            font=('Arial', 12),
+            foreground='gray'
+        )
+        self._empty_window = self.canvas.create_window(
+            0, 50, window=self.empty_label, anchor="n"
+        )
+
+        self.canvas.bind("<Configure>", lambda e: self._render())
+
+    def set_codes(self, codes: List[str]):
+        """
+        設定要顯示的股票代碼（觀察清單變動時呼叫）
+
+        Args:
+            codes: 依顯示順序排列的股票代碼
+        """
+        self.codes = list(codes)
+        self._render()
+
+    def update_stock(self, stock_code: str):
+        """
+        更新單一股票卡片；不在畫面內的股票不需處理，捲入時會讀取最新資料
+
+        Args:
+            stock_code: 股票代碼
+        """
+        entry = self._active.get(stock_code)
+        if entry is not None:
+            entry[0].update(self.data_source(stock_code))
+
+    def visible_codes(self) -> List[str]:
+        """取得目前畫面內可見的股票代碼"""
+        return list(self._visible)
+
+    def _on_yview_changed(self, first: str, last: str):
+        """捲動位置改變：同步捲軸，並在閒置時重新計算可見卡片"""
+        self.scrollbar.set(first, last)
+        if not self._render_pending:
+            self._render_pending = True
+            self.canvas.after_idle(self._render)
+
+    def _render(self):
+        """依捲動位置建立、回收與擺放卡片"""
+        self._render_pending = False
+
+        width = max(self.canvas.winfo_width(), 1)
+        height = max(self.canvas.winfo_height(), 1)
+        col_width = width // self.columns
+        total_rows = (len(self.codes) + self.columns - 1) // self.columns
+
+        self.canvas.configure(scrollregion=(0, 0, width, max(total_rows * self.row_height, height)))
+
+        # 空狀態
+        if self.codes:
+            self.canvas.itemconfigure(self._empty_window, state="hidden")
+        else:
+            self.canvas.coords(self._empty_window, width // 2, 50)
+            self.canvas.itemconfigure(self._empty_window, state="normal")
+
+        # 計算可見範圍（上下各多保留一列作為緩衝）
+        top = self.canvas.canvasy(0)
+        bottom = top + height
+        first_row = int(top // self.row_height)
+        last_row = int(bottom // self.row_height)
+        start = max(0, first_row - 1) * self.columns
+        end = min(len(self.codes), (last_row + 2) * self.columns)
+        wanted = {code: idx for idx, code in enumerate(self.codes[start:end], start)}
+
+        # 回收捲出畫面或已移除的卡片
+        for stock_code in list(self._active):
+            if stock_code not in wanted:
+                card, window = self._active.pop(stock_code)
+                self.canvas.itemconfigure(window, state="hidden")
+                self._pool.append((card, window))
+
+        # 為可見的股票綁定卡片並擺放
+        for stock_code, idx in wanted.items():
+            entry = self._active.get(stock_code)
+            if entry is None:
+                entry = self._acquire_card(stock_code)
+                self._active[stock_code] = entry
+                entry[0].update(self.data_source(stock_code))
+
+            card, window = entry
+            row, col = divmod(idx, self.columns)
+            self.canvas.coords(window, col * col_width + 5, row * self.row_height + 5)
+            self.canvas.itemconfigure(
+                window,
+                width=col_width - 10,
+                height=self.row_height - 10,
+                state="normal"
+            )
+
+        # 通知真正出現在畫面中的股票（不含緩衝列）
+        visible_start = max(0, first_row) * self.columns
+        visible_end = min(len(self.codes), (last_row + 1) * self.columns)
+        visible = self.codes[visible_start:visible_end]
+        if visible != self._visible:
+            self._visible = visible
+            if self.on_visible_change is not None:
+                self.on_visible_change(list(visible))
+
+    def _acquire_card(self, stock_code: str) -> Tuple[StockCard, int]:
+        """從回收池取出卡片並重新綁定股票，池中沒有時才建立新卡片"""
+        if self._pool:
+            card, window = self._pool.pop()
+            card.bind_stock(stock_code)
+            return card, window
+
+        card = StockCard(self.canvas, stock_code, self.on_remove)
+        window = self.canvas.create_window(0, 0, window=card.frame, anchor="nw")
+        return card, window
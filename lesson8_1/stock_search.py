@@ -0,0 +1,94 @@
+"""
+股票搜尋索引
+
+在載入股票清單時一次建立代碼前綴索引與代碼／名稱 n-gram 倒排索引，
+每次輸入只需取幾個索引列表的交集，不必線性掃描整個股票清單。
+"""
+
+from typing import Dict, List, Set, Tuple
+
+
+class StockSearchIndex:
+    """
+    股票代碼與名稱的搜尋索引
+
+    搜尋結果依相關程度排序：代碼完全相符 > 代碼前綴 > 名稱前綴 > 子字串，
+    同一等級內維持原本的代碼順序。
+    """
+
+    def __init__(self, stocks: List[Tuple[str, str]]):
+        """
+        建立索引
+
+        Args:
+            stocks: 依代碼排序的 (代碼, 名稱) 列表
+        """
+        self.stocks = stocks
+        self._codes = [code.lower() for code, _ in stocks]
+        self._names = [name.lower() for _, name in stocks]
+
+        # 代碼前綴 -> 股票索引（依代碼順序）
+        self._code_prefix: Dict[str, List[int]] = {}
+        # 字元 unigram / bigram -> 股票索引集合（代碼與名稱共用）
+        self._ngrams: Dict[str, Set[int]] = {}
+
+        for idx, (code, name) in enumerate(zip(self._codes, self._names)):
+            for end in range(1, len(code) + 1):
+                self._code_prefix.setdefault(code[:end], []).append(idx)
+            for text in (code, name):
+                for gram in self._iter_ngrams(text):
+                    self._ngrams.setdefault(gram, set()).add(idx)
+
+    @staticmethod
+    def _iter_ngrams(text: str):
+        """產生文字的所有 unigram 與 bigram"""
+        for i in range(len(text)):
+            yield text[i]
+            if i + 1 < len(text):
+                yield text[i:i + 2]
+
+    def search(self, query: str) -> List[int]:
+        """
+        搜尋股票
+
+        Args:
+            query: 使用者輸入的代碼或名稱片段
+
+        Returns:
+            依相關程度排序的股票索引列表（對應 self.stocks）
+        """
+        query = query.strip().lower()
+        if not query:
+            return list(range(len(self.stocks)))
+
+        # 代碼前綴索引直接給出完全相符與前綴相符（已依代碼排序）
+        prefix_hits = self._code_prefix.get(query, [])
+        exact = [idx for idx in prefix_hits if self._codes[idx] == query]
+        prefix = [idx for idx in prefix_hits if self._codes[idx] != query]
+
+        # 其餘以 bigram（單一字元時用 unigram）的倒排列表交集篩出候選
+        if len(query) == 1:
+            grams = [query]
+        else:
+            grams = [query[i:i + 2] for i in range(len(query) - 1)]
+
+        postings = [self._ngrams.get(gram) for gram in grams]
+        if any(p is None for p in postings):
+            return exact + prefix
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+        candidates.difference_update(prefix_hits)
+
+        name_prefix = []
+        substring = []
+        for idx in sorted(candidates):
+            name = self._names[idx]
+            if name.startswith(query):
+                name_prefix.append(idx)
+            elif query in self._codes[idx] or query in name:
+                substring.append(idx)
+            # 其他情況為 bigram 都命中但不是連續子字串，略過
+
+        return exact + prefix + name_prefix + substring
@@ -0,0 +1,88 @@
+"""
+台灣股票清單快照
+
+匯入 twstock 需要解析整份上市櫃代碼 CSV，會拖慢應用程式啟動。
+此模組將篩選後的 (代碼, 名稱) 清單存成精簡的 JSON 快照，
+只有在 twstock 的代碼資料檔變動時才重新匯入 twstock 並重建快照。
+"""
+
+import importlib.util
+import json
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+SNAPSHOT_PATH = Path(__file__).resolve().parent / ".cache" / "stock_universe.json"
+SNAPSHOT_VERSION = 1
+
+
+def _twstock_data_signature() -> Optional[List]:
+    """
+    取得 twstock 代碼資料檔的簽章（檔名、大小、修改時間），不需匯入 twstock
+
+    Returns:
+        簽章列表，找不到 twstock 時返回 None
+    """
+    spec = importlib.util.find_spec("twstock")
+    if spec is None or not spec.submodule_search_locations:
+        return None
+
+    codes_dir = Path(list(spec.submodule_search_locations)[0]) / "codes"
+    return [
+        [csv_path.name, stat.st_size, stat.st_mtime_ns]
+        for csv_path in sorted(codes_dir.glob("*.csv"))
+        for stat in [csv_path.stat()]
+    ]
+
+
+def _build_universe() -> List[Tuple[str, str]]:
+    """從 twstock 建立依代碼排序的股票清單（只保留股票類型）"""
+    import twstock
+
+    stocks = [
+        (code, info.name)
+        for code, info in twstock.codes.items()
+        if info.type == '股票'
+    ]
+    stocks.sort(key=lambda x: x[0])
+    return stocks
+
+
+def load_stock_universe(snapshot_path: Path = SNAPSHOT_PATH) -> Tuple[List[Tuple[str, str]], bool]:
+    """
+    載入股票清單，優先使用快照
+
+    Args:
+        snapshot_path: 快照檔路徑
+
+    Returns:
+        (依代碼排序的 (代碼, 名稱) 列表, 是否來自快照)
+    """
+    signature = _twstock_data_signature()
+
+    try:
+        snapshot = json.loads(snapshot_path.read_text(encoding="utf-8"))
+        if (
+            snapshot.get("version") == SNAPSHOT_VERSION
+            and signature is not None
+            and snapshot.get("signature") == signature
+        ):
+            return [tuple(item) for item in snapshot["stocks"]], True
+    except (OSError, ValueError, KeyError):
+        pass
+
+    stocks = _build_universe()
+
+    try:
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        snapshot_path.write_text(
+            json.dumps(
+                {"version": SNAPSHOT_VERSION, "signature": signature, "stocks": stocks},
+                ensure_ascii=False,
+                separators=(",", ":")
+            ),
+            encoding="utf-8"
+        )
+    except OSError as e:
+        print(f"寫入股票清單快照失敗: {e}")
+
+    return stocks, False